@@ -0,0 +1 @@
+"""Benchmarks for Phone Agent (run from the repository root with `python -m`)."""
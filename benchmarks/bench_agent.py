@@ -0,0 +1,171 @@
+"""End-to-end benchmark of `PhoneAgent.run` against a mocked model and device.
+
+Starts the PiKVM simulator and the scripted model server in-process, then runs
+N agents concurrently and reports steps per second, per-phase latency
+(screenshot, model, parse, action) and memory per agent.
+
+Usage:
+    python -m benchmarks.bench_agent --agents 1,8,64 --model-latency-ms 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from benchmarks.common import PhaseRecorder, write_results
+from benchmarks.mock_model import MockModelConfig, MockModelServer
+from iphone_agent import agent as agent_module
+from iphone_agent.actions.handler import ActionHandler
+from iphone_agent.agent import AgentConfig, PhoneAgent
+from iphone_agent.idb.connection import configure_client
+from iphone_agent.idb.simulator import PiKvmSimulator, SimulatorConfig
+from iphone_agent.model import ModelClient, ModelConfig
+
+
+def instrument(recorder: PhaseRecorder) -> Callable[[], None]:
+    """
+    Record per-phase latency of every agent step.
+
+    Returns:
+        A function that removes the instrumentation.
+    """
+    originals = [
+        (agent_module, "get_screenshot", "screenshot"),
+        (agent_module, "parse_action", "parse"),
+        (ModelClient, "request", "model"),
+        (ActionHandler, "execute", "action"),
+    ]
+    saved = []
+    for owner, name, phase in originals:
+        original = getattr(owner, name)
+        saved.append((owner, name, original))
+        setattr(owner, name, recorder.wrap(phase, original))
+
+    def restore() -> None:
+        for owner, name, original in saved:
+            setattr(owner, name, original)
+
+    return restore
+
+
+def run_agents(
+    count: int, model_base_url: str, task: str, max_steps: int
+) -> tuple[float, list[int]]:
+    """Run `count` agents concurrently; returns (wall seconds, steps per agent)."""
+    agents = [
+        PhoneAgent(
+            model_config=ModelConfig(base_url=model_base_url, model_name="mock"),
+            agent_config=AgentConfig(max_steps=max_steps, verbose=False),
+        )
+        for _ in range(count)
+    ]
+
+    def run_one(agent: PhoneAgent) -> int:
+        agent.run(task)
+        return agent.step_count
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        steps = list(pool.map(run_one, agents))
+    return time.perf_counter() - start, steps
+
+
+def bench_level(
+    count: int,
+    model_base_url: str,
+    task: str,
+    max_steps: int,
+    measure_memory: bool,
+) -> dict[str, Any]:
+    recorder = PhaseRecorder()
+    restore = instrument(recorder)
+    try:
+        wall, steps = run_agents(count, model_base_url, task, max_steps)
+    finally:
+        restore()
+
+    total_steps = sum(steps)
+    result: dict[str, Any] = {
+        "agents": count,
+        "wall_s": wall,
+        "total_steps": total_steps,
+        "steps_per_s": total_steps / wall if wall else 0.0,
+        "phases": recorder.summary(),
+    }
+
+    if measure_memory:
+        # Separate pass: tracemalloc slows allocation-heavy code down.
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        run_agents(count, model_base_url, task, max_steps)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result["peak_memory_per_agent_bytes"] = (peak - baseline) / count
+
+    return result
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="End-to-end PhoneAgent benchmark")
+    parser.add_argument(
+        "--agents", type=str, default="1,8,64", help="Comma-separated concurrency levels"
+    )
+    parser.add_argument("--model-latency-ms", type=float, default=300.0)
+    parser.add_argument("--model-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--device-latency-ms", type=float, default=10.0)
+    parser.add_argument("--device-jitter-ms", type=float, default=3.0)
+    parser.add_argument("--max-steps", type=int, default=20)
+    parser.add_argument("--task", type=str, default="Open the first app and browse")
+    parser.add_argument("--no-memory", action="store_true", help="Skip memory pass")
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    levels = [int(level) for level in args.agents.split(",") if level]
+
+    sim = PiKvmSimulator(
+        SimulatorConfig(
+            latency_ms=args.device_latency_ms, jitter_ms=args.device_jitter_ms, seed=0
+        )
+    ).start()
+    model = MockModelServer(
+        MockModelConfig(
+            latency_ms=args.model_latency_ms, jitter_ms=args.model_jitter_ms, seed=0
+        )
+    ).start()
+    configure_client(sim.base_url)
+
+    results: dict[str, Any] = {
+        "config": vars(args),
+        "levels": [],
+    }
+    try:
+        for count in levels:
+            sim.reset()
+            level = bench_level(
+                count, model.base_url, args.task, args.max_steps, not args.no_memory
+            )
+            level["hid_events"] = len(sim.events)
+            results["levels"].append(level)
+            print(
+                f"agents={count:<3} steps/s={level['steps_per_s']:.2f} "
+                f"wall={level['wall_s']:.2f}s"
+            )
+            for phase, stats in level["phases"].items():
+                print(f"    {phase:<10} p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms")
+    finally:
+        model.stop()
+        sim.stop()
+
+    write_results("agent", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
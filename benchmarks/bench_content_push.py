@@ -0,0 +1,192 @@
+"""Handoff latency of polling, long-polling and SSE push on the content server.
+
+Runs the FastAPI content server with uvicorn in a background thread of this
+process, posts payloads like the agent does and measures how long each one
+takes to reach a Shortcut-like reader:
+
+- poll: `GET /content` on a fixed interval (the original Shortcut behaviour)
+- longpoll: `GET /content?after=<seq>&wait=<s>`
+- push: one `GET /content/stream` Server-Sent Events connection
+
+Usage:
+    python -m benchmarks.bench_content_push --posts 50 --poll-interval-ms 250
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+from typing import Any
+
+import httpx
+import uvicorn
+
+from benchmarks.common import summarize, write_results
+from iphone_agent.fastapi_main import app
+
+MODES = ("poll", "longpoll", "push")
+
+
+class ServerThread:
+    """uvicorn serving the content server from a daemon thread."""
+
+    def __init__(self) -> None:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        config = uvicorn.Config(
+            app,
+            host="127.0.0.1",
+            port=self.port,
+            log_level="warning",
+            timeout_graceful_shutdown=1,
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "ServerThread":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+async def poll_reader(
+    http: httpx.AsyncClient, url: str, received: asyncio.Queue, interval: float, stop
+) -> int:
+    requests = 0
+    seen = (await http.get(url)).json()["seq"]
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        data = (await http.get(url)).json()
+        requests += 1
+        if data["seq"] != seen:
+            seen = data["seq"]
+            received.put_nowait((seen, time.perf_counter()))
+    return requests
+
+
+async def longpoll_reader(
+    http: httpx.AsyncClient, url: str, received: asyncio.Queue, interval: float, stop
+) -> int:
+    requests = 0
+    after = (await http.get(url)).json()["seq"]
+    while not stop.is_set():
+        data = (await http.get(url, params={"after": after, "wait": 1})).json()
+        requests += 1
+        if data["updated"]:
+            after = data["seq"]
+            received.put_nowait((after, time.perf_counter()))
+    return requests
+
+
+async def push_reader(
+    http: httpx.AsyncClient, url: str, received: asyncio.Queue, interval: float, stop
+) -> int:
+    async with http.stream("GET", f"{url}/stream") as resp:
+        stop.connected.set()
+        async for line in resp.aiter_lines():
+            if line.startswith("data: "):
+                received.put_nowait((json.loads(line[6:])["seq"], time.perf_counter()))
+            if stop.is_set():
+                break
+    return 1
+
+
+READERS = {"poll": poll_reader, "longpoll": longpoll_reader, "push": push_reader}
+
+
+class _Stop(asyncio.Event):
+    """Stop flag for a reader, plus a flag set once a push stream is open."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.connected = asyncio.Event()
+
+
+async def run_mode(
+    base_url: str, mode: str, posts: int, poll_interval: float, gap: tuple[float, float]
+) -> dict[str, Any]:
+    url = f"{base_url}/devices/bench-{mode}/content"
+    received: asyncio.Queue = asyncio.Queue()
+    stop = _Stop()
+    latencies: list[float] = []
+    async with httpx.AsyncClient(timeout=10) as reader_http, httpx.AsyncClient(
+        timeout=10
+    ) as writer_http:
+        reader = asyncio.create_task(
+            READERS[mode](reader_http, url, received, poll_interval, stop)
+        )
+        if mode == "push":
+            await stop.connected.wait()
+        else:
+            await asyncio.sleep(0.1)
+        for i in range(posts):
+            await asyncio.sleep(random.uniform(*gap))
+            posted_at = time.perf_counter()
+            seq = (await writer_http.post(url, json={"content": f"{mode}-{i}"})).json()["seq"]
+            while True:
+                got, at = await received.get()
+                if got >= seq:
+                    latencies.append(at - posted_at)
+                    break
+        stop.set()
+        # One more post unblocks readers that are waiting for content.
+        await writer_http.post(url, json={"content": "stop"})
+        requests = await reader
+    return {
+        "mode": mode,
+        "handoff": summarize(latencies),
+        "reader_requests": requests,
+        "requests_per_handoff": requests / posts,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Content handoff: polling vs push")
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--poll-interval-ms", type=float, default=250.0)
+    parser.add_argument("--min-gap-ms", type=float, default=20.0)
+    parser.add_argument("--max-gap-ms", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    random.seed(args.seed)
+    server = ServerThread().start()
+    gap = (args.min_gap_ms / 1000.0, args.max_gap_ms / 1000.0)
+    results: dict[str, Any] = {"config": vars(args), "modes": []}
+    try:
+        for mode in MODES:
+            result = asyncio.run(
+                run_mode(server.base_url, mode, args.posts, args.poll_interval_ms / 1000.0, gap)
+            )
+            results["modes"].append(result)
+            print(
+                f"{mode:<9} handoff p50={result['handoff']['p50_ms']:.2f}ms "
+                f"p99={result['handoff']['p99_ms']:.2f}ms "
+                f"reader requests/handoff={result['requests_per_handoff']:.2f}"
+            )
+    finally:
+        server.stop()
+    write_results("content_push", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Load benchmark of the per-device content channels.
+
+Every simulated device runs a Shortcut-like reader that long-polls
+`/devices/{id}/content` and an agent-like writer that posts payloads to the
+same channel. Requests go through httpx's in-process ASGI transport, so the
+numbers measure the server code rather than the network (client and server
+share one CPU, so the saturation point is a lower bound).
+
+A second pass measures the channel registry alone: lookup+publish cost and
+memory per channel, and LRU eviction once more devices than `--max-channels`
+have posted.
+
+Usage:
+    python -m benchmarks.bench_content_server --devices 100,500 --posts 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import Any
+
+import httpx
+
+from benchmarks.common import summarize, write_results
+from iphone_agent import fastapi_main
+from iphone_agent.content_channel import ChannelRegistry
+
+
+async def run_device(
+    http: httpx.AsyncClient, device_id: str, posts: int, interval: float
+) -> list[float]:
+    """Post `posts` payloads and return the post-to-read latency of each."""
+    url = f"/devices/{device_id}/content"
+    posted_at: dict[int, float] = {}
+    latencies: list[float] = []
+
+    async def reader() -> None:
+        after = 0
+        while len(latencies) < posts:
+            resp = await http.get(url, params={"after": after, "wait": 5})
+            data = resp.json()
+            if data.get("updated"):
+                after = data["seq"]
+                latencies.append(time.perf_counter() - posted_at[after])
+
+    async def writer() -> None:
+        for i in range(posts):
+            await asyncio.sleep(interval)
+            # The sequence number is known before the response arrives.
+            posted_at[i + 1] = time.perf_counter()
+            await http.post(url, json={"content": f"{device_id}-{i}"})
+
+    await asyncio.gather(reader(), writer())
+    return latencies
+
+
+async def run_level(
+    devices: int, posts: int, interval: float, max_channels: int
+) -> dict[str, Any]:
+    fastapi_main.DEVICE_CHANNELS = ChannelRegistry(max_channels)
+    transport = httpx.ASGITransport(app=fastapi_main.app)
+    limits = httpx.Limits(max_connections=None)
+    start = time.perf_counter()
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", limits=limits
+    ) as http:
+        results = await asyncio.gather(
+            *(run_device(http, f"device-{i}", posts, interval) for i in range(devices))
+        )
+    elapsed = time.perf_counter() - start
+
+    latencies = [value for result in results for value in result]
+    registry = fastapi_main.DEVICE_CHANNELS
+    return {
+        "devices": devices,
+        "elapsed_s": elapsed,
+        "deliveries": len(latencies),
+        "deliveries_per_s": len(latencies) / elapsed,
+        "handoff": summarize(latencies),
+        "channels": len(registry),
+        "evictions": registry.evictions,
+    }
+
+
+def measure_registry(devices: int, max_channels: int) -> dict[str, Any]:
+    """Lookup+publish latency and memory of the registry without HTTP."""
+    registry = ChannelRegistry(max_channels)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(devices):
+        registry.get(f"device-{i}").publish(f"payload-{i}")
+    fill = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples = []
+    for i in range(devices):
+        t0 = time.perf_counter()
+        registry.get(f"device-{i}").publish("again")
+        samples.append(time.perf_counter() - t0)
+    return {
+        "devices": devices,
+        "fill_s": fill,
+        "get_publish": summarize(samples),
+        "channels": len(registry),
+        "evictions": registry.evictions,
+        "memory_mb": current / 1e6,
+        "bytes_per_channel": current / len(registry),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Content server load benchmark")
+    parser.add_argument("--devices", type=str, default="100,500", help="Comma-separated")
+    parser.add_argument("--posts", type=int, default=5, help="Payloads per device")
+    parser.add_argument("--interval-ms", type=float, default=50.0, help="Pause between posts")
+    parser.add_argument("--max-channels", type=int, default=1024)
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    results: dict[str, Any] = {"config": vars(args), "levels": []}
+    for devices in (int(v) for v in args.devices.split(",")):
+        level = asyncio.run(
+            run_level(devices, args.posts, args.interval_ms / 1000.0, args.max_channels)
+        )
+        results["levels"].append(level)
+        print(
+            f"devices={devices:<5} deliveries/s={level['deliveries_per_s']:.0f} "
+            f"handoff p50={level['handoff']['p50_ms']:.1f}ms "
+            f"p99={level['handoff']['p99_ms']:.1f}ms "
+            f"channels={level['channels']}"
+        )
+        registry = measure_registry(devices * 10, args.max_channels)
+        results.setdefault("registry", []).append(registry)
+        print(
+            f"  registry devices={registry['devices']:<6} "
+            f"get+publish p50={registry['get_publish']['p50_ms'] * 1000:.1f}us "
+            f"channels={registry['channels']} evictions={registry['evictions']} "
+            f"bytes/channel={registry['bytes_per_channel']:.0f}"
+        )
+    write_results("content_server", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark of actual gesture duration compared with the requested duration.
+
+Runs every gesture profile against the PiKVM simulator at several transport
+latencies and reports motion time, overshoot and HID events per gesture.
+
+Usage:
+    python -m benchmarks.bench_gesture --latencies 0,10,30 --iterations 5
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Any
+
+from benchmarks.common import summarize, write_results
+from iphone_agent.idb.connection import configure_client
+from iphone_agent.idb.gesture import PROFILES, move_latency, perform_gesture
+from iphone_agent.idb.simulator import PiKvmSimulator, SimulatorConfig
+
+START = (0, 10000)
+END = (0, -10000)
+
+
+def bench_profile(
+    sim: PiKvmSimulator, profile_name: str, duration_ms: float, iterations: int
+) -> dict[str, Any]:
+    profile = PROFILES[profile_name]
+    motion = []
+    total = []
+    events = []
+    for _ in range(iterations):
+        sim.clear_events()
+        result = perform_gesture(START, END, profile=profile, duration_ms=duration_ms)
+        motion.append(result.motion_ms / 1000.0)
+        total.append(result.total_ms / 1000.0)
+        events.append(len(sim.events))
+    motion_stats = summarize(motion)
+    return {
+        "profile": profile_name,
+        "requested_ms": duration_ms,
+        "motion": motion_stats,
+        "total": summarize(total),
+        "overshoot_ms": motion_stats["p50_ms"] - duration_ms,
+        "hid_events_per_gesture": sum(events) / len(events),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Gesture duration benchmark")
+    parser.add_argument("--latencies", type=str, default="0,10,30", help="Device ms")
+    parser.add_argument("--durations", type=str, default="150,400,1000", help="Motion ms")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    latencies = [float(v) for v in args.latencies.split(",") if v]
+    durations = [float(v) for v in args.durations.split(",") if v]
+
+    sim = PiKvmSimulator(SimulatorConfig()).start()
+    configure_client(sim.base_url)
+    runs = []
+    try:
+        for latency_ms in latencies:
+            sim.config.latency_ms = latency_ms
+            # Warm up the move latency estimate for this transport.
+            perform_gesture(START, END, duration_ms=100)
+            for profile_name in PROFILES:
+                for duration_ms in durations:
+                    run = bench_profile(sim, profile_name, duration_ms, args.iterations)
+                    run["device_latency_ms"] = latency_ms
+                    run["estimated_move_latency_ms"] = move_latency.value * 1000.0
+                    runs.append(run)
+                    print(
+                        f"latency={latency_ms:>4.0f}ms {profile_name:<7} "
+                        f"requested={duration_ms:>5.0f}ms "
+                        f"actual={run['motion']['p50_ms']:>7.1f}ms "
+                        f"events={run['hid_events_per_gesture']:.0f}"
+                    )
+    finally:
+        sim.stop()
+
+    write_results("gesture", {"config": vars(args), "runs": runs}, args.output)
+
+
+if __name__ == "__main__":
+    main()
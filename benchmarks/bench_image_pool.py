@@ -0,0 +1,101 @@
+"""Screenshot processing throughput with the image executor.
+
+N agent threads each crop and PNG-encode M simulator snapshots through
+`_process_snapshot`, with the executor inline (on the agent threads), as a
+thread pool and as a process pool of each worker count. Reports frames per
+second and frames per second per core used.
+
+Usage:
+    python -m benchmarks.bench_image_pool --agents 16 --workers 1,2,4 --frames 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from benchmarks.common import write_results
+from iphone_agent.idb.image_executor import configure_image_executor
+from iphone_agent.idb.screenshot import _process_snapshot
+from iphone_agent.idb.simulator import SimulatedScreen
+
+
+def bench_mode(
+    kind: str, workers: int | None, snapshot: bytes, agents: int, frames: int
+) -> dict[str, Any]:
+    executor = configure_image_executor(kind, workers)
+    try:
+        # Start the pool (and spawn worker processes) outside the timing.
+        for _ in range(executor.workers):
+            _process_snapshot(snapshot)
+
+        def run_agent(_: int) -> None:
+            for _ in range(frames):
+                _process_snapshot(snapshot)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=agents) as pool:
+            list(pool.map(run_agent, range(agents)))
+        wall = time.perf_counter() - start
+    finally:
+        executor.shutdown()
+
+    cpus = os.cpu_count() or 1
+    cores = min(agents if kind == "inline" else executor.workers, cpus)
+    fps = agents * frames / wall if wall else 0.0
+    return {
+        "kind": kind,
+        "workers": None if kind == "inline" else executor.workers,
+        "frames": agents * frames,
+        "wall_s": wall,
+        "fps": fps,
+        "fps_per_core": fps / cores,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Image executor throughput benchmark")
+    parser.add_argument("--agents", type=int, default=16, help="Concurrent agent threads")
+    parser.add_argument("--frames", type=int, default=20, help="Frames per agent")
+    parser.add_argument(
+        "--workers", type=str, default="1,2,4", help="Comma-separated pool sizes"
+    )
+    parser.add_argument(
+        "--kinds", type=str, default="inline,thread,process", help="Executor kinds"
+    )
+    parser.add_argument("--frame-size", type=str, default="1920x1080")
+    parser.add_argument("--screen-size", type=str, default="498x1080")
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    frame_size = tuple(int(v) for v in args.frame_size.split("x"))
+    screen_size = tuple(int(v) for v in args.screen_size.split("x"))
+    snapshot = SimulatedScreen(screen_size=screen_size, frame_size=frame_size).snapshot()
+    worker_counts = [int(w) for w in args.workers.split(",") if w]
+
+    results: dict[str, Any] = {
+        "config": vars(args),
+        "cpu_count": os.cpu_count(),
+        "snapshot_bytes": len(snapshot),
+        "modes": [],
+    }
+    for kind in args.kinds.split(","):
+        for workers in [None] if kind == "inline" else worker_counts:
+            result = bench_mode(kind, workers, snapshot, args.agents, args.frames)
+            results["modes"].append(result)
+            label = kind if workers is None else f"{kind}:{workers}"
+            print(
+                f"{label:<10} fps={result['fps']:.1f} "
+                f"fps/core={result['fps_per_core']:.1f} wall={result['wall_s']:.2f}s"
+            )
+    write_results("image_pool", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
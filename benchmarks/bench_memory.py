@@ -0,0 +1,127 @@
+"""Memory held per agent for screenshots and request bodies.
+
+Two measurements, both with tracemalloc:
+
+- ``step``: peak memory of turning one screenshot into a request body, with
+  the previous representation (base64 `str`, f-string data URL, `json.dumps`
+  of the whole context) and the current one (`Screenshot` with a cached data
+  URL, `MessageContext`, image released after the request).
+- ``agents``: peak memory per agent while N agents run concurrently against
+  the PiKVM simulator and the scripted model server.
+
+Usage:
+    python -m benchmarks.bench_memory --agents 64 --image-kb 600
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import tracemalloc
+from typing import Any, Callable
+
+from benchmarks.bench_agent import run_agents
+from benchmarks.common import write_results
+from benchmarks.mock_model import MockModelConfig, MockModelServer
+from iphone_agent.config import get_system_prompt
+from iphone_agent.idb.connection import configure_client
+from iphone_agent.idb.screenshot import Screenshot
+from iphone_agent.idb.simulator import PiKvmSimulator, SimulatorConfig
+from iphone_agent.model import MessageContext
+from iphone_agent.model.client import MessageBuilder
+
+
+def traced_peak(fn: Callable[[], Any]) -> int:
+    """Peak bytes allocated while `fn` runs, above what was allocated before."""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def bench_step(png: bytes) -> dict[str, Any]:
+    system = MessageBuilder.create_system_message(get_system_prompt("cn"))
+
+    def legacy() -> None:
+        base64_data = base64.b64encode(png).decode("utf-8")
+        message = MessageBuilder.create_user_message("** Screen Info **", base64_data)
+        body = json.dumps({"messages": [system, message]}, ensure_ascii=False).encode("utf-8")
+        del body
+        MessageBuilder.remove_images_from_message(message)
+
+    def lean() -> None:
+        screenshot = Screenshot(png, 1170, 2532)
+        context = MessageContext([system])
+        context.append(
+            MessageBuilder.create_user_message(
+                "** Screen Info **", image_url=screenshot.data_url_bytes
+            )
+        )
+        body = context.body()
+        del body
+        context[-1] = MessageBuilder.remove_images_from_message(context[-1])
+        screenshot.release()
+
+    legacy_peak = traced_peak(legacy)
+    lean_peak = traced_peak(lean)
+    return {
+        "png_bytes": len(png),
+        "legacy_peak_bytes": legacy_peak,
+        "lean_peak_bytes": lean_peak,
+        "legacy_x_png": legacy_peak / len(png),
+        "lean_x_png": lean_peak / len(png),
+    }
+
+
+def bench_agents(count: int, max_steps: int, model_latency_ms: float) -> dict[str, Any]:
+    sim = PiKvmSimulator(SimulatorConfig(seed=0)).start()
+    model = MockModelServer(MockModelConfig(latency_ms=model_latency_ms, seed=0)).start()
+    configure_client(sim.base_url)
+    try:
+        task = "Open the first app and browse"
+        # Warm-up run so imports and caches are not counted.
+        run_agents(1, model.base_url, task, max_steps)
+        peak = traced_peak(lambda: run_agents(count, model.base_url, task, max_steps))
+    finally:
+        model.stop()
+        sim.stop()
+    return {"agents": count, "peak_bytes": peak, "peak_per_agent_bytes": peak / count}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Screenshot and request memory benchmark")
+    parser.add_argument("--agents", type=int, default=64)
+    parser.add_argument("--max-steps", type=int, default=5)
+    parser.add_argument("--model-latency-ms", type=float, default=200.0)
+    parser.add_argument(
+        "--image-kb", type=int, default=600, help="PNG size for the single-step measurement"
+    )
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    # Incompressible bytes stand in for a PNG; only the size matters here.
+    step = bench_step(os.urandom(args.image_kb * 1024))
+    print(
+        f"step   png={step['png_bytes'] / 1024:.0f}KiB "
+        f"legacy={step['legacy_peak_bytes'] / 1024:.0f}KiB ({step['legacy_x_png']:.1f}x) "
+        f"lean={step['lean_peak_bytes'] / 1024:.0f}KiB ({step['lean_x_png']:.1f}x)"
+    )
+    agents = bench_agents(args.agents, args.max_steps, args.model_latency_ms)
+    print(
+        f"agents={agents['agents']} peak={agents['peak_bytes'] / 2**20:.1f}MiB "
+        f"per agent={agents['peak_per_agent_bytes'] / 1024:.0f}KiB"
+    )
+    write_results("memory", {"config": vars(args), "step": step, "agents": agents}, args.output)
+
+
+if __name__ == "__main__":
+    main()
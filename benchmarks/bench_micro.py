@@ -0,0 +1,112 @@
+"""Micro-benchmarks of the hot paths of one agent step.
+
+Covers screenshot crop and encode, `parse_action`, `ModelClient._parse_response`
+and swipe HID event generation (against the zero-latency PiKVM simulator).
+
+Usage:
+    python -m benchmarks.bench_micro --iterations 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any
+
+from benchmarks.common import summarize, time_calls, write_results
+from benchmarks.mock_model import DEFAULT_SCRIPT
+from iphone_agent.actions.handler import parse_action
+from iphone_agent.idb import get_screenshot, swipe
+from iphone_agent.idb.connection import client, configure_client
+from iphone_agent.idb.screenshot import _process_snapshot
+from iphone_agent.idb.simulator import PiKvmSimulator, SimulatorConfig
+from iphone_agent.model import ModelClient, ModelConfig
+
+
+def bench_screenshot(iterations: int) -> dict[str, Any]:
+    snapshot = client.request("/streamer/snapshot", "GET").body
+    return {
+        "snapshot_bytes": len(snapshot),
+        "fetch": time_calls(lambda: client.request("/streamer/snapshot", "GET"), iterations),
+        "crop_encode": time_calls(lambda: _process_snapshot(snapshot), iterations),
+        "get_screenshot": time_calls(get_screenshot, iterations),
+    }
+
+
+def bench_parsing(iterations: int) -> dict[str, Any]:
+    model_client = ModelClient(ModelConfig(base_url="http://127.0.0.1:9/v1"))
+    parsed = [model_client._parse_response(raw) for raw in DEFAULT_SCRIPT]
+    actions = [action for _, action in parsed]
+
+    def parse_responses() -> None:
+        for raw in DEFAULT_SCRIPT:
+            model_client._parse_response(raw)
+
+    def parse_actions() -> None:
+        for action in actions:
+            parse_action(action)
+
+    per_batch = len(DEFAULT_SCRIPT)
+    response_stats = time_calls(parse_responses, iterations)
+    action_stats = time_calls(parse_actions, iterations)
+    response_stats["ops_per_s"] *= per_batch
+    action_stats["ops_per_s"] *= per_batch
+    return {"parse_response": response_stats, "parse_action": action_stats}
+
+
+def bench_swipe(sim: PiKvmSimulator, iterations: int) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    for duration_ms in (300, 1000):
+        samples = []
+        events = []
+        for _ in range(iterations):
+            sim.clear_events()
+            start = time.perf_counter()
+            swipe(0, 10000, 0, -10000, duration_ms=duration_ms, delay=0)
+            samples.append(time.perf_counter() - start)
+            events.append(len(sim.events))
+        results[f"{duration_ms}ms"] = {
+            "requested_ms": duration_ms,
+            "actual": summarize(samples),
+            "hid_events_per_swipe": sum(events) / len(events),
+        }
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Phone Agent micro-benchmarks")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--swipe-iterations", type=int, default=5)
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    sim = PiKvmSimulator(SimulatorConfig()).start()
+    configure_client(sim.base_url)
+    try:
+        results = {
+            "config": vars(args),
+            "screenshot": bench_screenshot(args.iterations),
+            "parsing": bench_parsing(args.iterations),
+            "swipe": bench_swipe(sim, args.swipe_iterations),
+        }
+    finally:
+        sim.stop()
+
+    for name, stats in results["screenshot"].items():
+        if isinstance(stats, dict):
+            print(f"screenshot.{name:<15} p50={stats['p50_ms']:.2f}ms")
+    for name, stats in results["parsing"].items():
+        print(f"parsing.{name:<18} {stats['ops_per_s']:.0f} ops/s")
+    for name, stats in results["swipe"].items():
+        print(
+            f"swipe.{name:<20} actual p50={stats['actual']['p50_ms']:.0f}ms "
+            f"events={stats['hid_events_per_swipe']:.0f}"
+        )
+    write_results("micro", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
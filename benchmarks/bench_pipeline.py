@@ -0,0 +1,103 @@
+"""Wall-clock time per step of the sequential and pipelined agent loops.
+
+Runs the same scripted task against the PiKVM simulator, whose snapshots show
+a state change only after ``--settle-ms``, with the default timing profile:
+
+- ``sequential``: each action sleeps its timing-profile delay, then the next
+  step takes the screenshot and builds and encodes the request.
+- ``pipelined``: the settle delay is replaced by polling frames on a thread
+  until the screen changed and is stable (at most the same delay); the
+  screenshot, message and encoding of the next step are ready on that thread
+  while the current step records its context and logs.
+
+Reports per-step wall time, the time saved per step and the settle waits.
+
+Usage:
+    python -m benchmarks.bench_pipeline --tasks 5 --settle-ms 300 --model-latency-ms 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any
+
+from benchmarks.common import summarize, write_results
+from benchmarks.mock_model import MockModelConfig, MockModelServer
+from iphone_agent.agent import AgentConfig, PhoneAgent
+from iphone_agent.idb.connection import configure_client
+from iphone_agent.idb.simulator import PiKvmSimulator, SimulatorConfig
+from iphone_agent.model import ModelConfig
+
+
+def bench_mode(
+    pipeline: bool, model_base_url: str, tasks: int, task: str, max_steps: int
+) -> dict[str, Any]:
+    agent = PhoneAgent(
+        model_config=ModelConfig(base_url=model_base_url, model_name="mock"),
+        agent_config=AgentConfig(max_steps=max_steps, verbose=False, pipeline=pipeline),
+    )
+    step_times: list[float] = []
+    for _ in range(tasks):
+        agent.reset()
+        result = None
+        while agent.step_count < max_steps and (result is None or not result.finished):
+            start = time.perf_counter()
+            result = agent.step(task if result is None else None)
+            step_times.append(time.perf_counter() - start)
+    return {
+        "mode": "pipelined" if pipeline else "sequential",
+        "steps": len(step_times),
+        "step_latency": summarize(step_times),
+        "mean_step_ms": sum(step_times) * 1000.0 / len(step_times) if step_times else 0.0,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pipelined agent loop benchmark")
+    parser.add_argument("--tasks", type=int, default=5)
+    parser.add_argument("--max-steps", type=int, default=8)
+    parser.add_argument("--settle-ms", type=float, default=300.0)
+    parser.add_argument("--device-latency-ms", type=float, default=5.0)
+    parser.add_argument("--model-latency-ms", type=float, default=200.0)
+    parser.add_argument("--task", type=str, default="Open the first app and browse")
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    sim = PiKvmSimulator(
+        SimulatorConfig(latency_ms=args.device_latency_ms, settle_ms=args.settle_ms, seed=0)
+    ).start()
+    model = MockModelServer(MockModelConfig(latency_ms=args.model_latency_ms, seed=0)).start()
+    configure_client(sim.base_url)
+
+    results: dict[str, Any] = {"config": vars(args), "modes": []}
+    try:
+        for pipeline in (False, True):
+            sim.reset()
+            result = bench_mode(pipeline, model.base_url, args.tasks, args.task, args.max_steps)
+            results["modes"].append(result)
+            print(
+                f"{result['mode']:<10} steps={result['steps']} "
+                f"mean={result['mean_step_ms']:.0f}ms "
+                f"p50={result['step_latency']['p50_ms']:.0f}ms "
+                f"p99={result['step_latency']['p99_ms']:.0f}ms"
+            )
+    finally:
+        model.stop()
+        sim.stop()
+
+    sequential, pipelined = results["modes"]
+    saved = sequential["mean_step_ms"] - pipelined["mean_step_ms"]
+    results["saved_per_step_ms"] = saved
+    print(
+        f"saved per step: {saved:.0f}ms "
+        f"({saved / sequential['mean_step_ms']:.0%} of the sequential step)"
+    )
+    write_results("pipeline", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Publish latency of the content publishers.
+
+Compares a fresh `requests.post` per call (the previous behaviour), the pooled
+`HttpContentPublisher` and the `InProcessContentPublisher`, against the
+content server running with uvicorn in this process.
+
+Usage:
+    python -m benchmarks.bench_publish --iterations 500
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Any
+
+import requests
+
+from benchmarks.bench_content_push import ServerThread
+from benchmarks.common import time_calls, write_results
+from iphone_agent.idb import connection
+from iphone_agent.idb.publisher import HttpContentPublisher, InProcessContentPublisher
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Content publisher benchmark")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    server = ServerThread().start()
+    connection.CONTENT_SERVER_URL = server.base_url
+    url = connection.content_url("bench")
+    pooled = HttpContentPublisher()
+    in_process = InProcessContentPublisher()
+
+    def unpooled() -> None:
+        requests.post(url, json={"content": "x", "launch_app": False}).raise_for_status()
+
+    cases = {
+        "requests_post": unpooled,
+        "http_pooled": lambda: pooled.publish("x", device_id="bench"),
+        "inprocess": lambda: in_process.publish("x", device_id="bench"),
+    }
+    results: dict[str, Any] = {"config": vars(args), "cases": {}}
+    try:
+        for name, fn in cases.items():
+            summary = time_calls(fn, args.iterations)
+            results["cases"][name] = summary
+            print(
+                f"{name:<14} p50={summary['p50_ms']:.3f}ms p99={summary['p99_ms']:.3f}ms "
+                f"ops/s={summary['ops_per_s']:.0f}"
+            )
+    finally:
+        pooled.close()
+        server.stop()
+    results["publisher_stats"] = {
+        "http_pooled": pooled.snapshot(),
+        "inprocess": in_process.snapshot(),
+    }
+    write_results("publish", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Latency and success rate of tiered model routing.
+
+Runs the same tasks with three model setups against the PiKVM simulator:
+
+- ``main``: every step goes to the large model (the previous behaviour).
+- ``fast``: every step goes to the small model, invalid outputs included.
+- ``tiered``: the small model first, escalating to the large model when its
+  output does not parse or validate.
+
+Both models are scripted mock servers; the fast one answers with lower latency
+but returns an unusable action for ``--fast-error-rate`` of its responses. A
+task succeeds when it finishes without a failed step.
+
+Usage:
+    python -m benchmarks.bench_routing --tasks 20 --main-latency-ms 800 --fast-latency-ms 150
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any
+
+from benchmarks.common import PhaseRecorder, summarize, write_results
+from benchmarks.mock_model import MockModelConfig, MockModelServer
+from iphone_agent.agent import AgentConfig, PhoneAgent
+from iphone_agent.idb.connection import configure_client
+from iphone_agent.idb.simulator import PiKvmSimulator, SimulatorConfig
+from iphone_agent.model import ModelClient, ModelConfig
+
+
+def instrument(recorder: PhaseRecorder):
+    """Record the latency of every model request under its tier."""
+    original = ModelClient._request_tier
+
+    def wrapper(self, tier, messages):
+        with recorder.measure(tier):
+            return original(self, tier, messages)
+
+    ModelClient._request_tier = wrapper
+
+    def restore() -> None:
+        ModelClient._request_tier = original
+
+    return restore
+
+
+def run_task(agent: PhoneAgent, task: str) -> tuple[bool, int, float]:
+    """Run one task step by step; returns (success, steps, seconds)."""
+    agent.reset()
+    start = time.perf_counter()
+    result = agent.step(task)
+    success = result.success
+    while not result.finished and agent.step_count < agent.agent_config.max_steps:
+        result = agent.step()
+        success = success and result.success
+    return success and result.finished, agent.step_count, time.perf_counter() - start
+
+
+def bench_mode(
+    mode: str, main_url: str, fast_url: str, tasks: int, task: str, max_steps: int
+) -> dict[str, Any]:
+    if mode == "main":
+        model_config = ModelConfig(base_url=main_url, model_name="main")
+    elif mode == "fast":
+        model_config = ModelConfig(base_url=fast_url, model_name="fast")
+    else:
+        model_config = ModelConfig(
+            base_url=main_url,
+            model_name="main",
+            fast_model_name="fast",
+            fast_base_url=fast_url,
+        )
+    agent = PhoneAgent(
+        model_config=model_config,
+        agent_config=AgentConfig(max_steps=max_steps, verbose=False),
+    )
+
+    recorder = PhaseRecorder()
+    restore = instrument(recorder)
+    successes = 0
+    steps = 0
+    durations = []
+    try:
+        for _ in range(tasks):
+            success, task_steps, seconds = run_task(agent, task)
+            successes += success
+            steps += task_steps
+            durations.append(seconds)
+    finally:
+        restore()
+
+    return {
+        "mode": mode,
+        "tasks": tasks,
+        "success_rate": successes / tasks if tasks else 0.0,
+        "steps": steps,
+        "task_latency": summarize(durations),
+        "step_latency_ms": sum(durations) * 1000.0 / steps if steps else 0.0,
+        "tiers": agent.model_client.tier_counts,
+        "tier_latency": recorder.summary(),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Tiered model routing benchmark")
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--main-latency-ms", type=float, default=800.0)
+    parser.add_argument("--fast-latency-ms", type=float, default=150.0)
+    parser.add_argument("--fast-error-rate", type=float, default=0.2)
+    parser.add_argument("--device-latency-ms", type=float, default=10.0)
+    parser.add_argument("--max-steps", type=int, default=20)
+    parser.add_argument("--task", type=str, default="Open the first app and browse")
+    parser.add_argument(
+        "--modes", type=str, default="main,fast,tiered", help="Comma-separated modes"
+    )
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    sim = PiKvmSimulator(
+        SimulatorConfig(latency_ms=args.device_latency_ms, seed=0)
+    ).start()
+    main_model = MockModelServer(
+        MockModelConfig(latency_ms=args.main_latency_ms, seed=0)
+    ).start()
+    fast_model = MockModelServer(
+        MockModelConfig(
+            latency_ms=args.fast_latency_ms, error_rate=args.fast_error_rate, seed=0
+        )
+    ).start()
+    configure_client(sim.base_url)
+
+    results: dict[str, Any] = {"config": vars(args), "modes": []}
+    try:
+        for mode in args.modes.split(","):
+            sim.reset()
+            result = bench_mode(
+                mode,
+                main_model.base_url,
+                fast_model.base_url,
+                args.tasks,
+                args.task,
+                args.max_steps,
+            )
+            results["modes"].append(result)
+            tiers = result["tiers"]
+            print(
+                f"{mode:<7} success={result['success_rate']:.0%} "
+                f"task p50={result['task_latency']['p50_ms']:.0f}ms "
+                f"step={result['step_latency_ms']:.0f}ms "
+                f"fast={tiers['fast']} main={tiers['main']} escalated={tiers['escalated']}"
+            )
+            for tier, stats in result["tier_latency"].items():
+                print(f"    {tier:<5} p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms")
+    finally:
+        fast_model.stop()
+        main_model.stop()
+        sim.stop()
+
+    write_results("routing", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""CPU time of building the model request body as the context grows.
+
+Builds the context of step N the way the agent does (system prompt, one user
+and one assistant message per earlier step, images stripped, and the newest
+user message with a screenshot), then measures building the request body:
+
+- ``full``: `json.dumps` of the whole message list, what the OpenAI SDK does
+  on every request (a lower bound: the SDK also walks the messages first).
+- ``incremental``: `MessageContext` encodes the newest message and joins the
+  bytes stored for the earlier ones.
+
+Usage:
+    python -m benchmarks.bench_serialization --steps 1,50,100 --image-kb 600
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import time
+from typing import Any, Callable
+
+from benchmarks.common import write_results
+from iphone_agent.config import get_system_prompt
+from iphone_agent.model import MessageContext
+from iphone_agent.model.client import MessageBuilder
+
+ASSISTANT_TURN = (
+    "<think>The search box is at the top of the screen, tap it to enter the "
+    "keyword.</think><answer>do(action=\"Tap\", element=[500,120])</answer>"
+)
+PARAMS = {
+    "model": "autoglm-phone-9b",
+    "max_tokens": 3000,
+    "temperature": 0.0,
+    "top_p": 0.85,
+    "frequency_penalty": 0.2,
+    "stream": False,
+}
+
+
+def build_history(steps: int) -> list[dict[str, Any]]:
+    """System prompt plus the turns of `steps - 1` earlier steps, images stripped."""
+    messages = [MessageBuilder.create_system_message(get_system_prompt("cn"))]
+    screen_info = MessageBuilder.build_screen_info("iPhone")
+    for step in range(steps - 1):
+        text = f"Task {step}\n\n{screen_info}" if step == 0 else f"** Screen Info **\n\n{screen_info}"
+        messages.append(MessageBuilder.create_user_message(text))
+        messages.append(MessageBuilder.create_assistant_message(ASSISTANT_TURN))
+    return messages
+
+
+def cpu_time(fn: Callable[[], Any], iterations: int) -> float:
+    """Mean process CPU seconds per call."""
+    fn()
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations
+
+
+def bench_step(steps: int, image_base64: str, iterations: int) -> dict[str, Any]:
+    history = build_history(steps)
+    screen_info = MessageBuilder.build_screen_info("iPhone")
+    newest = MessageBuilder.create_user_message(
+        f"** Screen Info **\n\n{screen_info}", image_base64=image_base64
+    )
+    messages = history + [newest]
+    context = MessageContext(history)
+
+    def full() -> bytes:
+        return json.dumps({"messages": messages, **PARAMS}, ensure_ascii=False).encode("utf-8")
+
+    def incremental() -> bytes:
+        context.append(newest)
+        body = context.body(**PARAMS)
+        context.pop()
+        return body
+
+    full_s = cpu_time(full, iterations)
+    incremental_s = cpu_time(incremental, iterations)
+    return {
+        "step": steps,
+        "messages": len(messages),
+        "body_bytes": len(full()),
+        "full_ms": full_s * 1000.0,
+        "incremental_ms": incremental_s * 1000.0,
+        "speedup": full_s / incremental_s if incremental_s else 0.0,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Request body serialization benchmark")
+    parser.add_argument("--steps", type=str, default="1,50,100", help="Comma-separated steps")
+    parser.add_argument("--image-kb", type=int, default=600, help="Screenshot PNG size")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    image_base64 = base64.b64encode(os.urandom(args.image_kb * 1024)).decode("ascii")
+    results: dict[str, Any] = {"config": vars(args), "steps": []}
+    for steps in (int(step) for step in args.steps.split(",") if step):
+        result = bench_step(steps, image_base64, args.iterations)
+        results["steps"].append(result)
+        print(
+            f"step={steps:<4} body={result['body_bytes'] / 1024:.0f}KiB "
+            f"full={result['full_ms']:.3f}ms incremental={result['incremental_ms']:.3f}ms "
+            f"speedup={result['speedup']:.1f}x"
+        )
+    write_results("serialization", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
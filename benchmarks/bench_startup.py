@@ -0,0 +1,129 @@
+"""Import cost of the package and CLI startup time, from ``python -X importtime``.
+
+Each target runs in a fresh interpreter (after one warm-up run that writes the
+bytecode caches) with ``-X importtime``:
+
+- ``iphone_agent``: the bare package, which should load no dependencies.
+- ``iphone_agent.agent``: everything needed to build a PhoneAgent.
+- ``main.py --list-apps``: the CLI path that needs neither the model nor the PiKVM.
+
+Reports the median wall time per target, the cumulative import time of every
+``iphone_agent`` submodule and of the largest third-party packages, and which
+heavy dependencies (openai, cv2, numpy, PIL, requests) were loaded.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+from benchmarks.common import summarize, write_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_PACKAGES = ("openai", "cv2", "numpy", "PIL", "requests")
+
+TARGETS = {
+    "iphone_agent": ["-c", "import iphone_agent"],
+    "iphone_agent.agent": ["-c", "import iphone_agent.agent"],
+    "main.py --list-apps": [os.path.join(ROOT, "main.py"), "--list-apps"],
+}
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """Map module name to (self, cumulative) import microseconds."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header line.
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return modules
+
+
+def run_target(argv: list[str]) -> tuple[float, dict[str, tuple[int, int]]]:
+    """Run one interpreter; returns its wall time and import times."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": ROOT},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, parse_importtime(proc.stderr)
+
+
+def bench_target(name: str, argv: list[str], runs: int, top: int) -> dict[str, Any]:
+    run_target(argv)
+    wall_times = []
+    cumulative: dict[str, list[int]] = {}
+    for _ in range(runs):
+        wall, modules = run_target(argv)
+        wall_times.append(wall)
+        for module, (_, cum) in modules.items():
+            cumulative.setdefault(module, []).append(cum)
+    median_ms = {module: statistics.median(v) / 1000.0 for module, v in cumulative.items()}
+
+    submodules = {
+        module: ms for module, ms in median_ms.items() if module.split(".")[0] == "iphone_agent"
+    }
+    # Top-level third-party and stdlib packages, by their own cumulative time.
+    packages = {
+        module: ms
+        for module, ms in median_ms.items()
+        if "." not in module and module != "iphone_agent" and not module.startswith("_")
+    }
+    return {
+        "target": name,
+        "wall": summarize(wall_times),
+        "modules_imported": len(median_ms),
+        "heavy_loaded": [p for p in HEAVY_PACKAGES if p in median_ms],
+        "submodules_ms": dict(sorted(submodules.items(), key=lambda kv: -kv[1])),
+        "top_packages_ms": dict(sorted(packages.items(), key=lambda kv: -kv[1])[:top]),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Import time and CLI startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Third-party packages to list")
+    parser.add_argument(
+        "--target",
+        action="append",
+        choices=list(TARGETS),
+        help="Target to measure (repeatable; default: all)",
+    )
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    results: dict[str, Any] = {"config": vars(args), "targets": []}
+    for name in args.target or list(TARGETS):
+        result = bench_target(name, TARGETS[name], args.runs, args.top)
+        results["targets"].append(result)
+        print(
+            f"{name:<22} wall p50={result['wall']['p50_ms']:.0f}ms "
+            f"modules={result['modules_imported']} "
+            f"heavy={','.join(result['heavy_loaded']) or '-'}"
+        )
+        for module, ms in list(result["submodules_ms"].items())[: args.top]:
+            print(f"    {module:<40} {ms:8.1f}ms")
+    write_results("startup", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
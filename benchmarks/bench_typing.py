@@ -0,0 +1,106 @@
+"""Benchmark of text entry latency per typing strategy.
+
+Enters sample texts through `ActionHandler` (which picks HID keyboard printing
+or clipboard paste) and directly through each strategy, against the PiKVM
+simulator.
+
+Usage:
+    python -m benchmarks.bench_typing --iterations 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any
+
+from benchmarks.common import summarize, write_results
+from iphone_agent.actions import ActionHandler
+from iphone_agent.actions.handler import TYPING_SECONDS
+from iphone_agent.idb.connection import configure_client
+from iphone_agent.idb.input import (
+    TYPING_STRATEGIES,
+    choose_typing_strategy,
+    copy_text,
+    type_text,
+)
+from iphone_agent.idb.simulator import PiKvmSimulator, SimulatorConfig
+
+SAMPLES = {
+    "ascii_short": "hello",
+    "ascii_query": "wireless earbuds",
+    "cjk": "美食攻略",
+    "ascii_long": "lorem ipsum dolor sit amet " * 4,
+}
+
+
+def time_entry(fn, text: str, iterations: int) -> dict[str, float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(text)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def strategy_stats() -> dict[str, dict[str, float]]:
+    """Count and mean of the `typing_seconds` histogram per strategy."""
+    stats = {}
+    for strategy in TYPING_STRATEGIES:
+        _, total, count = TYPING_SECONDS.labels(strategy).snapshot()
+        stats[strategy] = {
+            "count": int(count),
+            "mean_ms": total / count * 1000.0 if count else 0.0,
+        }
+    return stats
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Typing strategy benchmark")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--device-latency-ms", type=float, default=10.0)
+    parser.add_argument("--key-interval-ms", type=float, default=8.0)
+    parser.add_argument("--output", type=str, default=None, help="Result JSON path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    sim = PiKvmSimulator(
+        SimulatorConfig(
+            latency_ms=args.device_latency_ms, key_interval_ms=args.key_interval_ms
+        )
+    ).start()
+    configure_client(sim.base_url)
+    handler = ActionHandler()
+
+    def handle_type(text: str) -> None:
+        handler.execute({"_metadata": "do", "action": "Type", "text": text}, 1000, 1000)
+
+    results: dict[str, Any] = {"config": vars(args), "texts": {}}
+    try:
+        for name, text in SAMPLES.items():
+            entry = {
+                "chars": len(text),
+                "chosen": choose_typing_strategy(text),
+                "handler": time_entry(handle_type, text, args.iterations),
+                "clipboard": time_entry(copy_text, text, args.iterations),
+            }
+            if choose_typing_strategy(text) == "print":
+                entry["print"] = time_entry(type_text, text, args.iterations)
+            results["texts"][name] = entry
+            print(
+                f"{name:<12} chosen={entry['chosen']:<9} "
+                f"handler p50={entry['handler']['p50_ms']:.0f}ms "
+                f"clipboard p50={entry['clipboard']['p50_ms']:.0f}ms"
+                + (f" print p50={entry['print']['p50_ms']:.0f}ms" if "print" in entry else "")
+            )
+    finally:
+        sim.stop()
+
+    results["strategy_stats"] = strategy_stats()
+    write_results("typing", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Shared helpers for benchmarks: timing, summaries and JSON result files."""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """
+    Summarize latency samples (seconds) into milliseconds.
+
+    Args:
+        samples: Raw samples in seconds.
+
+    Returns:
+        Dict with count, mean, min, max and p50/p90/p99 in milliseconds.
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[index] * 1000.0
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000.0,
+        "min_ms": ordered[0] * 1000.0,
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": ordered[-1] * 1000.0,
+    }
+
+
+def time_calls(fn: Callable[[], Any], iterations: int, warmup: int = 3) -> dict[str, float]:
+    """Call `fn` repeatedly and summarize per-call latency."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    summary = summarize(samples)
+    summary["ops_per_s"] = iterations / sum(samples) if sum(samples) else 0.0
+    return summary
+
+
+class PhaseRecorder:
+    """Thread-safe collector of per-phase latency samples."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._samples: dict[str, list[float]] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(phase, []).append(seconds)
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def wrap(self, phase: str, fn: Callable) -> Callable:
+        """Return `fn` wrapped so every call is recorded under `phase`."""
+
+        def wrapper(*args, **kwargs):
+            with self.measure(phase):
+                return fn(*args, **kwargs)
+
+        wrapper.__wrapped__ = fn  # type: ignore[attr-defined]
+        return wrapper
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {phase: summarize(samples) for phase, samples in self._samples.items()}
+
+
+def environment_info() -> dict[str, Any]:
+    """Describe the machine and revision a benchmark ran on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+def write_results(name: str, results: dict[str, Any], output: str | None = None) -> str:
+    """
+    Write benchmark results as JSON so runs can be compared.
+
+    Args:
+        name: Benchmark name, used in the default file name.
+        results: JSON-serializable results.
+        output: Optional explicit output path.
+
+    Returns:
+        Path of the written file.
+    """
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+    payload = {"benchmark": name, "environment": environment_info(), "results": results}
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {output}")
+    return output
@@ -0,0 +1,331 @@
+"""Scripted OpenAI-compatible model server for benchmarks.
+
+The server replays canned responses: the N-th assistant turn of a conversation
+gets the N-th entry of the script (the last entry repeats once the script is
+exhausted), so any number of concurrent agents can share one server.
+
+Requests with ``"stream": true`` get server-sent events: the first chunk after
+the latency, then one chunk of about one token every ``token_ms``.
+
+Usage:
+    python -m benchmarks.mock_model --port 8000 --latency-ms 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from contextlib import nullcontext
+from typing import Any, ContextManager, Iterator
+
+# Prompt token cost of a screenshot whose size cannot be read.
+IMAGE_TOKENS = 1000
+# Vision encoders typically spend one token per 28x28 pixel patch.
+IMAGE_PATCH = 28
+
+DEFAULT_SCRIPT = [
+    'Open the first app on the home screen.\ndo(action="Tap", element=[150,150])',
+    'Scroll down to see more items.\ndo(action="Swipe", start=[500,700], end=[500,300])',
+    'Select an item in the list.\ndo(action="Tap", element=[500,500])',
+    'Go back to the home screen.\ndo(action="Home")',
+    'The task is done.\nfinish(message="Done")',
+]
+
+
+@dataclass
+class MockModelConfig:
+    """Configuration for the scripted model server."""
+
+    host: str = "127.0.0.1"
+    port: int = 0
+    script: list[str] = field(default_factory=lambda: list(DEFAULT_SCRIPT))
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    seed: int | None = None
+    # Fraction of responses replaced by `error_response` (an unusable action).
+    error_rate: float = 0.0
+    error_response: str = 'Tap the item.\ndo(action="Tapp", element=[500,500])'
+    # Delay between streamed chunks (one per ~4 characters).
+    token_ms: float = 0.0
+    # Requests served at once, like a server's batch slots; others queue (0: no limit).
+    max_batch: int = 0
+
+
+def image_tokens(url: str) -> int:
+    """Patch count of a PNG data URL (IMAGE_TOKENS if not a readable PNG)."""
+    try:
+        header = base64.b64decode(url.split(",", 1)[1][:32])
+        if header[:8] != b"\x89PNG\r\n\x1a\n":
+            return IMAGE_TOKENS
+        width = int.from_bytes(header[16:20], "big")
+        height = int.from_bytes(header[20:24], "big")
+    except (IndexError, ValueError):
+        return IMAGE_TOKENS
+    return math.ceil(width / IMAGE_PATCH) * math.ceil(height / IMAGE_PATCH)
+
+
+def count_prompt_tokens(messages: list[dict[str, Any]]) -> int:
+    """Estimate prompt tokens (about 4 characters per token plus images)."""
+    tokens = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += len(content) // 4
+            continue
+        for item in content or []:
+            if item.get("type") == "image_url":
+                tokens += image_tokens(item["image_url"]["url"])
+            else:
+                tokens += len(item.get("text", "")) // 4
+    return tokens
+
+
+class MockModelServer:
+    """
+    In-process OpenAI-compatible `/v1/chat/completions` server.
+
+    Args:
+        config: Server configuration.
+    """
+
+    def __init__(self, config: MockModelConfig | None = None):
+        self.config = config or MockModelConfig()
+        if not self.config.script:
+            raise ValueError("script must not be empty")
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._slots = (
+            threading.BoundedSemaphore(self.config.max_batch) if self.config.max_batch else None
+        )
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("Mock model server is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockModelServer":
+        if self._server is not None:
+            return self
+        self._server = _Server((self.config.host, self.config.port), _make_handler(self))
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="mock-model", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self) -> "MockModelServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def respond(self, body: dict[str, Any]) -> dict[str, Any]:
+        """Build a chat completion for a request body (sleeps for the latency)."""
+        messages = body.get("messages", [])
+        with self._slot():
+            content = self._reply(messages)
+        prompt_tokens = count_prompt_tokens(messages)
+        completion_tokens = max(1, len(content) // 4)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def stream(self, body: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        """Yield `chat.completion.chunk` objects, sleeping as a streaming server would."""
+        messages = body.get("messages", [])
+        chunk = {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+        }
+        # The slot is held until the last token, as a batch slot would be.
+        with self._slot():
+            content = self._reply(messages)
+            pieces = [content[i : i + 4] for i in range(0, len(content), 4)]
+            for i, piece in enumerate(pieces):
+                if i and self.config.token_ms > 0:
+                    time.sleep(self.config.token_ms / 1000.0)
+                delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+                yield {**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield {**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        if (body.get("stream_options") or {}).get("include_usage"):
+            prompt_tokens = count_prompt_tokens(messages)
+            yield {
+                **chunk,
+                "choices": [],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(pieces),
+                    "total_tokens": prompt_tokens + len(pieces),
+                },
+            }
+
+    def _slot(self) -> ContextManager[Any]:
+        return self._slots if self._slots is not None else nullcontext()
+
+    def _reply(self, messages: list[dict[str, Any]]) -> str:
+        """Scripted content of the next assistant turn (sleeps for the latency)."""
+        turn = sum(1 for m in messages if m.get("role") == "assistant")
+        content = self.config.script[min(turn, len(self.config.script) - 1)]
+
+        latency_ms = self.config.latency_ms
+        with self._lock:
+            self.requests += 1
+            if self.config.jitter_ms:
+                latency_ms += self._rng.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+            if self.config.error_rate and self._rng.random() < self.config.error_rate:
+                content = self.config.error_response
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000.0)
+        return content
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Accept backlog: the default of 5 resets connections under load tests.
+    request_queue_size = 512
+
+
+def _make_handler(server: MockModelServer) -> type[BaseHTTPRequestHandler]:
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(
+                    200, {"object": "list", "data": [{"id": "mock", "object": "model"}]}
+                )
+            else:
+                self._send_json(404, {"error": {"message": "Not found"}})
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b"{}"
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "Not found"}})
+                return
+            try:
+                body = json.loads(raw)
+            except ValueError:
+                self._send_json(400, {"error": {"message": "Invalid JSON"}})
+                return
+            if body.get("stream"):
+                self._send_events(server.stream(body))
+            else:
+                self._send_json(200, server.respond(body))
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def _send_json(self, status: int, payload: Any) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_events(self, chunks: Iterator[dict[str, Any]]) -> None:
+            # No Content-Length: the body ends when the connection closes.
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for chunk in chunks:
+                self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    return _Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scripted OpenAI-compatible model")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--token-ms", type=float, default=0.0, help="Delay between streamed chunks"
+    )
+    parser.add_argument(
+        "--max-batch", type=int, default=0, help="Requests served at once (0: no limit)"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of unusable responses"
+    )
+    parser.add_argument(
+        "--script-file",
+        type=str,
+        default=None,
+        help="JSON list of raw model responses to replay",
+    )
+    args = parser.parse_args()
+
+    config = MockModelConfig(
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        token_ms=args.token_ms,
+        max_batch=args.max_batch,
+    )
+    if args.script_file:
+        with open(args.script_file, encoding="utf-8") as f:
+            config.script = json.load(f)
+
+    server = MockModelServer(config).start()
+    print(f"Mock model listening on {server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
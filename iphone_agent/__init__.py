@@ -3,9 +3,30 @@ Phone Agent - An AI-powered phone automation framework.
 
 This package provides tools for automating Android phone interactions
 using AI models for visual understanding and decision making.
+
+Names are imported on first access so that `import iphone_agent` (and CLI
+paths such as `main.py --list-apps`) do not load the model SDK, OpenCV or
+the PiKVM client.
 """
 
-from iphone_agent.agent import PhoneAgent
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from iphone_agent.agent import AgentConfig, PhoneAgent
 
 __version__ = "0.1.0"
-__all__ = ["iPhoneAgent"]
+__all__ = ["AgentConfig", "PhoneAgent"]
+
+_LAZY = {
+    "AgentConfig": "iphone_agent.agent",
+    "PhoneAgent": "iphone_agent.agent",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        value = getattr(import_module(_LAZY[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,23 @@
 """Action handling module for Phone Agent."""
 
-from iphone_agent.actions.handler import ActionHandler, ActionResult
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from iphone_agent.actions.handler import ActionHandler, ActionResult
 
 __all__ = ["ActionHandler", "ActionResult"]
+
+# Imported on first access: the handler loads the device modules.
+_LAZY = {
+    "ActionHandler": "iphone_agent.actions.handler",
+    "ActionResult": "iphone_agent.actions.handler",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        value = getattr(import_module(_LAZY[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -12,7 +12,19 @@ from iphone_agent.idb import (
     long_press,
     swipe,
     tap,
+    choose_typing_strategy,
     copy_text,
+    type_text,
+)
+from iphone_agent import cancellation
+from iphone_agent.confirmation import PendingRequest
+from iphone_agent.idb.timing import SETTLE_TIMINGS, get_timing_profile
+from iphone_agent.metrics import Counter, Histogram
+
+ACTION_SECONDS = Histogram("action_seconds", "Action execution time", ["action"])
+ACTION_FAILURES = Counter("action_failures_total", "Failed actions", ["action"])
+TYPING_SECONDS = Histogram(
+    "typing_seconds", "Text entry time including its settle delay", ["strategy"]
 )
 
 
@@ -24,6 +36,14 @@ class ActionResult:
     should_finish: bool
     message: str | None = None
     requires_confirmation: bool = False
+    latency: float | None = None
+    # False when the action ran but its effect could not be confirmed (a
+    # launch without a splash fingerprint that left the screen unchanged).
+    verified: bool = True
+    # Typing strategy ("print" or "clipboard") of a Type action.
+    strategy: str | None = None
+    # Human request the action waits on; finish it with `ActionHandler.resume`.
+    pending: PendingRequest | None = None
 
 
 class ActionHandler:
@@ -32,18 +52,24 @@ class ActionHandler:
 
     Args:
         device_id: Optional ADB device ID for multi-device setups.
+        content_channel: Device channel on the content server that receives
+            clipboard and launch payloads (None: the shared `/content`).
         confirmation_callback: Optional callback for sensitive action confirmation.
-            Should return True to proceed, False to cancel.
+            Should return True to proceed, False to cancel, or a PendingRequest
+            to answer later without blocking.
         takeover_callback: Optional callback for takeover requests (login, captcha).
+            Returns once the user is done, or returns a PendingRequest at once.
     """
 
     def __init__(
         self,
         device_id: str | None = None,
-        confirmation_callback: Callable[[str], bool] | None = None,
-        takeover_callback: Callable[[str], None] | None = None,
+        confirmation_callback: Callable[[str], bool | PendingRequest] | None = None,
+        takeover_callback: Callable[[str], PendingRequest | None] | None = None,
+        content_channel: str | None = None,
     ):
         self.device_id = device_id
+        self.content_channel = content_channel
         self.confirmation_callback = confirmation_callback or self._default_confirmation
         self.takeover_callback = takeover_callback or self._default_takeover
 
@@ -79,18 +105,69 @@ class ActionHandler:
         handler_method = self._get_handler(action_name)
 
         if handler_method is None:
+            ACTION_FAILURES.labels("unknown").inc()
             return ActionResult(
                 success=False,
                 should_finish=False,
                 message=f"Unknown action: {action_name}",
             )
 
+        start = time.perf_counter()
         try:
-            return handler_method(action, screen_width, screen_height)
+            result = handler_method(action, screen_width, screen_height)
         except Exception as e:
-            return ActionResult(
+            result = ActionResult(
                 success=False, should_finish=False, message=f"Action failed: {e}"
             )
+        ACTION_SECONDS.labels(action_name).observe(time.perf_counter() - start)
+        if not result.success:
+            ACTION_FAILURES.labels(action_name).inc()
+        return result
+
+    def resume(
+        self,
+        action: dict[str, Any],
+        screen_width: int,
+        screen_height: int,
+        request: PendingRequest,
+    ) -> ActionResult:
+        """
+        Finish an action that returned a pending request, once it is resolved.
+
+        A confirmed action is executed without asking again; a rejected or
+        expired request ends the task.
+        """
+        if request.kind == "takeover":
+            if request.approved:
+                return ActionResult(True, False)
+            return ActionResult(False, True, f"Manual operation {request.status}")
+        if not request.approved:
+            if request.status == "expired":
+                return ActionResult(False, True, "Sensitive operation not confirmed in time")
+            return ActionResult(False, True, "User cancelled sensitive operation")
+        # The message is what marks an action as sensitive.
+        confirmed = {k: v for k, v in action.items() if k != "message"}
+        return self.execute(confirmed, screen_width, screen_height)
+
+    def settle_delay(self, action: dict[str, Any]) -> float:
+        """Seconds the action would sleep to let the screen settle (timing profile)."""
+        timing = get_timing_profile()
+        name = action.get("action") or ""
+        if name in ("Type", "Type_Name"):
+            if choose_typing_strategy(action.get("text", "")) == "print":
+                names = ("print_after",)
+            else:
+                names = ("copy_after", "type_after")
+        else:
+            # "Double Tap" settles for double_tap_after, and so on.
+            names = (name.lower().replace(" ", "_") + "_after",)
+        return sum(
+            (getattr(timing, field) for field in names if field in SETTLE_TIMINGS), 0.0
+        )
+
+    def supports(self, action_name: str) -> bool:
+        """Whether `action_name` is an action this handler can execute."""
+        return self._get_handler(action_name) is not None
 
     def _get_handler(self, action_name: str) -> Callable | None:
         """Get the handler method for an action."""
@@ -126,10 +203,21 @@ class ActionHandler:
         if not app_name:
             return ActionResult(False, False, "No app name specified")
 
-        success = launch_app(app_name)
-        if success:
-            return ActionResult(True, False)
-        return ActionResult(False, False, f"App not found: {app_name}")
+        result = launch_app(app_name, device_id=self.content_channel)
+        if result.success:
+            return ActionResult(
+                True,
+                False,
+                result.message,
+                latency=result.latency,
+                verified=result.verified,
+            )
+        return ActionResult(
+            False,
+            False,
+            f"Failed to launch {app_name}: {result.message}",
+            latency=result.latency,
+        )
 
     def _handle_tap(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle tap action."""
@@ -141,7 +229,16 @@ class ActionHandler:
 
         # Check for sensitive operation
         if "message" in action:
-            if not self.confirmation_callback(action["message"]):
+            decision = self.confirmation_callback(action["message"])
+            if isinstance(decision, PendingRequest):
+                return ActionResult(
+                    success=True,
+                    should_finish=False,
+                    message=f"Waiting for confirmation: {action['message']}",
+                    requires_confirmation=True,
+                    pending=decision,
+                )
+            if not decision:
                 return ActionResult(
                     success=False,
                     should_finish=True,
@@ -163,14 +260,24 @@ class ActionHandler:
         # clear_text(self.device_id)
         # time.sleep(1.0)
 
-        copy_text(text, self.device_id)
-        time.sleep(1.0)
+        # Short ASCII goes straight through the HID keyboard; CJK and long
+        # text still need the clipboard shortcut. Both are timed up to the end
+        # of their settle delay (print_after, or copy_after plus type_after).
+        strategy = choose_typing_strategy(text)
+        start = time.perf_counter()
+        if strategy == "print":
+            type_text(text, self.device_id)
+        else:
+            copy_text(text, self.content_channel)
+            cancellation.sleep(get_timing_profile().type_after)
+        latency = time.perf_counter() - start
+        TYPING_SECONDS.labels(strategy).observe(latency)
 
         # Restore original keyboard
         # restore_keyboard(original_ime, self.device_id)
         # time.sleep(1.0)
 
-        return ActionResult(True, False)
+        return ActionResult(True, False, latency=latency, strategy=strategy)
 
     def _handle_swipe(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle swipe action."""
@@ -224,13 +331,15 @@ class ActionHandler:
         except ValueError:
             duration = 1.0
 
-        time.sleep(duration)
+        cancellation.sleep(duration)
         return ActionResult(True, False)
 
     def _handle_takeover(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle takeover request (login, captcha, etc.)."""
         message = action.get("message", "User intervention required")
-        self.takeover_callback(message)
+        request = self.takeover_callback(message)
+        if isinstance(request, PendingRequest):
+            return ActionResult(True, False, message=message, pending=request)
         return ActionResult(True, False)
 
     def _handle_note(self, action: dict, width: int, height: int) -> ActionResult:
@@ -1,16 +1,89 @@
 """Main PhoneAgent class for orchestrating phone automation."""
 
+import contextvars
 import json
+import threading
+import time
 import traceback
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field, fields, replace
 from typing import Any, Callable
 
 from iphone_agent.actions import ActionHandler
 from iphone_agent.actions.handler import do, finish, parse_action
 from iphone_agent.idb import get_screenshot
+from iphone_agent.idb.screenshot import Screenshot, downscale_screenshot
+from iphone_agent import cancellation
+from iphone_agent.cancellation import Cancelled, CancelToken, task_scope
+from iphone_agent.checkpoint import CheckpointWriter, load_checkpoint
 from iphone_agent.config import get_messages, get_system_prompt
-from iphone_agent.model import ModelClient, ModelConfig
-from iphone_agent.model.client import MessageBuilder
+from iphone_agent.confirmation import PendingRequest
+from iphone_agent.idb.frames import (
+    FrameSignature,
+    fetch_signature,
+    hamming_distance,
+    wait_for_change,
+    wait_for_stable,
+)
+from iphone_agent.idb.timing import deferred_settle
+from iphone_agent.loop_detector import (
+    LoopDetector,
+    LoopDetectorConfig,
+    screen_fingerprint,
+)
+from iphone_agent.metrics import Counter, Histogram
+from iphone_agent.model import MessageContext, ModelClient, ModelConfig, TokenUsage
+from iphone_agent.model.context import encode_message_parts, plain_message
+from iphone_agent.model.client import MAIN_TIER, MessageBuilder, ModelResponse
+from iphone_agent.trajectory_cache import (
+    TrajectoryCache,
+    TrajectoryMatch,
+    TrajectoryStep,
+)
+
+BUDGET_ACTIONS = ("stop", "degrade")
+# Screenshots taken per replayed step before a fingerprint mismatch counts.
+REPLAY_SCREEN_ATTEMPTS = 3
+REPLAY_SCREEN_INTERVAL = 0.3
+# How often a task parked on a human re-checks its cancel token and deadline.
+HUMAN_POLL_INTERVAL = 1.0
+# Frame polling while a pipelined agent waits for the screen to settle.
+PIPELINE_POLL_INTERVAL = 0.05
+PIPELINE_STABLE_FRAMES = 2
+
+AGENT_TOKENS = Counter(
+    "agent_tokens_total", "Model tokens used per device", ["device", "kind"]
+)
+AGENT_LOOPS = Counter(
+    "agent_loops_total", "Detected action loops by kind and response", ["kind", "response"]
+)
+AGENT_STEPS_SAVED = Counter(
+    "agent_steps_saved_total", "Steps left unused when a looping task was aborted"
+)
+AGENT_SETTLE_SECONDS = Histogram(
+    "agent_settle_seconds", "Wait for the screen to settle after a pipelined action"
+)
+
+# Configuration restored from a checkpoint on resume: what shapes the task, as
+# opposed to how this process runs it (device, pipeline, verbosity, timeout).
+_RESUMED_CONFIG = (
+    "max_steps",
+    "token_budget",
+    "budget_action",
+    "low_res_max_side",
+    "escalate_steps",
+)
+
+# Token usage of every task run in this process, per device.
+_device_usage: dict[str, TokenUsage] = {}
+_device_usage_lock = threading.Lock()
+
+
+def get_device_usage() -> dict[str, TokenUsage]:
+    """Token usage per device ("default" when no device ID is set)."""
+    with _device_usage_lock:
+        return dict(_device_usage)
 
 
 @dataclass
@@ -19,13 +92,68 @@ class AgentConfig:
 
     max_steps: int = 100
     device_id: str | None = None
+    # Publish clipboard and launch payloads to `/devices/<device_id>/content`
+    # instead of the shared `/content` the Shortcuts read by default.
+    device_content: bool = False
     lang: str = "cn"
     system_prompt: str | None = None
     verbose: bool = True
+    # Tokens a task may use before `budget_action` applies (None: unlimited).
+    token_budget: int | None = None
+    # "stop" ends the task; "degrade" continues with low-resolution screenshots.
+    budget_action: str = "stop"
+    low_res_max_side: int = 512
+    loop_detection: LoopDetectorConfig = field(default_factory=LoopDetectorConfig)
+    # Replays cached action sequences of known tasks (None: disabled).
+    trajectory_cache: TrajectoryCache | None = None
+    # With a fast model configured: steps sent straight to the main model after
+    # a detected loop or a failed action.
+    escalate_steps: int = 2
+    # Capture the next frame on a thread as soon as an action's input is sent,
+    # ending the settle wait when the screen is stable instead of after the
+    # timing-profile delay.
+    pipeline: bool = False
+    # Append the task state to this file after every step (see `PhoneAgent.resume`).
+    checkpoint_path: str | None = None
+    # Wall-clock seconds a task may run before `run` stops it (None: unlimited).
+    task_timeout: float | None = None
 
     def __post_init__(self):
         if self.system_prompt is None:
             self.system_prompt = get_system_prompt(self.lang)
+        if self.budget_action not in BUDGET_ACTIONS:
+            raise ValueError(f"budget_action must be one of {BUDGET_ACTIONS}")
+
+
+@dataclass
+class LoopReport:
+    """Loop detections of a task and the steps saved by stopping early."""
+
+    detections: int = 0
+    hints: int = 0
+    takeovers: int = 0
+    aborted_at_step: int | None = None
+    steps_saved: int = 0
+
+
+@dataclass
+class _Frame:
+    """A screenshot with its user message, encoded and fingerprinted."""
+
+    screenshot: Screenshot
+    message: dict[str, Any]
+    encoded: list[bytes]
+    fingerprint: int | None
+
+
+@dataclass
+class _ParkedAction:
+    """An action waiting on a human confirmation or takeover."""
+
+    action: dict[str, Any]
+    width: int
+    height: int
+    request: PendingRequest
 
 
 @dataclass
@@ -37,6 +165,13 @@ class StepResult:
     action: dict[str, Any] | None
     thinking: str
     message: str | None = None
+    usage: TokenUsage | None = None
+    # Set while the task waits on a human; `step()` resumes it once resolved.
+    pending: PendingRequest | None = None
+
+    @property
+    def waiting(self) -> bool:
+        return self.pending is not None and not self.pending.done()
 
 
 class PhoneAgent:
@@ -65,8 +200,8 @@ class PhoneAgent:
         self,
         model_config: ModelConfig | None = None,
         agent_config: AgentConfig | None = None,
-        confirmation_callback: Callable[[str], bool] | None = None,
-        takeover_callback: Callable[[str], None] | None = None,
+        confirmation_callback: Callable[[str], bool | PendingRequest] | None = None,
+        takeover_callback: Callable[[str], PendingRequest | None] | None = None,
     ):
         self.model_config = model_config or ModelConfig()
         self.agent_config = agent_config or AgentConfig()
@@ -76,44 +211,236 @@ class PhoneAgent:
             device_id=self.agent_config.device_id,
             confirmation_callback=confirmation_callback,
             takeover_callback=takeover_callback,
+            content_channel=(
+                self.agent_config.device_id if self.agent_config.device_content else None
+            ),
         )
 
-        self._context: list[dict[str, Any]] = []
+        self._context = MessageContext()
         self._step_count = 0
+        self._step_usage: list[TokenUsage] = []
+        self._task_usage = TokenUsage()
+        self._degraded = False
+        self._loop_detector = LoopDetector(self.agent_config.loop_detection)
+        self._loop_report = LoopReport()
+        self._pending_hint: str | None = None
+        self._trajectory: list[TrajectoryStep] = []
+        self._cacheable = True
+        self._model_steps = 0
+        self._escalate_for = 0
+        self._prefetch: Future | None = None
+        # Threads start on the first prefetch and exit with the agent.
+        self._prefetch_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="agent-prefetch"
+        )
+        self._parked: _ParkedAction | None = None
+        self._task: str | None = None
+        self._checkpoint = (
+            CheckpointWriter(self.agent_config.checkpoint_path)
+            if self.agent_config.checkpoint_path
+            else None
+        )
+        # Messages, usage entries and trajectory steps already checkpointed.
+        self._checkpointed = (0, 0, 0)
+        self._checkpoint_state: dict[str, Any] | None = None
+        self._stop_reason: str | None = None
 
-    def run(self, task: str) -> str:
+    def run(
+        self,
+        task: str,
+        cancel_token: CancelToken | None = None,
+        timeout: float | None = None,
+    ) -> str:
         """
         Run the agent to complete a task.
 
+        While a confirmation or takeover is pending, this blocks the calling
+        thread until it is resolved; use `step()` to release the thread
+        instead.
+
         Args:
             task: Natural language description of the task.
+            cancel_token: Token another thread can cancel to stop the task.
+            timeout: Wall-clock seconds for the task (default:
+                `agent_config.task_timeout`).
 
         Returns:
-            Final message from the agent.
+            Final message from the agent, or a partial result naming the reason
+            (also in `stop_reason`) if it was cancelled or ran out of time.
         """
-        self._context = []
-        self._step_count = 0
+        return self._bounded(lambda: self._run(task), cancel_token, timeout)
+
+    def _run(self, task: str) -> str:
+        self.reset()
+        self._start_task(task)
+
+        cache = self.agent_config.trajectory_cache
+        if cache is not None:
+            match = cache.lookup(task)
+            if match is not None:
+                result = self._replay(match)
+                if result is not None:
+                    return self._complete(task, result)
 
         # First step with user prompt
         result = self._execute_step(task, is_first=True)
+        return self._run_steps(task, result)
 
-        if result.finished:
-            return result.message or "Task completed"
+    def resume(
+        self,
+        path: str | None = None,
+        cancel_token: CancelToken | None = None,
+        timeout: float | None = None,
+    ) -> str:
+        """
+        Continue a task from its checkpoint, e.g. after a process restart.
+
+        The context, step count, token usage and counters are restored and
+        steps continue from the last checkpointed one; an action that was
+        waiting on a human asks again. Loop detection starts afresh. The step
+        limit, token budget and loop detection settings the task started with
+        replace the agent's.
+
+        Args:
+            path: Checkpoint file (default: `agent_config.checkpoint_path`).
+            cancel_token: See `run`.
+            timeout: See `run`.
+
+        Returns:
+            Final message from the agent (at once if the task had finished).
+
+        Raises:
+            ValueError: If the task ran with another model.
+        """
+        return self._bounded(lambda: self._resume_task(path), cancel_token, timeout)
+
+    def _resume_task(self, path: str | None) -> str:
+        path = path or self.agent_config.checkpoint_path
+        if not path:
+            raise ValueError("No checkpoint path given")
+        checkpoint = load_checkpoint(path)
+        if checkpoint.finished:
+            return checkpoint.result
+
+        self._restore_config(checkpoint.config)
+        self.reset()
+        self._task = checkpoint.task
+        if self._checkpoint is None or self._checkpoint.path != path:
+            self._checkpoint = CheckpointWriter(path)
+        if not checkpoint.messages:
+            # Stopped before the first step was recorded: start over.
+            return self._run(checkpoint.task)
+        self._checkpoint.resume()
+
+        state = checkpoint.state
+        self._context = MessageContext(checkpoint.messages)
+        self._step_usage = [TokenUsage(**usage) for usage in checkpoint.usage]
+        self._task_usage = sum(self._step_usage, TokenUsage())
+        self._trajectory = [TrajectoryStep(**step) for step in checkpoint.trajectory]
+        self._step_count = state.get("step_count", 0)
+        self._model_steps = state.get("model_steps", 0)
+        self._degraded = state.get("degraded", False)
+        self._pending_hint = state.get("pending_hint")
+        self._escalate_for = state.get("escalate_for", 0)
+        self._cacheable = state.get("cacheable", True)
+        self._checkpointed = (
+            len(self._context),
+            len(self._step_usage),
+            len(self._trajectory),
+        )
+        self._checkpoint_state = state
+
+        parked = state.get("parked")
+        if parked is not None:
+            result = self.action_handler.execute(
+                parked["action"], parked["width"], parked["height"]
+            )
+            if result.pending is not None:
+                self._parked = _ParkedAction(
+                    parked["action"], parked["width"], parked["height"], result.pending
+                )
+            result = StepResult(
+                success=result.success,
+                finished=result.should_finish,
+                action=parked["action"],
+                thinking="",
+                message=result.message,
+                pending=result.pending,
+            )
+        else:
+            result = StepResult(success=True, finished=False, action=None, thinking="")
+        return self._run_steps(checkpoint.task, result)
 
-        # Continue until finished or max steps reached
-        while self._step_count < self.agent_config.max_steps:
-            result = self._execute_step(is_first=False)
+    def _restore_config(self, config: dict[str, Any]) -> None:
+        """Apply the configuration a checkpointed task started with."""
+        model = config.get("model")
+        if model is not None and model != self.model_config.model_name:
+            raise ValueError(
+                f"Checkpoint was written with model '{model}', "
+                f"this agent uses '{self.model_config.model_name}'"
+            )
+        restored = {name: config[name] for name in _RESUMED_CONFIG if name in config}
+        if "loop_detection" in config:
+            restored["loop_detection"] = LoopDetectorConfig(**config["loop_detection"])
+            self._loop_detector = LoopDetector(restored["loop_detection"])
+        # A copy: the configuration may be shared with other agents.
+        self.agent_config = replace(self.agent_config, **restored)
+
+    def _bounded(
+        self,
+        run: Callable[[], str],
+        cancel_token: CancelToken | None,
+        timeout: float | None,
+    ) -> str:
+        """Call `run` under a cancel token and deadline; a partial result if either fires."""
+        self._stop_reason = None
+        if timeout is None:
+            timeout = self.agent_config.task_timeout
+        try:
+            with task_scope(cancel_token, timeout):
+                return run()
+        except Cancelled as e:
+            # The checkpoint is left open so the task can be resumed.
+            self._stop_reason = e.reason
+            self._prefetch = None
+            message = f"Task stopped ({e.reason}) after {self._step_count} steps"
+            if self.agent_config.verbose:
+                print(message)
+            return message
 
-            if result.finished:
-                return result.message or "Task completed"
+    @staticmethod
+    def _wait_for_human(request: PendingRequest) -> None:
+        """Wait for a parked request, giving up when the task is cancelled."""
+        while not request.done():
+            left = cancellation.remaining(HUMAN_POLL_INTERVAL)
+            request.wait(left)
+        cancellation.check()
 
-        return "Max steps reached"
+    def _run_steps(self, task: str, result: StepResult) -> str:
+        """Continue until finished or max steps reached."""
+        self._save_checkpoint()
+        while not result.finished:
+            if self._parked is not None:
+                # Nothing else to do on this thread: wait for the human.
+                self._wait_for_human(self._parked.request)
+                result = self._resume()
+            elif self._step_count >= self.agent_config.max_steps:
+                self._finish_checkpoint("Max steps reached")
+                return "Max steps reached"
+            else:
+                result = self._execute_step(is_first=False)
+            self._save_checkpoint()
+
+        return self._complete(task, result)
 
     def step(self, task: str | None = None) -> StepResult:
         """
         Execute a single step of the agent.
 
-        Useful for manual control or debugging.
+        Useful for manual control or debugging, and for services that run
+        many agents: a step that needs a human returns at once with
+        `waiting` set, and later calls resume the task once the request is
+        resolved (returning immediately while it is still pending).
 
         Args:
             task: Task description (only needed for first step).
@@ -121,59 +448,129 @@ class PhoneAgent:
         Returns:
             StepResult with step details.
         """
-        is_first = len(self._context) == 0
+        if self._parked is not None:
+            result = self._resume()
+        else:
+            is_first = len(self._context) == 0
 
-        if is_first and not task:
-            raise ValueError("Task is required for the first step")
+            if is_first and not task:
+                raise ValueError("Task is required for the first step")
 
-        return self._execute_step(task, is_first)
+            if is_first:
+                self._start_task(task)
+            result = self._execute_step(task, is_first)
+
+        self._save_checkpoint()
+        if result.finished:
+            self._finish_checkpoint(result.message or "Task completed")
+        return result
 
     def reset(self) -> None:
         """Reset the agent state for a new task."""
-        self._context = []
+        self._context = MessageContext()
         self._step_count = 0
+        self._step_usage = []
+        self._task_usage = TokenUsage()
+        self._degraded = False
+        self._loop_detector.reset()
+        self._loop_report = LoopReport()
+        self._pending_hint = None
+        self._escalate_for = 0
+        self._trajectory = []
+        self._cacheable = True
+        self._model_steps = 0
+        self._prefetch = None
+        self._parked = None
+        self._task = None
+        self._checkpointed = (0, 0, 0)
+        self._checkpoint_state = None
+
+    def _start_task(self, task: str) -> None:
+        """Record the task and begin its checkpoint."""
+        self._task = task
+        if self._checkpoint is None:
+            return
+        config = {
+            f.name: getattr(self.agent_config, f.name)
+            for f in fields(self.agent_config)
+            # The system prompt is the first checkpointed message.
+            if f.name != "system_prompt"
+            and isinstance(getattr(self.agent_config, f.name), (str, int, float, bool, type(None)))
+        }
+        config["loop_detection"] = asdict(self.agent_config.loop_detection)
+        config["model"] = self.model_config.model_name
+        self._checkpoint.start(task, config)
+
+    def _save_checkpoint(self) -> None:
+        """Append what changed since the last checkpoint (nothing if unchanged)."""
+        if self._checkpoint is None or self._task is None:
+            return
+        messages, usage, trajectory = self._checkpointed
+        parked = self._parked
+        state = {
+            "step_count": self._step_count,
+            "model_steps": self._model_steps,
+            "degraded": self._degraded,
+            "pending_hint": self._pending_hint,
+            "escalate_for": self._escalate_for,
+            "cacheable": self._cacheable,
+            "parked": (
+                {"action": parked.action, "width": parked.width, "height": parked.height}
+                if parked is not None
+                else None
+            ),
+        }
+        if (
+            (messages, usage, trajectory)
+            == (len(self._context), len(self._step_usage), len(self._trajectory))
+            and state == self._checkpoint_state
+        ):
+            return
+        self._checkpoint.append_step(
+            {
+                "messages": [
+                    plain_message(self._context[i]) for i in range(messages, len(self._context))
+                ],
+                "usage": [asdict(u) for u in self._step_usage[usage:]],
+                "trajectory": [asdict(step) for step in self._trajectory[trajectory:]],
+                "state": state,
+            }
+        )
+        self._checkpointed = (len(self._context), len(self._step_usage), len(self._trajectory))
+        self._checkpoint_state = state
+
+    def _finish_checkpoint(self, result: str) -> None:
+        if self._checkpoint is not None and self._task is not None:
+            self._checkpoint.finish(result)
+            self._task = None
 
     def _execute_step(
         self, user_prompt: str | None = None, is_first: bool = False
     ) -> StepResult:
         """Execute a single step of the agent loop."""
+        cancellation.check()
         self._step_count += 1
 
-        # Capture current screen state
-        screenshot = get_screenshot()
-        # current_app = get_current_app(self.agent_config.device_id)
-        current_app = 'iPhone'
-
-        # Build messages
+        # Capture current screen state (prefetched while the last action settled)
         if is_first:
             # print(f"🚀 Starting task: {user_prompt}\n")
             # print("system_prompt: \n",self.agent_config.system_prompt)
             self._context.append(
                 MessageBuilder.create_system_message(self.agent_config.system_prompt)
             )
-
-            screen_info = MessageBuilder.build_screen_info(current_app)
-            text_content = f"{user_prompt}\n\n{screen_info}"
-
-            self._context.append(
-                MessageBuilder.create_user_message(
-                    text=text_content, image_base64=screenshot.base64_data
-                )
-            )
-        else:
-            screen_info = MessageBuilder.build_screen_info(current_app)
-            text_content = f"** Screen Info **\n\n{screen_info}"
-
-            self._context.append(
-                MessageBuilder.create_user_message(
-                    text=text_content, image_base64=screenshot.base64_data
-                )
-            )
+        frame = self._take_frame(user_prompt if is_first else None)
+        screenshot = frame.screenshot
+        self._context.append(frame.message, frame.encoded)
 
         # Get model response
+        self._model_steps += 1
         try:
-            response = self.model_client.request(self._context)
+            response = self.model_client.request(
+                self._context, validate=self._validate_response, tier=self._next_tier()
+            )
         except Exception as e:
+            # A request cut short by the deadline stops the task, not the model.
+            cancellation.check()
             if self.agent_config.verbose:
                 traceback.print_exc()
             return StepResult(
@@ -183,6 +580,7 @@ class PhoneAgent:
                 thinking="",
                 message=f"Model error: {e}",
             )
+        self._record_usage(response.usage)
 
         # Parse action from response
         try:
@@ -207,17 +605,82 @@ class PhoneAgent:
         # Remove image from context to save space
         self._context[-1] = MessageBuilder.remove_images_from_message(self._context[-1])
 
-        # Execute action
+        fingerprint = frame.fingerprint
+        # Only the size is needed from here on.
+        screenshot.release()
         try:
-            result = self.action_handler.execute(
-                action, screenshot.width, screenshot.height
+            action, loop_message = self._check_loop(fingerprint, action)
+        except Exception:
+            # Loop detection is best effort; the action itself still runs.
+            if self.agent_config.verbose:
+                traceback.print_exc()
+            loop_message = None
+        if loop_message is not None:
+            self._context.append(
+                MessageBuilder.create_assistant_message(
+                    f"<think>{response.thinking}</think><answer>{response.action}</answer>"
+                )
+            )
+            return StepResult(
+                success=False,
+                finished=True,
+                action=action,
+                thinking=response.thinking,
+                message=loop_message,
+                usage=response.usage,
             )
+
+        # Execute action
+        cancellation.check()
+        pipeline = self.agent_config.pipeline
+        settle_delay = self.action_handler.settle_delay(action) if pipeline else 0.0
+        baseline = self._settle_baseline() if settle_delay > 0 else None
+        try:
+            with deferred_settle() if pipeline else nullcontext():
+                result = self.action_handler.execute(
+                    action, screenshot.width, screenshot.height
+                )
         except Exception as e:
             if self.agent_config.verbose:
                 traceback.print_exc()
             result = self.action_handler.execute(
                 finish(message=str(e)), screenshot.width, screenshot.height
             )
+        if not result.verified:
+            # Tell the model before the next screenshot is taken.
+            self._add_hint(get_messages(self.agent_config.lang)["launch_unverified"])
+
+        # Check if finished
+        finished = action.get("_metadata") == "finish" or result.should_finish
+        message = result.message or action.get("message")
+        if not finished and self._over_budget():
+            if self.agent_config.budget_action == "stop":
+                finished = True
+                message = (
+                    f"Token budget exceeded: {self._task_usage.total_tokens} > "
+                    f"{self.agent_config.token_budget}"
+                )
+            elif not self._degraded:
+                self._degraded = True
+                if self.agent_config.verbose:
+                    print("Token budget exceeded, switching to low-resolution screenshots")
+
+        if result.pending is not None and not finished:
+            self._parked = _ParkedAction(
+                action, screenshot.width, screenshot.height, result.pending
+            )
+        elif pipeline and not finished:
+            # Wait for the screen and capture the next frame while the rest of
+            # this step is recorded.
+            self._prefetch = self._start_prefetch(baseline, settle_delay)
+
+        if not result.success:
+            self._escalate_for = self.agent_config.escalate_steps
+        if fingerprint is not None:
+            self._trajectory.append(TrajectoryStep(fingerprint, action))
+        else:
+            # A step without a screen fingerprint cannot be verified on replay.
+            self._cacheable = False
 
         # Add assistant response to context
         self._context.append(
@@ -226,14 +689,11 @@ class PhoneAgent:
             )
         )
 
-        # Check if finished
-        finished = action.get("_metadata") == "finish" or result.should_finish
-
         if finished and self.agent_config.verbose:
             msgs = get_messages(self.agent_config.lang)
             print("\n" + "🎉 " + "=" * 48)
             print(
-                f"✅ {msgs['task_completed']}: {result.message or action.get('message', msgs['done'])}"
+                f"✅ {msgs['task_completed']}: {message or msgs['done']}"
             )
             print("=" * 50 + "\n")
 
@@ -242,15 +702,339 @@ class PhoneAgent:
             finished=finished,
             action=action,
             thinking=response.thinking,
-            message=result.message or action.get("message"),
+            message=message,
+            usage=response.usage,
+            pending=result.pending,
+        )
+
+    def _resume(self) -> StepResult:
+        """Finish the parked action if its request is resolved."""
+        parked = self._parked
+        if not parked.request.done():
+            return StepResult(
+                success=True,
+                finished=False,
+                action=parked.action,
+                thinking="",
+                message=parked.request.message,
+                pending=parked.request,
+            )
+        self._parked = None
+        result = self.action_handler.resume(
+            parked.action, parked.width, parked.height, parked.request
+        )
+        if not result.success:
+            self._escalate_for = self.agent_config.escalate_steps
+        return StepResult(
+            success=result.success,
+            finished=result.should_finish,
+            action=parked.action,
+            thinking="",
+            message=result.message,
+        )
+
+    def _add_hint(self, hint: str) -> None:
+        """Prepend a note to the next user message."""
+        if self._pending_hint:
+            hint = f"{self._pending_hint}\n{hint}"
+        self._pending_hint = hint
+
+    def _user_text(self, task: str | None) -> str:
+        """Text of the next user message (the task on the first step)."""
+        # current_app = get_current_app(self.agent_config.device_id)
+        current_app = 'iPhone'
+        screen_info = MessageBuilder.build_screen_info(current_app)
+        if task is not None:
+            return f"{task}\n\n{screen_info}"
+        text_content = f"** Screen Info **\n\n{screen_info}"
+        if self._pending_hint:
+            text_content = f"{self._pending_hint}\n\n{text_content}"
+            self._pending_hint = None
+        return text_content
+
+    def _capture(self, text: str) -> _Frame:
+        """Take a screenshot and build and encode the user message for it."""
+        screenshot = get_screenshot()
+        if self._degraded:
+            screenshot = downscale_screenshot(screenshot, self.agent_config.low_res_max_side)
+        message = MessageBuilder.create_user_message(
+            text=text, image_url=screenshot.data_url_bytes
         )
+        return _Frame(
+            screenshot=screenshot,
+            message=message,
+            encoded=encode_message_parts(message),
+            fingerprint=self._fingerprint(screenshot),
+        )
+
+    def _settle_baseline(self) -> FrameSignature | None:
+        """Streamer signature before an action, to see when the screen changes."""
+        try:
+            return fetch_signature()
+        except Exception:
+            return None
+
+    def _take_frame(self, task: str | None) -> _Frame:
+        """The frame prefetched after the last action, or a fresh capture."""
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is not None:
+            try:
+                return prefetch.result()
+            except Exception:
+                if self.agent_config.verbose:
+                    traceback.print_exc()
+        return self._capture(self._user_text(task))
+
+    def _start_prefetch(self, baseline: FrameSignature | None, delay: float) -> Future:
+        """
+        Wait for the screen to settle and capture the next frame in the background.
+
+        Settling ends when the screen changed from `baseline` and then held
+        still, or after `delay` (what the action would have slept) at the latest.
+        Without a baseline the prefetch sleeps `delay`.
+        """
+        text = self._user_text(None)
+
+        def run() -> _Frame:
+            start = time.perf_counter()
+            try:
+                if baseline is None:
+                    cancellation.sleep(delay)
+                else:
+                    changed = wait_for_change(
+                        baseline, timeout=delay, poll_interval=PIPELINE_POLL_INTERVAL
+                    )
+                    remaining = delay - (time.perf_counter() - start)
+                    if changed is not None and remaining > 0:
+                        wait_for_stable(
+                            timeout=remaining,
+                            poll_interval=PIPELINE_POLL_INTERVAL,
+                            stable_frames=PIPELINE_STABLE_FRAMES,
+                        )
+            except Exception:
+                # Settle detection is best effort; capture the screen anyway.
+                pass
+            AGENT_SETTLE_SECONDS.observe(time.perf_counter() - start)
+            return self._capture(text)
+
+        # In a copy of this context, so the task's cancel token and deadline apply.
+        context = contextvars.copy_context()
+        return self._prefetch_executor.submit(context.run, run)
+
+    def _next_tier(self) -> str | None:
+        """Tier forced for this step (None lets the client route it)."""
+        if self._escalate_for > 0:
+            self._escalate_for -= 1
+            return MAIN_TIER
+        return None
+
+    def _validate_response(self, response: ModelResponse) -> str | None:
+        """
+        Check a fast-tier response before it is executed.
+
+        Returns:
+            "parse" or "invalid" to escalate to the main model, None to accept.
+        """
+        try:
+            action = parse_action(response.action)
+        except ValueError:
+            return "parse"
+        if action.get("_metadata") == "finish":
+            return None
+        if not self.action_handler.supports(action.get("action")):
+            return "invalid"
+        for name in ("element", "start", "end"):
+            if name not in action:
+                continue
+            point = action[name]
+            if not (
+                isinstance(point, (list, tuple))
+                and len(point) == 2
+                and all(isinstance(v, (int, float)) and 0 <= v <= 1000 for v in point)
+            ):
+                return "invalid"
+        return None
+
+    def _record_usage(self, usage: TokenUsage | None) -> None:
+        """Add one model call to the step, task and device totals."""
+        if usage is None:
+            return
+        self._step_usage.append(usage)
+        self._task_usage = self._task_usage + usage
+        device = self.agent_config.device_id or "default"
+        with _device_usage_lock:
+            _device_usage[device] = _device_usage.get(device, TokenUsage()) + usage
+        AGENT_TOKENS.labels(device, "prompt").inc(usage.prompt_tokens)
+        AGENT_TOKENS.labels(device, "completion").inc(usage.completion_tokens)
+        AGENT_TOKENS.labels(device, "cached").inc(usage.cached_tokens)
+
+    def _fingerprint(self, screenshot: Screenshot) -> int | None:
+        """Screen fingerprint, if loop detection or the trajectory cache needs it."""
+        if screenshot.is_sensitive:
+            return None
+        if (
+            not self.agent_config.loop_detection.enabled
+            and self.agent_config.trajectory_cache is None
+        ):
+            return None
+        return screen_fingerprint(screenshot.data)
+
+    def _check_loop(
+        self, fingerprint: int | None, action: dict[str, Any]
+    ) -> tuple[dict[str, Any], str | None]:
+        """
+        Feed the step to the loop detector and apply the configured response.
+
+        Returns:
+            The action to execute (a takeover replaces the looping action, so
+            it waits for the human like one the model asked for), and a
+            message if the task should stop before executing it.
+        """
+        config = self.agent_config.loop_detection
+        if not config.enabled or fingerprint is None or action.get("_metadata") != "do":
+            return action, None
+        detection = self._loop_detector.observe(fingerprint, action)
+        if detection is None:
+            return action, None
+
+        report = self._loop_report
+        report.detections += 1
+        self._loop_detector.reset()
+        # A loop means no progress: decide the next steps with the main model.
+        self._escalate_for = self.agent_config.escalate_steps
+        msgs = get_messages(self.agent_config.lang)
+        response = config.response
+        if response == "hint" and report.hints >= config.max_hints:
+            response = "abort"
+        AGENT_LOOPS.labels(detection.kind, response).inc()
+        if self.agent_config.verbose:
+            print(f"Loop detected ({detection.describe()}), response: {response}")
+
+        if response == "hint":
+            report.hints += 1
+            self._add_hint(msgs["loop_hint"])
+            return action, None
+        if response == "takeover":
+            report.takeovers += 1
+            return do(action="Take_over", message=msgs["loop_takeover"]), None
+        report.aborted_at_step = self._step_count
+        report.steps_saved = max(0, self.agent_config.max_steps - self._step_count)
+        AGENT_STEPS_SAVED.inc(report.steps_saved)
+        return action, f"{msgs['loop_aborted']}: {detection.describe()}"
+
+    def _replay(self, match: TrajectoryMatch) -> StepResult | None:
+        """
+        Replay a cached trajectory while each screen matches the recording.
+
+        Returns:
+            The final StepResult if the replay finished the task, or None to
+            continue with the model from the current screen.
+        """
+        cache = self.agent_config.trajectory_cache
+        replayed = 0
+        for step in match.steps:
+            if self._step_count >= self.agent_config.max_steps:
+                break
+            screenshot, fingerprint = self._wait_for_screen(
+                step.screen, cache.screen_distance
+            )
+            if screenshot is None:
+                if self.agent_config.verbose:
+                    print(f"Replay diverged at step {replayed + 1}, asking the model")
+                cache.record_replay(match, replayed, fell_back=True)
+                return None
+
+            self._step_count += 1
+            if self.agent_config.verbose:
+                action_json = json.dumps(step.action, ensure_ascii=False)
+                print(f"Replaying step {replayed + 1}: {action_json}")
+            result = self.action_handler.execute(
+                step.action, screenshot.width, screenshot.height
+            )
+            if result.pending is not None:
+                self._wait_for_human(result.pending)
+                result = self.action_handler.resume(
+                    step.action, screenshot.width, screenshot.height, result.pending
+                )
+            self._trajectory.append(TrajectoryStep(fingerprint, step.action))
+            replayed += 1
+            if not result.success:
+                cache.record_replay(match, replayed, fell_back=True)
+                return None
+            if step.action.get("_metadata") == "finish" or result.should_finish:
+                cache.record_replay(match, replayed, fell_back=False)
+                return StepResult(
+                    success=result.success,
+                    finished=True,
+                    action=step.action,
+                    thinking="",
+                    message=result.message or step.action.get("message"),
+                )
+        cache.record_replay(match, replayed, fell_back=False)
+        return None
+
+    def _wait_for_screen(
+        self, expected: int, max_distance: int
+    ) -> tuple[Screenshot | None, int]:
+        """Take screenshots until one matches `expected` or the attempts run out."""
+        fingerprint = 0
+        for attempt in range(REPLAY_SCREEN_ATTEMPTS):
+            if attempt:
+                cancellation.sleep(REPLAY_SCREEN_INTERVAL)
+            screenshot = get_screenshot()
+            if screenshot.is_sensitive:
+                continue
+            fingerprint = screen_fingerprint(screenshot.data)
+            if hamming_distance(fingerprint, expected) <= max_distance:
+                return screenshot, fingerprint
+        return None, fingerprint
+
+    def _complete(self, task: str, result: StepResult) -> str:
+        """Cache the trajectory of a task the model finished, and return its message."""
+        cache = self.agent_config.trajectory_cache
+        if (
+            cache is not None
+            and self._cacheable
+            and self._model_steps
+            and result.success
+            and result.action is not None
+            and result.action.get("_metadata") == "finish"
+        ):
+            cache.store(task, self._trajectory)
+        message = result.message or "Task completed"
+        self._finish_checkpoint(message)
+        return message
+
+    def _over_budget(self) -> bool:
+        budget = self.agent_config.token_budget
+        return budget is not None and self._task_usage.total_tokens > budget
 
     @property
     def context(self) -> list[dict[str, Any]]:
         """Get the current conversation context."""
         return self._context.copy()
 
+    @property
+    def stop_reason(self) -> str | None:
+        """Why the last `run` stopped early ("cancelled", "deadline"), or None."""
+        return self._stop_reason
+
     @property
     def step_count(self) -> int:
         """Get the current step count."""
         return self._step_count
+
+    @property
+    def task_usage(self) -> TokenUsage:
+        """Token usage of the current task."""
+        return self._task_usage
+
+    @property
+    def loop_report(self) -> LoopReport:
+        """Loop detections of the current task."""
+        return self._loop_report
+
+    @property
+    def step_usage(self) -> list[TokenUsage]:
+        """Token usage of each step of the current task."""
+        return self._step_usage.copy()
@@ -0,0 +1,159 @@
+"""Cooperative cancellation and deadlines for a running task.
+
+`task_scope` binds a `CancelToken` and a deadline to the current context.
+Code below it calls `check()` between phases, clamps network timeouts with
+`remaining()` and sleeps with `sleep()`, which wakes up as soon as the token
+is cancelled. When the token fires or the deadline passes, these raise
+`Cancelled`; `PhoneAgent.run` turns that into a partial result.
+
+`Cancelled` derives from BaseException, like KeyboardInterrupt, so the
+`except Exception` blocks that turn errors into failed steps let it through.
+The scope is a context variable: threads started for a task must run in a
+copy of the caller's context (`contextvars.copy_context().run`) to inherit it.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+CANCELLED = "cancelled"
+DEADLINE = "deadline"
+
+
+class Cancelled(BaseException):
+    """The task was cancelled or ran past its deadline."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancelToken:
+    """Flag set from another thread (e.g. a scheduler) to stop a task."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.reason: str | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = CANCELLED) -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+
+@dataclass(frozen=True)
+class _Scope:
+    token: CancelToken | None
+    # time.monotonic() value; None for no deadline.
+    deadline: float | None
+
+
+_scope: ContextVar[_Scope | None] = ContextVar("task_scope", default=None)
+
+
+@contextmanager
+def task_scope(
+    token: CancelToken | None = None, timeout: float | None = None
+) -> Iterator[None]:
+    """
+    Bind a cancel token and a deadline `timeout` seconds from now.
+
+    Nested scopes keep the outer deadline if it is earlier; a nested scope
+    without a token keeps the outer one.
+    """
+    outer = _scope.get()
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    if outer is not None:
+        if outer.deadline is not None and (deadline is None or outer.deadline < deadline):
+            deadline = outer.deadline
+        token = token or outer.token
+    reset = _scope.set(_Scope(token, deadline))
+    try:
+        yield
+    finally:
+        _scope.reset(reset)
+
+
+def check() -> None:
+    """
+    Raise Cancelled if the current task was cancelled or is past its deadline.
+
+    Raises:
+        Cancelled: With reason "cancelled" (or the token's reason) or "deadline".
+    """
+    scope = _scope.get()
+    if scope is None:
+        return
+    if scope.token is not None and scope.token.cancelled:
+        raise Cancelled(scope.token.reason or CANCELLED)
+    if scope.deadline is not None and time.monotonic() >= scope.deadline:
+        raise Cancelled(DEADLINE)
+
+
+def remaining(timeout: float | None = None) -> float | None:
+    """
+    `timeout` clamped to the time left before the deadline.
+
+    Returns:
+        Seconds, or None if there is neither a timeout nor a deadline.
+
+    Raises:
+        Cancelled: If the task is already cancelled or past its deadline.
+    """
+    check()
+    scope = _scope.get()
+    if scope is None or scope.deadline is None:
+        return timeout
+    left = scope.deadline - time.monotonic()
+    return left if timeout is None else min(timeout, left)
+
+
+def sleep(seconds: float) -> None:
+    """
+    `time.sleep` that returns early by raising Cancelled when the task stops.
+
+    Raises:
+        Cancelled: If the task is cancelled or reaches its deadline meanwhile.
+    """
+    scope = _scope.get()
+    if scope is None:
+        time.sleep(seconds)
+        return
+    check()
+    if seconds <= 0:
+        return
+    end = time.monotonic() + seconds
+    if scope.deadline is not None and scope.deadline < end:
+        if scope.token is not None:
+            scope.token._event.wait(scope.deadline - time.monotonic())
+        else:
+            time.sleep(max(0.0, scope.deadline - time.monotonic()))
+        check()
+        raise Cancelled(DEADLINE)
+    if scope.token is not None:
+        scope.token._event.wait(seconds)
+    else:
+        time.sleep(seconds)
+    check()
+
+
+@contextmanager
+def shielded() -> Iterator[None]:
+    """
+    Run a block that must not be interrupted, e.g. between a HID button press
+    and its release; a cancellation takes effect at the next check after it.
+    """
+    reset = _scope.set(None)
+    try:
+        yield
+    finally:
+        _scope.reset(reset)
@@ -0,0 +1,161 @@
+"""Append-only checkpoints of a running task.
+
+A checkpoint is a JSON Lines file. The first line records the task and the
+agent configuration. After every step one line is appended with the messages
+added to the context since the previous line (screenshots are already
+stripped from them), the token usage of the step's model calls and the
+agent's counters. A final line marks the task as done.
+
+Appending a few kilobytes per step keeps checkpointing off the critical
+path. Loading replays the lines in order; a line cut short by a crash is
+ignored.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO
+
+from iphone_agent.model.context import encode_json
+
+CHECKPOINT_VERSION = 1
+
+
+@dataclass
+class Checkpoint:
+    """State of a task rebuilt from a checkpoint file."""
+
+    task: str
+    config: dict[str, Any]
+    messages: list[dict[str, Any]] = field(default_factory=list)
+    usage: list[dict[str, int]] = field(default_factory=list)
+    trajectory: list[dict[str, Any]] = field(default_factory=list)
+    # Counters of the last step (step_count, degraded, ...).
+    state: dict[str, Any] = field(default_factory=dict)
+    # Final message once the task is done.
+    result: str | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.result is not None
+
+
+class CheckpointWriter:
+    """
+    Writes one task's checkpoint file.
+
+    Args:
+        path: File to write; `start` truncates it.
+        fsync: Also flush every line to disk, not only to the OS (survives a
+            host crash, at the cost of a disk sync per step).
+    """
+
+    def __init__(self, path: str, fsync: bool = False) -> None:
+        self.path = path
+        self.fsync = fsync
+        self._file: BinaryIO | None = None
+        self._lock = threading.Lock()
+
+    def start(self, task: str, config: dict[str, Any]) -> None:
+        """Begin a new checkpoint for `task`, replacing any previous file."""
+        self.close()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._file = open(self.path, "wb")
+        self._write({"type": "task", "version": CHECKPOINT_VERSION, "task": task, "config": config})
+
+    def resume(self) -> None:
+        """
+        Continue appending to an existing checkpoint file.
+
+        A last line cut short by a crash is cut off first: the next record
+        would otherwise be appended to it, leaving a broken line mid-file.
+        """
+        self.close()
+        with self._lock:
+            file = open(self.path, "r+b")
+            file.truncate(_complete_length(file))
+            file.seek(0, os.SEEK_END)
+            self._file = file
+
+    def append_step(self, record: dict[str, Any]) -> None:
+        """Append the state added by one step."""
+        self._write({"type": "step", **record})
+
+    def finish(self, result: str) -> None:
+        """Mark the task as done and close the file."""
+        self._write({"type": "end", "result": result})
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            file, self._file = self._file, None
+        if file is not None:
+            file.close()
+
+    def _write(self, record: dict[str, Any]) -> None:
+        line = encode_json(record) + b"\n"
+        with self._lock:
+            if self._file is None:
+                raise ValueError("Checkpoint not started")
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+
+def _complete_length(file: BinaryIO, block: int = 4096) -> int:
+    """Length of the file up to and including its last newline."""
+    end = file.seek(0, os.SEEK_END)
+    position = end
+    while position > 0:
+        start = max(0, position - block)
+        file.seek(start)
+        index = file.read(position - start).rfind(b"\n")
+        if index >= 0:
+            return start + index + 1
+        position = start
+    return 0
+
+
+def load_checkpoint(path: str) -> Checkpoint:
+    """
+    Rebuild a task's state from its checkpoint file.
+
+    Raises:
+        ValueError: If the file does not start with a task record.
+    """
+    with open(path, "rb") as f:
+        lines = f.read().split(b"\n")
+    records = []
+    for i, line in enumerate(lines):
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            if any(lines[i + 1 :]):
+                raise
+            # Last line cut short by a crash mid-write.
+            break
+    if not records or records[0].get("type") != "task":
+        raise ValueError(f"Not a checkpoint file: {path}")
+    header = records[0]
+    if header.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version: {header.get('version')}")
+
+    checkpoint = Checkpoint(task=header["task"], config=header.get("config", {}))
+    for record in records[1:]:
+        if record["type"] == "step":
+            checkpoint.messages.extend(record.get("messages", []))
+            checkpoint.usage.extend(record.get("usage", []))
+            checkpoint.trajectory.extend(record.get("trajectory", []))
+            checkpoint.state = record.get("state", {})
+        elif record["type"] == "end":
+            checkpoint.result = record["result"]
+    return checkpoint
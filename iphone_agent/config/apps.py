@@ -1,5 +1,8 @@
 """App name to package name mapping for supported applications."""
 
+import json
+import os
+
 APP_PACKAGES: dict[str, str] = {
     "微信": "weixin://",
     "WeChat": "weixin://",
@@ -21,6 +24,33 @@ APP_PACKAGES: dict[str, str] = {
     "JD": "openapp.jdmobile://",
 }
 
+# App name -> 64-bit dHash of the app's launch screen, used to verify launches.
+# Record entries with `python -m iphone_agent.idb.calibration --fingerprint-app`.
+APP_SPLASH_FINGERPRINTS: dict[str, int] = {}
+
+
+def load_app_fingerprints(path: str) -> dict[str, int]:
+    """
+    Load splash fingerprints from a JSON file into APP_SPLASH_FINGERPRINTS.
+
+    Args:
+        path: JSON object mapping app names to hex (or integer) dHash values.
+
+    Returns:
+        The updated APP_SPLASH_FINGERPRINTS.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    for name, value in data.items():
+        if isinstance(value, str):
+            value = int(value, 16)
+        APP_SPLASH_FINGERPRINTS[name] = int(value)
+    return APP_SPLASH_FINGERPRINTS
+
+
+if os.getenv("PIKVM_APP_FINGERPRINTS"):
+    load_app_fingerprints(os.environ["PIKVM_APP_FINGERPRINTS"])
+
 
 def get_package_name(app_name: str) -> str | None:
     """
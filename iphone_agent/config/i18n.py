@@ -19,6 +19,10 @@ MESSAGES_ZH = {
     "step": "步骤",
     "task": "任务",
     "result": "结果",
+    "loop_hint": "注意：最近几步在相同的界面上重复了相同的操作，界面没有变化。请换一种方式，例如滑动、返回或选择其他元素。",
+    "loop_takeover": "Agent 在当前界面上反复执行相同操作，请人工处理后继续",
+    "loop_aborted": "检测到重复操作，已提前结束任务",
+    "launch_unverified": "注意：上一步启动应用后界面没有变化，无法确认应用已打开。请根据当前截图判断，必要时重新启动或从主屏幕打开。",
 }
 
 # English messages
@@ -40,6 +44,10 @@ MESSAGES_EN = {
     "step": "Step",
     "task": "Task",
     "result": "Result",
+    "loop_hint": "Note: the last steps repeated the same actions on an unchanged screen. Try a different approach, such as swiping, going back or choosing another element.",
+    "loop_takeover": "The agent keeps repeating the same actions on this screen, please resolve it manually",
+    "loop_aborted": "Stopped early after repeated actions",
+    "launch_unverified": "Note: the screen did not change after the last Launch, so the app may not have opened. Check the current screenshot and launch it again or open it from the home screen if needed.",
 }
 
 
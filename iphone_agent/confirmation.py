@@ -0,0 +1,218 @@
+"""Human confirmations and takeovers resolved through an API instead of `input()`.
+
+A callback of `ActionHandler` may return a `PendingRequest` instead of an
+answer. The agent then parks the task in a waiting state and returns from
+`step()` without holding the device or its thread. A later `step()` resumes it
+once the request is resolved, e.g. by `POST /confirmations/{id}` on the
+FastAPI app. Requests not resolved within their timeout expire and count as
+rejected.
+
+`ConfirmationBroker` may be used from any thread; `PendingRequest.wait_async`
+awaits a request on an asyncio event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable
+
+from iphone_agent.metrics import Counter, Gauge
+
+REQUEST_KINDS = ("confirmation", "takeover")
+# Seconds a request waits for a human before it expires (None: never).
+DEFAULT_TIMEOUT = 300.0
+
+CONFIRMATIONS = Counter(
+    "confirmations_total", "Confirmation and takeover requests by outcome", ["kind", "status"]
+)
+CONFIRMATIONS_PENDING = Gauge(
+    "confirmations_pending", "Confirmation and takeover requests awaiting a human"
+)
+
+
+@dataclass
+class PendingRequest:
+    """A confirmation or takeover waiting for a human."""
+
+    id: str
+    kind: str
+    message: str
+    device_id: str | None
+    created_at: float
+    expires_at: float | None
+    # "pending", then "approved", "rejected" or "expired".
+    status: str = "pending"
+    _future: Future = field(default_factory=Future, repr=False, compare=False)
+
+    @property
+    def approved(self) -> bool:
+        return self.status == "approved"
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Block until the request is resolved or expires.
+
+        Returns:
+            Whether it was approved (False if still pending after `timeout`).
+        """
+        try:
+            return self._future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            return False
+
+    async def wait_async(self) -> bool:
+        """Await the request on the running event loop; returns whether it was approved."""
+        return await asyncio.wrap_future(self._future)
+
+    def add_done_callback(self, fn: Callable[[PendingRequest], None]) -> None:
+        """Call `fn(request)` once resolved (at once, if it already is)."""
+        self._future.add_done_callback(lambda _: fn(self))
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "message": self.message,
+            "device_id": self.device_id,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
+            "status": self.status,
+        }
+
+
+class ConfirmationBroker:
+    """
+    Pending confirmations and takeovers, resolved by ID.
+
+    Args:
+        timeout: Default seconds before a request expires (None: never).
+    """
+
+    def __init__(self, timeout: float | None = DEFAULT_TIMEOUT) -> None:
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pending: dict[str, PendingRequest] = {}
+        self._timers: dict[str, threading.Timer] = {}
+
+    def request(
+        self,
+        kind: str,
+        message: str,
+        device_id: str | None = None,
+        timeout: float | None = None,
+    ) -> PendingRequest:
+        """
+        Open a request for a human.
+
+        Args:
+            kind: "confirmation" or "takeover".
+            message: What the human is asked to confirm or do.
+            device_id: Device the task runs on.
+            timeout: Seconds before it expires (default: the broker's).
+
+        Returns:
+            The PendingRequest.
+        """
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"kind must be one of {REQUEST_KINDS}")
+        timeout = self.timeout if timeout is None else timeout
+        now = time.time()
+        request = PendingRequest(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            message=message,
+            device_id=device_id,
+            created_at=now,
+            expires_at=now + timeout if timeout is not None else None,
+        )
+        with self._lock:
+            self._pending[request.id] = request
+            if timeout is not None:
+                timer = threading.Timer(timeout, self._finish, (request.id, "expired"))
+                timer.daemon = True
+                self._timers[request.id] = timer
+                timer.start()
+        CONFIRMATIONS_PENDING.inc()
+        return request
+
+    def resolve(self, request_id: str, approved: bool) -> PendingRequest | None:
+        """
+        Approve or reject a pending request.
+
+        For a takeover, approving means the manual operation is done.
+
+        Returns:
+            The resolved request, or None if it is unknown or no longer pending.
+        """
+        return self._finish(request_id, "approved" if approved else "rejected")
+
+    def get(self, request_id: str) -> PendingRequest | None:
+        with self._lock:
+            return self._pending.get(request_id)
+
+    def pending(self, device_id: str | None = None) -> list[PendingRequest]:
+        """Pending requests, oldest first; only one device's if `device_id` is set."""
+        with self._lock:
+            requests = list(self._pending.values())
+        if device_id is not None:
+            requests = [r for r in requests if r.device_id == device_id]
+        return requests
+
+    def confirmation_callback(
+        self, device_id: str | None = None, timeout: float | None = None
+    ) -> Callable[[str], PendingRequest]:
+        """A `confirmation_callback` for `PhoneAgent` that opens a request."""
+        return lambda message: self.request("confirmation", message, device_id, timeout)
+
+    def takeover_callback(
+        self, device_id: str | None = None, timeout: float | None = None
+    ) -> Callable[[str], PendingRequest]:
+        """A `takeover_callback` for `PhoneAgent` that opens a request."""
+        return lambda message: self.request("takeover", message, device_id, timeout)
+
+    def _finish(self, request_id: str, status: str) -> PendingRequest | None:
+        with self._lock:
+            request = self._pending.pop(request_id, None)
+            timer = self._timers.pop(request_id, None)
+        if request is None:
+            return None
+        if timer is not None:
+            timer.cancel()
+        request.status = status
+        CONFIRMATIONS_PENDING.dec()
+        CONFIRMATIONS.labels(request.kind, status).inc()
+        request._future.set_result(status == "approved")
+        return request
+
+
+_active_broker: ConfirmationBroker | None = None
+_broker_lock = threading.Lock()
+
+
+def get_confirmation_broker() -> ConfirmationBroker:
+    """Get the shared broker, created on first use (`CONFIRMATION_TIMEOUT` seconds)."""
+    global _active_broker
+    with _broker_lock:
+        if _active_broker is None:
+            timeout = os.getenv("CONFIRMATION_TIMEOUT")
+            _active_broker = ConfirmationBroker(
+                float(timeout) if timeout else DEFAULT_TIMEOUT
+            )
+        return _active_broker
+
+
+def set_confirmation_broker(broker: ConfirmationBroker) -> None:
+    """Replace the shared broker."""
+    global _active_broker
+    with _broker_lock:
+        _active_broker = broker
@@ -0,0 +1,172 @@
+"""Versioned content slot shared between the agent and the iOS Shortcut.
+
+Every posted payload gets the next sequence number. Readers pass the last
+sequence they consumed and can wait for a newer one, so the Shortcut never
+reads a stale value twice and picks up new content as soon as it is posted.
+
+`publish` may be called from any thread; `wait_for` is awaited on an asyncio
+event loop (the FastAPI server). `ChannelRegistry` keeps one channel per
+device and evicts the least recently used idle ones.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ContentEntry:
+    """One published payload."""
+
+    seq: int
+    content: str
+    launch_app: bool
+    created_at: float
+
+    def to_dict(self) -> dict:
+        data = {"seq": self.seq, "content": self.content}
+        if self.launch_app:
+            data["launch_app"] = True
+        return data
+
+
+_EMPTY = ContentEntry(seq=0, content="", launch_app=False, created_at=0.0)
+
+
+class ContentChannel:
+    """Latest payload plus the readers waiting for the next one."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entry = _EMPTY
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        # Open push streams; they keep the channel alive between events.
+        self.subscribers = 0
+
+    @property
+    def latest(self) -> ContentEntry:
+        return self._entry
+
+    def publish(self, content: str, launch_app: bool = False) -> ContentEntry:
+        """
+        Store a new payload and wake every waiting reader.
+
+        Args:
+            content: Text or URL handed to the Shortcut.
+            launch_app: Whether the Shortcut should open `content` as an app URL.
+
+        Returns:
+            The stored ContentEntry with its sequence number.
+        """
+        with self._lock:
+            entry = ContentEntry(
+                seq=self._entry.seq + 1,
+                content=content,
+                launch_app=launch_app,
+                created_at=time.time(),
+            )
+            self._entry = entry
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future, entry)
+        return entry
+
+    async def wait_for(self, after: int, timeout: float) -> ContentEntry | None:
+        """
+        Wait until an entry newer than `after` is published.
+
+        A sequence number ahead of the channel (from before a server restart)
+        returns the current entry right away so the reader can resync.
+
+        Args:
+            after: Last sequence number the reader has seen.
+            timeout: Maximum wait in seconds.
+
+        Returns:
+            The newer entry, or None on timeout.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._entry.seq != after:
+                return self._entry
+            if timeout <= 0:
+                return None
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    @property
+    def waiting(self) -> int:
+        """Number of readers currently waiting."""
+        return len(self._waiters)
+
+    @property
+    def idle(self) -> bool:
+        """True when no reader is waiting and no stream is subscribed."""
+        return not self._waiters and not self.subscribers
+
+
+class ChannelRegistry:
+    """Per-device channels with O(1) lookup and LRU eviction of idle channels."""
+
+    def __init__(self, max_channels: int = 1024) -> None:
+        if max_channels < 1:
+            raise ValueError("max_channels must be at least 1")
+        self.max_channels = max_channels
+        self._lock = threading.Lock()
+        self._channels: OrderedDict[str, ContentChannel] = OrderedDict()
+        self.evictions = 0
+
+    def get(self, device_id: str) -> ContentChannel:
+        """
+        Get the channel of a device, creating it on first use.
+
+        Creating a channel may evict the least recently used channels that
+        have no waiting readers; their last payload is dropped.
+        """
+        with self._lock:
+            channel = self._channels.get(device_id)
+            if channel is not None:
+                self._channels.move_to_end(device_id)
+                return channel
+            channel = ContentChannel()
+            self._channels[device_id] = channel
+            self._evict(keep=device_id)
+            return channel
+
+    def _evict(self, keep: str) -> None:
+        # Channels with waiting readers or open streams are skipped, so the
+        # bound is soft while more than `max_channels` devices are connected.
+        excess = len(self._channels) - self.max_channels
+        victims: list[str] = []
+        for device_id, channel in self._channels.items():
+            if len(victims) >= excess:
+                break
+            if device_id != keep and channel.idle:
+                victims.append(device_id)
+        for device_id in victims:
+            del self._channels[device_id]
+        self.evictions += len(victims)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._channels
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+
+def _resolve(future: asyncio.Future, entry: ContentEntry) -> None:
+    if not future.done():
+        future.set_result(entry)
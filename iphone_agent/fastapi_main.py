@@ -1,45 +1,170 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-import threading
-from pydantic import BaseModel
-
-app = FastAPI()
-
-# Global variables for storing content in memory
-# Lock to ensure thread safety under concurrent access
-content_lock = threading.Lock()
-
-
-class ContentPayload(BaseModel):
-    content: str
-    launch_app: bool
-
-CONTENT_CACHE = ContentPayload(content="", launch_app=False)
-
-@app.post("/content")
-def set_content(payload: ContentPayload):
-    """Set the latest content (in-memory only; not persisted to disk)."""
-    global CONTENT_CACHE
-    print("Received content:", payload)
-
-    with content_lock:
-        CONTENT_CACHE = payload
-    if payload.launch_app:
-        return JSONResponse({"success": True, "content": CONTENT_CACHE.content, "launch_app": payload.launch_app})
-
-    return JSONResponse({"success": True, "content": CONTENT_CACHE.content})
-
-
-@app.get("/content")
-def get_latest_content():
-    """
-    Get the latest content (in-memory only).
-    """
-    global CONTENT_CACHE
-
-    with content_lock:
-        payload = CONTENT_CACHE
-    if payload.launch_app:
-        return JSONResponse({"success": True, "content": CONTENT_CACHE.content, "launch_app": payload.launch_app})
-
-    return JSONResponse({"success": True, "content": CONTENT_CACHE.content})
\ No newline at end of file
+import json
+import os
+from typing import AsyncIterator
+
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from iphone_agent import metrics
+from iphone_agent.confirmation import get_confirmation_broker
+from iphone_agent.content_channel import ChannelRegistry, ContentChannel
+
+app = FastAPI()
+
+# Latest content, kept in memory only. Each post gets a new sequence number.
+# `/content` serves the single-device setup; `/devices/{device_id}/content`
+# gives every device its own channel.
+CONTENT_CHANNEL = ContentChannel()
+DEVICE_CHANNELS = ChannelRegistry(int(os.getenv("CONTENT_MAX_CHANNELS", "1024")))
+
+# Upper bound for a single long-poll request, in seconds.
+MAX_WAIT_SECONDS = 60.0
+# Idle streams get a comment line this often so proxies keep them open.
+STREAM_KEEPALIVE_SECONDS = 15.0
+
+
+class ContentPayload(BaseModel):
+    content: str
+    launch_app: bool = False
+
+
+class ConfirmationDecision(BaseModel):
+    # For a takeover, true means the manual operation is done.
+    approved: bool
+
+
+def _publish(channel: ContentChannel, payload: ContentPayload) -> JSONResponse:
+    entry = channel.publish(payload.content, payload.launch_app)
+    return JSONResponse({"success": True, **entry.to_dict()})
+
+
+async def _read(channel: ContentChannel, after: int | None, wait: float) -> JSONResponse:
+    if after is None:
+        return JSONResponse({"success": True, **channel.latest.to_dict()})
+
+    entry = await channel.wait_for(after, min(wait, MAX_WAIT_SECONDS))
+    if entry is None:
+        return JSONResponse({"success": True, "updated": False, "seq": channel.latest.seq})
+    return JSONResponse({"success": True, "updated": True, **entry.to_dict()})
+
+
+async def _events(channel: ContentChannel, after: int) -> AsyncIterator[str]:
+    channel.subscribers += 1
+    try:
+        while True:
+            entry = await channel.wait_for(after, STREAM_KEEPALIVE_SECONDS)
+            if entry is None:
+                yield ": keepalive\n\n"
+                continue
+            after = entry.seq
+            data = json.dumps(entry.to_dict(), ensure_ascii=False)
+            yield f"id: {entry.seq}\nevent: content\ndata: {data}\n\n"
+    finally:
+        channel.subscribers -= 1
+
+
+def _stream(channel: ContentChannel, after: int | None, last_event_id: str | None):
+    # Reconnecting EventSource clients resume from Last-Event-ID; a fresh
+    # subscriber only gets content posted from now on.
+    if after is None:
+        if last_event_id and last_event_id.isdigit():
+            after = int(last_event_id)
+        else:
+            after = channel.latest.seq
+    return StreamingResponse(
+        _events(channel, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/content")
+async def set_content(payload: ContentPayload):
+    """Set the latest content (in-memory only; not persisted to disk)."""
+    print("Received content:", payload)
+    return _publish(CONTENT_CHANNEL, payload)
+
+
+@app.get("/content")
+async def get_latest_content(
+    after: int | None = Query(None, description="Last sequence number already consumed"),
+    wait: float = Query(0.0, ge=0.0, description="Seconds to wait for newer content"),
+):
+    """
+    Get the latest content (in-memory only).
+
+    With `after`, only content newer than that sequence number is returned:
+    the request waits up to `wait` seconds for it and otherwise answers with
+    `"updated": false` and the current sequence number.
+    """
+    return await _read(CONTENT_CHANNEL, after, wait)
+
+
+@app.get("/content/stream")
+async def stream_content(
+    after: int | None = Query(None, description="Last sequence number already consumed"),
+    last_event_id: str | None = Header(None),
+):
+    """
+    Server-Sent Events stream pushing every new content as it is posted.
+
+    Each event carries the same fields as `GET /content`, with `id` set to the
+    sequence number.
+    """
+    return _stream(CONTENT_CHANNEL, after, last_event_id)
+
+
+@app.post("/devices/{device_id}/content")
+async def set_device_content(device_id: str, payload: ContentPayload):
+    """Set the latest content of one device."""
+    return _publish(DEVICE_CHANNELS.get(device_id), payload)
+
+
+@app.get("/devices/{device_id}/content")
+async def get_device_content(
+    device_id: str,
+    after: int | None = Query(None, description="Last sequence number already consumed"),
+    wait: float = Query(0.0, ge=0.0, description="Seconds to wait for newer content"),
+):
+    """Get the latest content of one device; see `GET /content`."""
+    return await _read(DEVICE_CHANNELS.get(device_id), after, wait)
+
+
+@app.get("/devices/{device_id}/content/stream")
+async def stream_device_content(
+    device_id: str,
+    after: int | None = Query(None, description="Last sequence number already consumed"),
+    last_event_id: str | None = Header(None),
+):
+    """Server-Sent Events stream of one device; see `GET /content/stream`."""
+    return _stream(DEVICE_CHANNELS.get(device_id), after, last_event_id)
+
+
+@app.get("/confirmations")
+async def list_confirmations(
+    device_id: str | None = Query(None, description="Only this device's requests"),
+):
+    """Confirmations and takeovers waiting for a human, oldest first."""
+    requests = get_confirmation_broker().pending(device_id)
+    return JSONResponse({"success": True, "pending": [r.to_dict() for r in requests]})
+
+
+@app.post("/confirmations/{request_id}")
+async def resolve_confirmation(request_id: str, decision: ConfirmationDecision):
+    """
+    Approve or reject a pending confirmation or takeover.
+
+    The agent waiting on it resumes on its next step. Unknown, expired and
+    already resolved requests answer 404.
+    """
+    request = get_confirmation_broker().resolve(request_id, decision.approved)
+    if request is None:
+        raise HTTPException(status_code=404, detail="No pending request with this ID")
+    return JSONResponse({"success": True, **request.to_dict()})
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Metrics of this process in the Prometheus text format."""
+    return PlainTextResponse(metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
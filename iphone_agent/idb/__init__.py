@@ -1,17 +1,31 @@
-"""IDB utilities for Android device interaction."""
-from iphone_agent.idb.device import (
-    double_tap,
-    back,
-    home,
-    launch_app,
-    long_press,
-    swipe,
-    tap,
-)
-from iphone_agent.idb.input import (
-    copy_text,
-)
-from iphone_agent.idb.screenshot import get_screenshot
+"""IDB utilities for Android device interaction.
+
+The device modules are imported on first access: they load Pillow, OpenCV
+and requests.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from iphone_agent.idb.device import (
+        LaunchResult,
+        double_tap,
+        back,
+        drag,
+        flick,
+        home,
+        launch_app,
+        long_press,
+        scroll_by,
+        swipe,
+        tap,
+    )
+    from iphone_agent.idb.input import (
+        choose_typing_strategy,
+        copy_text,
+        type_text,
+    )
+    from iphone_agent.idb.screenshot import get_screenshot
 
 __all__ = [
     # Screenshot
@@ -19,11 +33,48 @@ __all__ = [
     "back",
     # Input
     "copy_text",
+    "type_text",
+    "choose_typing_strategy",
     # Device control
     "tap",
     "swipe",
+    "flick",
+    "scroll_by",
+    "drag",
     "home",
     "double_tap",
     "long_press",
     "launch_app",
+    "LaunchResult",
 ]
+
+_LAZY = {
+    "get_screenshot": "iphone_agent.idb.screenshot",
+    "copy_text": "iphone_agent.idb.input",
+    "type_text": "iphone_agent.idb.input",
+    "choose_typing_strategy": "iphone_agent.idb.input",
+    **{
+        name: "iphone_agent.idb.device"
+        for name in (
+            "LaunchResult",
+            "double_tap",
+            "back",
+            "drag",
+            "flick",
+            "home",
+            "launch_app",
+            "long_press",
+            "scroll_by",
+            "swipe",
+            "tap",
+        )
+    },
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        value = getattr(import_module(_LAZY[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,220 @@
+"""Timing calibration for PiKVM HID actions.
+
+Probes the device with each primitive, measures how long the screen takes to
+change and settle afterwards, and writes the smallest safe delays as a
+`TimingProfile` JSON file (load it with `PIKVM_TIMING_PROFILE=<file>`).
+
+The probe starts on the home screen: `--tap` must point at an app icon, and the
+swipe is performed inside the app it opens.
+
+`--fingerprint-app` instead records the screen an app settles on after launch
+into a fingerprints file for verified launches (`PIKVM_APP_FINGERPRINTS`).
+
+Usage:
+    python -m iphone_agent.idb.calibration --tap 150,150 --output timing.json
+    python -m iphone_agent.idb.calibration --fingerprint-app WeChat \\
+        --fingerprints fingerprints.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import time
+from dataclasses import replace
+from typing import Callable
+
+from iphone_agent.config.apps import APP_SPLASH_FINGERPRINTS
+from iphone_agent.idb.device import back, home, launch_app, swipe, tap
+from iphone_agent.idb.frames import fetch_signature, wait_for_change, wait_for_stable
+from iphone_agent.idb.timing import TimingProfile, get_timing_profile, save_timing_profile
+
+# Safety margin applied to the slowest measured settle time.
+DEFAULT_MARGIN = 1.25
+# Delays are rounded up to this granularity (seconds).
+_ROUNDING_S = 0.01
+
+
+def measure_settle(
+    action: Callable[[], object], timeout: float = 5.0, poll_interval: float = 0.03
+) -> float | None:
+    """
+    Run an action and measure the time until the screen has changed and settled.
+
+    Args:
+        action: Callable sending the HID events (without any trailing delay).
+        timeout: Maximum time to wait for the change and for settling.
+        poll_interval: Pause between snapshots in seconds.
+
+    Returns:
+        Seconds from the end of the action until the screen settled, or None if
+        the screen did not change.
+    """
+    baseline = fetch_signature()
+    action()
+    start = time.perf_counter()
+    if wait_for_change(baseline, timeout=timeout, poll_interval=poll_interval) is None:
+        return None
+    stable_start = time.perf_counter()
+    _, settled_at, _ = wait_for_stable(timeout=timeout, poll_interval=poll_interval)
+    return stable_start - start + settled_at
+
+
+def safe_delay(samples: list[float], margin: float = DEFAULT_MARGIN) -> float:
+    """Smallest delay covering every sample, with a safety margin."""
+    value = max(samples) * margin
+    return math.ceil(value / _ROUNDING_S) * _ROUNDING_S
+
+
+def calibrate(
+    tap_point: tuple[int, int],
+    rounds: int = 5,
+    app_name: str | None = None,
+    margin: float = DEFAULT_MARGIN,
+    base: TimingProfile | None = None,
+    timeout: float = 5.0,
+) -> tuple[TimingProfile, dict[str, list[float]]]:
+    """
+    Measure settle times of the HID primitives and derive a timing profile.
+
+    Args:
+        tap_point: HID coordinates of an app icon on the home screen.
+        rounds: Number of measurements per primitive.
+        app_name: Optional app (from APP_PACKAGES) used to probe launch_app.
+        margin: Safety margin applied to the slowest sample.
+        base: Profile providing the delays that are not measured.
+        timeout: Maximum time to wait for a single primitive to settle.
+
+    Returns:
+        Tuple of (calibrated profile, raw samples per timing name).
+    """
+    x, y = tap_point
+    probes: list[tuple[str, Callable[[], object]]] = [
+        ("tap_after", lambda: tap(x, y, delay=0)),
+        ("swipe_after", lambda: swipe(x, y + 8000, x, y - 8000, None, delay=0)),
+        ("home_after", lambda: home(delay=0)),
+        ("tap_after", lambda: tap(x, y, delay=0)),
+        ("back_after", lambda: back(delay=0)),
+        ("home_after", lambda: home(delay=0)),
+    ]
+    if app_name:
+        probes += [
+            ("launch_after", lambda: launch_app(app_name, delay=0)),
+            ("home_after", lambda: home(delay=0)),
+        ]
+
+    samples: dict[str, list[float]] = {}
+    home(delay=0)
+    wait_for_stable(timeout=timeout)
+    for _ in range(rounds):
+        for name, action in probes:
+            settle = measure_settle(action, timeout=timeout)
+            if settle is not None:
+                samples.setdefault(name, []).append(settle)
+
+    delays = {name: safe_delay(values, margin) for name, values in samples.items()}
+    # Double tap and long press end like a tap.
+    if "tap_after" in delays:
+        delays.setdefault("double_tap_after", delays["tap_after"])
+        delays.setdefault("long_press_after", delays["tap_after"])
+    profile = replace(base or get_timing_profile(), **delays)
+    return profile, samples
+
+
+def record_app_fingerprint(app_name: str, path: str, timeout: float = 5.0) -> int:
+    """
+    Launch an app, fingerprint the screen it settles on and save it to `path`.
+
+    Args:
+        app_name: App name from APP_PACKAGES.
+        path: Fingerprints JSON file; existing entries are kept.
+        timeout: Maximum time to wait for the launch and for settling.
+
+    Returns:
+        The recorded dHash.
+    """
+    # Verify by screen change, not by a possibly stale fingerprint.
+    APP_SPLASH_FINGERPRINTS.pop(app_name, None)
+    result = launch_app(app_name, delay=0, timeout=timeout)
+    # An unverified launch may have left another screen in front.
+    if not result or not result.verified:
+        raise RuntimeError(f"Could not launch {app_name}: {result.message}")
+    signature, _, _ = wait_for_stable(timeout=timeout)
+
+    data: dict[str, str] = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    data[app_name] = f"{signature.dhash:016x}"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    return signature.dhash
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Calibrate PiKVM HID action timings")
+    parser.add_argument(
+        "--tap",
+        type=str,
+        default=None,
+        metavar="X,Y",
+        help="HID coordinates of an app icon on the home screen",
+    )
+    parser.add_argument("--rounds", type=int, default=5, help="Samples per primitive")
+    parser.add_argument("--app", type=str, default=None, help="App used to probe launch")
+    parser.add_argument(
+        "--margin", type=float, default=DEFAULT_MARGIN, help="Safety margin factor"
+    )
+    parser.add_argument("--timeout", type=float, default=5.0, help="Per-probe timeout")
+    parser.add_argument(
+        "--output", type=str, default="timing_profile.json", help="Profile JSON path"
+    )
+    parser.add_argument(
+        "--fingerprint-app",
+        type=str,
+        default=None,
+        metavar="APP",
+        help="Record the launch fingerprint of an app instead of calibrating",
+    )
+    parser.add_argument(
+        "--fingerprints",
+        type=str,
+        default="app_fingerprints.json",
+        help="Fingerprints JSON path used with --fingerprint-app",
+    )
+    args = parser.parse_args()
+    if args.fingerprint_app is None and args.tap is None:
+        parser.error("--tap is required for calibration")
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    if args.fingerprint_app:
+        value = record_app_fingerprint(args.fingerprint_app, args.fingerprints, args.timeout)
+        print(f"{args.fingerprint_app}: {value:016x} written to {args.fingerprints}")
+        return
+
+    x, y = (int(v) for v in args.tap.split(","))
+    profile, samples = calibrate(
+        (x, y),
+        rounds=args.rounds,
+        app_name=args.app,
+        margin=args.margin,
+        timeout=args.timeout,
+    )
+    defaults = TimingProfile()
+    for name, value in profile.to_dict().items():
+        measured = samples.get(name)
+        detail = f" (max measured {max(measured):.3f}s)" if measured else ""
+        print(f"{name:<24} {getattr(defaults, name):>6.2f}s -> {value:>6.2f}s{detail}")
+    save_timing_profile(profile, args.output)
+    print(f"Timing profile written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
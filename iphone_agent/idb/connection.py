@@ -14,12 +14,17 @@ import json
 import logging
 import ssl
 import sys
+import time
 from dataclasses import dataclass
 from typing import Any, Mapping
 from urllib.error import HTTPError, URLError
+from urllib.parse import quote
 from urllib.request import Request, urlopen
 from functools import wraps
 
+from iphone_agent import cancellation
+from iphone_agent.metrics import Counter, Histogram
+
 logger = logging.getLogger(__name__)
 base_url = os.getenv("PIKVM_BASE_URL", "https://your_host_ip")
 username = os.getenv("PIKVM_USERNAME", "admin")
@@ -27,6 +32,13 @@ password = os.getenv("PIKVM_PASSWORD", "admin")
 verify_ssl = os.getenv("PIKVM_VERIFY_SSL", "0").strip() in {"1", "true", "True"}
 _DEFAULT_TIMEOUT = float(os.getenv("PIKVM_TIMEOUT", "10"))
 
+PIKVM_REQUEST_SECONDS = Histogram(
+    "pikvm_request_seconds", "PiKVM HTTP request latency", ["method", "endpoint"]
+)
+PIKVM_REQUESTS = Counter(
+    "pikvm_requests_total", "PiKVM HTTP requests by status", ["method", "endpoint", "status"]
+)
+
 @dataclass(frozen=True)
 class HttpsResponse:
 	url: str
@@ -61,12 +73,22 @@ class PiKvmHttpsClient:
 		self._base_url = base_url.rstrip("/")
 		self._timeout = timeout
 		self._auth_header = _basic_auth_header(username, password)
-		self._ssl_context = _build_ssl_context(verify_ssl=verify_ssl)
+		self._verify_ssl = verify_ssl
+		# Loading the CA store takes tens of milliseconds: built by the first request.
+		self._ssl_context: ssl.SSLContext | None = None
+		self._ssl_ready = False
 
 	@property
 	def base_url(self) -> str:
 		return self._base_url
 
+	@property
+	def ssl_context(self) -> ssl.SSLContext | None:
+		if not self._ssl_ready:
+			self._ssl_context = _build_ssl_context(verify_ssl=self._verify_ssl)
+			self._ssl_ready = True
+		return self._ssl_context
+
 	def request(
 		self,
 		endpoint: str,
@@ -93,6 +115,7 @@ class PiKvmHttpsClient:
 		Raises:
 			HTTPError/URLError/TimeoutError and other exceptions from urllib.
 			Exceptions are printed (stderr) and logged before being re-raised.
+			Cancelled: If the running task was cancelled or is past its deadline.
 		"""
 
 		url = _join_url(self._base_url, endpoint)
@@ -118,30 +141,42 @@ class PiKvmHttpsClient:
 		for key, value in request_headers.items():
 			req.add_header(key, value)
 
-		actual_timeout = self._timeout if timeout is None else timeout
+		# Never wait past the running task's deadline (raises if it has passed).
+		actual_timeout = cancellation.remaining(self._timeout if timeout is None else timeout)
 
+		path = "/" + endpoint.split("?", 1)[0].lstrip("/")
+		status = "error"
+		start = time.perf_counter()
 		try:
-			with urlopen(req, timeout=actual_timeout, context=self._ssl_context) as resp:
+			with urlopen(req, timeout=actual_timeout, context=self.ssl_context) as resp:
 				raw = resp.read()
 				resp_headers = {k: v for k, v in resp.headers.items()}
+				status = getattr(resp, "status", 200)
 				return HttpsResponse(
 					url=url,
-					status=getattr(resp, "status", 200),
+					status=status,
 					headers=resp_headers,
 					body=raw,
 				)
 		except HTTPError as e:
+			status = e.code
 			_emit_exception(normalized_method, url, e)
 			raise
 		except URLError as e:
 			_emit_exception(normalized_method, url, e)
 			raise
 		except TimeoutError as e:
+			status = "timeout"
 			_emit_exception(normalized_method, url, e)
 			raise
 		except Exception as e:
 			_emit_exception(normalized_method, url, e)
 			raise
+		finally:
+			PIKVM_REQUEST_SECONDS.labels(normalized_method, path).observe(
+				time.perf_counter() - start
+			)
+			PIKVM_REQUESTS.labels(normalized_method, path, status).inc()
 
 
 def _join_url(base_url: str, endpoint: str) -> str:
@@ -193,9 +228,45 @@ def ensure_connected(fn):
 
     return wrapper
 
+# Shared client; cheap to build (no connection or SSL setup until the first request).
 client = PiKvmHttpsClient(
     base_url,
     username=username,
     password=password,
     verify_ssl=verify_ssl,
-)
\ No newline at end of file
+)
+
+
+def configure_client(
+    base_url: str,
+    username: str = "admin",
+    password: str = "admin",
+    *,
+    verify_ssl: bool = False,
+    timeout: float = 10.0,
+) -> PiKvmHttpsClient:
+    """Point the shared `client` at another PiKVM (e.g. the local simulator).
+
+    The shared instance is updated in place, so modules that imported `client`
+    pick up the new target without being reloaded.
+    """
+    client.__init__(
+        base_url,
+        username=username,
+        password=password,
+        verify_ssl=verify_ssl,
+        timeout=timeout,
+    )
+    return client
+
+
+# Content server shared with the iOS Shortcuts (iphone_agent/fastapi_main.py).
+CONTENT_SERVER_URL = os.getenv("CONTENT_SERVER_URL", "http://127.0.0.1:6666")
+
+
+def content_url(device_id: str | None = None) -> str:
+    """URL of the content channel of a device (the shared channel if None)."""
+    base = CONTENT_SERVER_URL.rstrip("/")
+    if device_id:
+        return f"{base}/devices/{quote(device_id, safe='')}/content"
+    return f"{base}/content"
@@ -6,71 +6,98 @@ All operations are executed via the shared HTTPS `client` and PiKVM HID endpoint
 from __future__ import annotations
 import os
 import time
+from dataclasses import dataclass
 import requests
-from iphone_agent.config.apps import APP_PACKAGES
+from iphone_agent import cancellation
+from iphone_agent.config.apps import APP_PACKAGES, APP_SPLASH_FINGERPRINTS
 from iphone_agent.idb.connection import client, ensure_connected
+from iphone_agent.idb.frames import (
+    FrameSignature,
+    fetch_signature,
+    hamming_distance,
+    wait_for_change,
+    wait_for_stable,
+)
+from iphone_agent.idb.gesture import (
+    DRAG,
+    FLICK,
+    SCROLL,
+    GestureProfile,
+    GestureResult,
+    perform_gesture,
+)
+from iphone_agent.idb.publisher import publish_content
+from iphone_agent.idb.timing import get_timing_profile
 _DEFAULT_TIMEOUT = float(os.getenv("PIKVM_TIMEOUT", "10"))
+_LAUNCH_POLL_INTERVAL = 0.05
+# dHash bits that may differ between a splash screen and its fingerprint.
+FINGERPRINT_MAX_DISTANCE = 10
+# HID units spanning the whole screen (see ActionHandler._convert_relative_to_absolute).
+_HID_SPAN = 65000
 
 # @ensure_connected
-def tap(x: int, y: int, device_id: str | None = None, delay: float = 1.0) -> None:
+def tap(
+    x: int, y: int, device_id: str | None = None, delay: float | None = None
+) -> None:
     """
     Tap at the specified coordinates.
     Args:
         x: X coordinate.
         y: Y coordinate.
-        delay: Delay in seconds after tap.
+        delay: Delay in seconds after tap (timing profile if None).
     """
     client.request(
     f"/api/hid/events/send_mouse_move?to_x={x}&to_y={y}",
     "POST",
     timeout=_DEFAULT_TIMEOUT,
     )
-    # time.sleep(0.5)
     client.request(
         "/api/hid/events/send_mouse_button?button=left",
         "POST",
         timeout=_DEFAULT_TIMEOUT,
     )
-    # time.sleep(delay)
+    cancellation.sleep(get_timing_profile().tap_after if delay is None else delay)
 
 
 @ensure_connected
 def double_tap(
-    x: int, y: int, delay: float = 1.0
+    x: int, y: int, device_id: str | None = None, delay: float | None = None
 ) -> None:
     """
     Double tap at the specified coordinates.
     Args:
         x: X coordinate.
         y: Y coordinate.
-        delay: Delay in seconds after double tap.
+        delay: Delay in seconds after double tap (timing profile if None).
     """
+    timing = get_timing_profile()
     client.request(
     f"/api/hid/events/send_mouse_move?to_x={x}&to_y={y}",
     "POST",
     timeout=_DEFAULT_TIMEOUT,
     )
-    time.sleep(0.5)
+    cancellation.sleep(timing.double_tap_move)
     client.request(
         "/api/hid/events/send_mouse_button?button=left",
         "POST",
         timeout=_DEFAULT_TIMEOUT,
     )
-    time.sleep(0.2)
+    cancellation.sleep(timing.double_tap_interval)
     client.request(
         "/api/hid/events/send_mouse_button?button=left",
         "POST",
         timeout=_DEFAULT_TIMEOUT,
     )
-    time.sleep(delay)
+    cancellation.sleep(timing.double_tap_after if delay is None else delay)
 
 
 @ensure_connected
 def long_press(
     x: int,
     y: int,
-    duration_ms: int = 3000,
-    delay: float = 1.0,
+    duration_ms: int | None = None,
+    device_id: str | None = None,
+    delay: float | None = None,
 ) -> None:
     """
     Long press at the specified coordinates.
@@ -78,28 +105,33 @@ def long_press(
     Args:
         x: X coordinate.
         y: Y coordinate.
-        duration_ms: Duration of press in milliseconds.
+        duration_ms: Duration of press in milliseconds (timing profile if None).
         device_id: Optional ADB device ID.
-        delay: Delay in seconds after long press.
+        delay: Delay in seconds after long press (timing profile if None).
     """
+    timing = get_timing_profile()
+    if duration_ms is None:
+        duration_ms = int(timing.long_press_hold * 1000)
     client.request(
     f"/api/hid/events/send_mouse_move?to_x={x}&to_y={y}",
     "POST",
     timeout=_DEFAULT_TIMEOUT,
     )
-    time.sleep(0.5)
-    client.request(
-        "/api/hid/events/send_mouse_button?button=left&state=1",
-        "POST",
-        timeout=_DEFAULT_TIMEOUT,
-    )
-    time.sleep(max(0.0, duration_ms / 1000.0))
-    client.request(
-        "/api/hid/events/send_mouse_button?button=left&state=0",
-        "POST",
-        timeout=_DEFAULT_TIMEOUT,
-    )
-    time.sleep(delay)
+    cancellation.sleep(timing.long_press_move)
+    # Always release a pressed button, even if the task is cancelled meanwhile.
+    with cancellation.shielded():
+        client.request(
+            "/api/hid/events/send_mouse_button?button=left&state=1",
+            "POST",
+            timeout=_DEFAULT_TIMEOUT,
+        )
+        time.sleep(max(0.0, duration_ms / 1000.0))
+        client.request(
+            "/api/hid/events/send_mouse_button?button=left&state=0",
+            "POST",
+            timeout=_DEFAULT_TIMEOUT,
+        )
+    cancellation.sleep(timing.long_press_after if delay is None else delay)
 
 
 @ensure_connected
@@ -109,8 +141,9 @@ def swipe(
     end_x: int,
     end_y: int,
     duration_ms: int | None = 1000,
-    delay: float = 1.0,
-) -> None:
+    delay: float | None = None,
+    profile: GestureProfile = SCROLL,
+) -> GestureResult:
     """
     Swipe from start to end coordinates.
 
@@ -119,131 +152,243 @@ def swipe(
         start_y: Starting Y coordinate.
         end_x: Ending X coordinate.
         end_y: Ending Y coordinate.
-        duration_ms: Duration of swipe in milliseconds (auto-calculated if None).
-        delay: Delay in seconds after swipe.
+        duration_ms: Duration of swipe in milliseconds (profile default if None).
+        delay: Delay in seconds after swipe (timing profile if None).
+        profile: Gesture profile (SCROLL, FLICK or DRAG).
+
+    Returns:
+        GestureResult with the measured gesture timing.
     """
-    print(start_x, start_y, end_x, end_y, duration_ms)
-    client.request(
-        f"/api/hid/events/send_mouse_move?to_x={start_x}&to_y={start_y}",
-        "POST",
-        timeout=_DEFAULT_TIMEOUT,
-    )
-    time.sleep(0.2)
-    client.request(
-        "/api/hid/events/send_mouse_button?button=left&state=1",
-        "POST",
-        timeout=_DEFAULT_TIMEOUT,
+    result = perform_gesture(
+        (start_x, start_y), (end_x, end_y), profile=profile, duration_ms=duration_ms
     )
+    cancellation.sleep(get_timing_profile().swipe_after if delay is None else delay)
+    return result
 
-    # If a duration is provided, keep the swipe paced (best-effort).
-    if duration_ms is not None and duration_ms > 0:
-        duration_s = duration_ms / 1000.0
-
-        # Aim for ~60 Hz updates; clamp steps to avoid excessive requests.
-        step_dt = 1.0 / 60.0
-        steps = int(duration_s / step_dt)
-        steps = max(2, min(steps, 120))
-
-        start_t = time.perf_counter()
-        for i in range(1, steps):
-            t = i / steps
-            ix = int(round(start_x + (end_x - start_x) * t))
-            iy = int(round(start_y + (end_y - start_y) * t))
-
-            client.request(
-                f"/api/hid/events/send_mouse_move?to_x={ix}&to_y={iy}",
-                "POST",
-                timeout=_DEFAULT_TIMEOUT,
-            )
 
-            # Pace to duration (best-effort).
-            next_t = start_t + t * duration_s
-            time.sleep(max(0.0, next_t - time.perf_counter()))
+def flick(
+    start_x: int,
+    start_y: int,
+    end_x: int,
+    end_y: int,
+    delay: float | None = None,
+) -> GestureResult:
+    """
+    Fast swipe released at speed, so the content keeps scrolling.
+
+    Args:
+        start_x: Starting X coordinate.
+        start_y: Starting Y coordinate.
+        end_x: Ending X coordinate.
+        end_y: Ending Y coordinate.
+        delay: Delay in seconds after the flick (timing profile if None).
+    """
+    return swipe(start_x, start_y, end_x, end_y, None, delay, profile=FLICK)
 
-    client.request(
-        f"/api/hid/events/send_mouse_move?to_x={end_x}&to_y={end_y}",
-        "POST",
-        timeout=_DEFAULT_TIMEOUT,
-    )
-    time.sleep(0.2)
-    client.request(
-        "/api/hid/events/send_mouse_button?button=left&state=0",
-        "POST",
-        timeout=_DEFAULT_TIMEOUT,
-    )
-    time.sleep(delay)
+
+def scroll_by(
+    x: int,
+    y: int,
+    dx: int,
+    dy: int,
+    screen_width: int,
+    screen_height: int,
+    delay: float | None = None,
+) -> GestureResult:
+    """
+    Scroll the content under (x, y) by exactly (dx, dy) pixels, without momentum.
+
+    Args:
+        x: X coordinate where the finger lands, in HID units.
+        y: Y coordinate where the finger lands, in HID units.
+        dx: Horizontal distance in screenshot pixels.
+        dy: Vertical distance in screenshot pixels.
+        screen_width: Screenshot width in pixels.
+        screen_height: Screenshot height in pixels.
+        delay: Delay in seconds after the scroll (timing profile if None).
+
+    Raises:
+        ValueError: If the screen size is not positive.
+    """
+    if screen_width <= 0 or screen_height <= 0:
+        raise ValueError("Screen size must be positive")
+    end_x = x + round(dx * _HID_SPAN / screen_width)
+    end_y = y + round(dy * _HID_SPAN / screen_height)
+    return swipe(x, y, end_x, end_y, None, delay, profile=SCROLL)
+
+
+def drag(
+    start_x: int,
+    start_y: int,
+    end_x: int,
+    end_y: int,
+    delay: float | None = None,
+) -> GestureResult:
+    """
+    Press and hold an item, move it and drop it at the end coordinates.
+
+    Args:
+        start_x: Starting X coordinate.
+        start_y: Starting Y coordinate.
+        end_x: Ending X coordinate.
+        end_y: Ending Y coordinate.
+        delay: Delay in seconds after the drop (timing profile if None).
+    """
+    return swipe(start_x, start_y, end_x, end_y, None, delay, profile=DRAG)
 
 
 @ensure_connected
-def back(delay: float = 1.0) -> None:
+def back(delay: float | None = None) -> None:
     """
     Press the back button.
     client.request("/api/hid/events/send_shortcut?keys=Tab,KeyB", "POST", timeout=float(timeout))
 
     Args:
-        delay: Delay in seconds after pressing back.
+        delay: Delay in seconds after pressing back (timing profile if None).
     """
     client.request(
         "/api/hid/events/send_shortcut?keys=Tab,KeyB",
         "POST",
         timeout=_DEFAULT_TIMEOUT,
     )
-    time.sleep(delay)
+    cancellation.sleep(get_timing_profile().back_after if delay is None else delay)
 
 
 @ensure_connected
-def home(delay: float = 1.0) -> None:
+def home(delay: float | None = None) -> None:
     """
     Press the home button.
     Args:
-        delay: Delay in seconds after pressing home.
+        delay: Delay in seconds after pressing home (timing profile if None).
     """
     client.request(
         "/api/hid/events/send_shortcut?keys=AltLeft,KeyH",
         "POST",
         timeout=_DEFAULT_TIMEOUT,
     )
-    time.sleep(delay)
+    cancellation.sleep(get_timing_profile().home_after if delay is None else delay)
+
+
+@dataclass
+class LaunchResult:
+    """Outcome of an app launch.
+
+    `verified` is False when the launch could not be confirmed either way: the
+    app has no splash fingerprint and the screen did not change, which is also
+    what relaunching the app already in the foreground looks like.
+    """
+
+    success: bool
+    latency: float
+    attempts: int
+    message: str | None = None
+    verified: bool = True
+
+    def __bool__(self) -> bool:
+        return self.success
 
 
 @ensure_connected
-def launch_app(app_name: str, delay: float = 1.0) -> bool:
+def launch_app(
+    app_name: str,
+    delay: float | None = None,
+    timeout: float | None = None,
+    retries: int = 1,
+    device_id: str | None = None,
+) -> LaunchResult:
     """
-    Launch an app by name.
+    Launch an app by name and wait until it is in the foreground.
+
+    Completion is detected by matching the app's splash fingerprint (see
+    APP_SPLASH_FINGERPRINTS) or, without one, by the screen changing and
+    settling after OpenAPP fires. The launch is retried only when it was
+    verified to have failed, i.e. the fingerprint never matched. Without a
+    fingerprint an unchanged screen is ambiguous (the app may already have
+    been in front), so the launch is reported as an unverified success.
+
     Args:
         app_name: The app name (must be in APP_PACKAGES).
-        delay: Delay in seconds after launching.
+        delay: Delay in seconds after launching (timing profile if None).
+        timeout: Seconds to wait for the app per attempt (timing profile if None).
+        retries: Extra attempts after a verified failure.
+        device_id: Device whose content channel receives the app URL.
 
     Returns:
-        True if app was launched, False if app not found.
+        LaunchResult (truthy on success) with the measured launch latency.
     """
+    start = time.perf_counter()
     if app_name not in APP_PACKAGES:
-        return False
-    
-    try:
-        resp = requests.post(
-            "http://127.0.0.1:6666/content",
-            json={"content": APP_PACKAGES[app_name],
-                  "launch_app":True},
+        return LaunchResult(False, 0.0, 0, f"App not found: {app_name}")
+
+    timing = get_timing_profile()
+    if timeout is None:
+        timeout = timing.launch_timeout
+    fingerprint = APP_SPLASH_FINGERPRINTS.get(app_name)
+
+    for attempt in range(1, retries + 2):
+        try:
+            publish_content(APP_PACKAGES[app_name], launch_app=True, device_id=device_id)
+        except requests.RequestException as e:
+            return LaunchResult(
+                False, time.perf_counter() - start, attempt, f"Content server error: {e}"
+            )
+
+        client.request(
+            "/api/hid/events/send_shortcut?keys=AltLeft,KeyC",
+            "POST",
         )
-        resp.raise_for_status()
-    except requests.RequestException:
-        return False
-    
-    client.request(
-        "/api/hid/events/send_shortcut?keys=AltLeft,KeyC",
-        "POST",
-    )
-    time.sleep(0.5)
-    
-    client.request(
-        "/api/hid/events/send_shortcut?keys=AltLeft,KeyC",
-        "POST",
+        cancellation.sleep(timing.launch_trigger_interval)
+
+        client.request(
+            "/api/hid/events/send_shortcut?keys=AltLeft,KeyC",
+            "POST",
+        )
+        cancellation.sleep(timing.launch_open_wait)
+        baseline = fetch_signature()
+        client.request(
+            "/api/hid/events/send_shortcut?keys=AltLeft,KeyO",
+            "POST",
+        )
+        if _wait_for_foreground(baseline, fingerprint, timeout):
+            latency = time.perf_counter() - start
+            cancellation.sleep(timing.launch_after if delay is None else delay)
+            return LaunchResult(True, latency, attempt)
+        if fingerprint is None:
+            return LaunchResult(
+                True,
+                time.perf_counter() - start,
+                attempt,
+                f"Screen did not change within {timeout:.1f}s; "
+                f"{app_name} may already be in the foreground",
+                verified=False,
+            )
+
+    return LaunchResult(
+        False,
+        time.perf_counter() - start,
+        retries + 1,
+        f"{app_name} did not reach the foreground within {timeout:.1f}s",
     )
-    time.sleep(1)
-    client.request(
-        "/api/hid/events/send_shortcut?keys=AltLeft,KeyO",
-        "POST",
+
+
+def _wait_for_foreground(
+    baseline: FrameSignature, fingerprint: int | None, timeout: float
+) -> bool:
+    """Wait until the launched app is visible; False on timeout."""
+    deadline = time.perf_counter() + timeout
+    if fingerprint is not None:
+        while time.perf_counter() < deadline:
+            distance = hamming_distance(fetch_signature().dhash, fingerprint)
+            if distance <= FINGERPRINT_MAX_DISTANCE:
+                return True
+            cancellation.sleep(_LAUNCH_POLL_INTERVAL)
+        return False
+
+    if wait_for_change(baseline, timeout=timeout, poll_interval=_LAUNCH_POLL_INTERVAL) is None:
+        return False
+    # The launch animation counts as part of the launch.
+    wait_for_stable(
+        timeout=max(0.0, deadline - time.perf_counter()),
+        poll_interval=_LAUNCH_POLL_INTERVAL,
     )
-    time.sleep(delay)
     return True
@@ -0,0 +1,153 @@
+"""Cheap frame signatures and screen-change detection.
+
+A signature is a small grayscale copy of a streamer snapshot. JPEG snapshots
+are decoded at reduced scale (`Image.draft`), so computing one costs a
+fraction of a full decode and comparisons work on a few thousand pixels.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image, ImageChops
+
+from iphone_agent import cancellation
+from iphone_agent.idb.connection import client
+
+SIGNATURE_SIZE = (64, 64)
+# Per-pixel change (0-255) treated as JPEG noise rather than a real change.
+PIXEL_TOLERANCE = 24
+# Fraction of changed pixels above which two frames differ.
+CHANGE_THRESHOLD = 0.002
+
+
+@dataclass(frozen=True)
+class FrameSignature:
+    """Downscaled grayscale copy of a frame."""
+
+    pixels: bytes
+    size: tuple[int, int] = SIGNATURE_SIZE
+
+    def image(self) -> Image.Image:
+        return Image.frombytes("L", self.size, self.pixels)
+
+    @property
+    def dhash(self) -> int:
+        """64-bit difference hash, stable across small rendering noise."""
+        small = self.image().resize((9, 8), Image.Resampling.BILINEAR)
+        data = small.tobytes()
+        value = 0
+        for row in range(8):
+            for col in range(8):
+                left = data[row * 9 + col]
+                right = data[row * 9 + col + 1]
+                value = (value << 1) | (1 if left > right else 0)
+        return value
+
+
+def frame_signature(
+    image_bytes: bytes, size: tuple[int, int] = SIGNATURE_SIZE
+) -> FrameSignature:
+    """
+    Compute the signature of an encoded image (JPEG or PNG).
+
+    Args:
+        image_bytes: Encoded image.
+        size: Signature size in pixels.
+
+    Returns:
+        FrameSignature of the image.
+    """
+    img = Image.open(BytesIO(image_bytes))
+    # Let the JPEG decoder downscale while decoding (no-op for other formats).
+    img.draft("L", (size[0] * 2, size[1] * 2))
+    img = img.convert("L").resize(size, Image.Resampling.BILINEAR)
+    return FrameSignature(pixels=img.tobytes(), size=size)
+
+
+def frame_difference(a: FrameSignature, b: FrameSignature) -> float:
+    """Fraction of pixels (0.0-1.0) that changed by more than the noise tolerance."""
+    if a.size != b.size:
+        raise ValueError("Cannot compare signatures of different sizes")
+    diff = ImageChops.difference(a.image(), b.image())
+    histogram = diff.histogram()
+    changed = sum(histogram[PIXEL_TOLERANCE + 1 :])
+    return changed / (a.size[0] * a.size[1])
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+def fetch_signature(timeout: float = 10.0) -> FrameSignature:
+    """Fetch a streamer snapshot and compute its signature."""
+    resp = client.request("/streamer/snapshot", "GET", timeout=timeout)
+    return frame_signature(resp.body)
+
+
+def wait_for_change(
+    baseline: FrameSignature,
+    timeout: float = 5.0,
+    poll_interval: float = 0.05,
+    threshold: float = CHANGE_THRESHOLD,
+) -> float | None:
+    """
+    Poll snapshots until the screen differs from `baseline`.
+
+    Args:
+        baseline: Signature of the screen before the action.
+        timeout: Maximum time to wait in seconds.
+        poll_interval: Pause between snapshots in seconds.
+        threshold: Changed-pixel fraction that counts as a change.
+
+    Returns:
+        Seconds until the change was seen, or None on timeout.
+    """
+    start = time.perf_counter()
+    while True:
+        if frame_difference(baseline, fetch_signature()) > threshold:
+            return time.perf_counter() - start
+        if time.perf_counter() - start >= timeout:
+            return None
+        cancellation.sleep(poll_interval)
+
+
+def wait_for_stable(
+    timeout: float = 5.0,
+    poll_interval: float = 0.05,
+    stable_frames: int = 2,
+    threshold: float = CHANGE_THRESHOLD,
+) -> tuple[FrameSignature, float, bool]:
+    """
+    Poll snapshots until the screen stops changing.
+
+    Args:
+        timeout: Maximum time to wait in seconds.
+        poll_interval: Pause between snapshots in seconds.
+        stable_frames: Consecutive unchanged snapshots required.
+        threshold: Changed-pixel fraction that counts as a change.
+
+    Returns:
+        Tuple of (last signature, seconds until the first frame of the stable
+        run, whether it settled before the timeout).
+    """
+    start = time.perf_counter()
+    previous = fetch_signature()
+    settled_at = time.perf_counter() - start
+    unchanged = 0
+    while True:
+        if time.perf_counter() - start >= timeout:
+            return previous, settled_at, False
+        cancellation.sleep(poll_interval)
+        current = fetch_signature()
+        if frame_difference(previous, current) > threshold:
+            unchanged = 0
+            settled_at = time.perf_counter() - start
+        else:
+            unchanged += 1
+            if unchanged >= stable_frames:
+                return current, settled_at, True
+        previous = current
@@ -0,0 +1,268 @@
+"""Gesture engine for PiKVM pointer gestures.
+
+Every `send_mouse_move` is a blocking HTTPS round trip, so a gesture can only
+carry as many intermediate points as the transport delivers within its
+duration. The engine precomputes an eased trajectory sized from the measured
+move latency and paces it against a fixed schedule, dropping points that fell
+behind so the requested duration is actually met.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from iphone_agent import cancellation
+from iphone_agent.idb.connection import client
+
+_DEFAULT_TIMEOUT = float(os.getenv("PIKVM_TIMEOUT", "10"))
+
+# No point in sending moves faster than the phone samples touches.
+_MIN_EVENT_INTERVAL_S = 1.0 / 60.0
+# Latency assumed before the first move has been measured.
+_INITIAL_LATENCY_S = 0.02
+_LATENCY_EWMA_ALPHA = 0.2
+
+Easing = Callable[[float], float]
+
+
+def linear(t: float) -> float:
+    return t
+
+
+def ease_in_quad(t: float) -> float:
+    return t * t
+
+
+def ease_out_cubic(t: float) -> float:
+    return 1.0 - (1.0 - t) ** 3
+
+
+def ease_in_out_cubic(t: float) -> float:
+    if t < 0.5:
+        return 4.0 * t * t * t
+    return 1.0 - (-2.0 * t + 2.0) ** 3 / 2.0
+
+
+@dataclass(frozen=True)
+class GestureProfile:
+    """
+    Shape and pacing of a pointer gesture.
+
+    Attributes:
+        name: Profile name.
+        easing: Maps normalized time to normalized distance.
+        duration_ms: Default motion duration (press to release, without holds).
+        hold_before_ms: Pause after pressing, before moving.
+        hold_after_ms: Pause at the end point, before releasing.
+        min_events: Minimum number of moves, including the final one.
+        max_events: Maximum number of moves, including the final one.
+    """
+
+    name: str
+    easing: Easing
+    duration_ms: int
+    hold_before_ms: int = 0
+    hold_after_ms: int = 0
+    min_events: int = 1
+    max_events: int = 60
+
+
+# Fast swipe released at full speed, so the content keeps scrolling.
+FLICK = GestureProfile("flick", ease_in_quad, duration_ms=150, max_events=10)
+# Controlled scroll that stops before release, so the content moves by exactly
+# the dragged distance.
+SCROLL = GestureProfile(
+    "scroll",
+    ease_in_out_cubic,
+    duration_ms=400,
+    hold_after_ms=120,
+    min_events=2,
+    max_events=30,
+)
+# Press-and-hold to pick up an item, then move it and drop it.
+DRAG = GestureProfile(
+    "drag",
+    ease_in_out_cubic,
+    duration_ms=600,
+    hold_before_ms=600,
+    hold_after_ms=200,
+    min_events=3,
+    max_events=40,
+)
+
+PROFILES: dict[str, GestureProfile] = {p.name: p for p in (FLICK, SCROLL, DRAG)}
+
+
+@dataclass(frozen=True)
+class GesturePoint:
+    """A pointer move scheduled `at_s` seconds after motion starts."""
+
+    at_s: float
+    x: int
+    y: int
+
+
+@dataclass(frozen=True)
+class GestureResult:
+    """Timing of an executed gesture."""
+
+    profile: str
+    requested_ms: float
+    motion_ms: float
+    total_ms: float
+    planned_events: int
+    sent_events: int
+
+
+class _MoveLatency:
+    """Moving average of `send_mouse_move` round-trip time."""
+
+    def __init__(self, initial: float):
+        self._lock = threading.Lock()
+        self._value = initial
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._value += _LATENCY_EWMA_ALPHA * (seconds - self._value)
+
+
+move_latency = _MoveLatency(_INITIAL_LATENCY_S)
+
+
+def event_count(
+    duration_s: float, latency_s: float, profile: GestureProfile
+) -> int:
+    """Number of moves the transport can deliver within the duration."""
+    interval = max(latency_s, _MIN_EVENT_INTERVAL_S)
+    count = int(duration_s / interval) if interval > 0 else profile.max_events
+    return max(profile.min_events, min(count, profile.max_events))
+
+
+def plan_gesture(
+    start: tuple[int, int],
+    end: tuple[int, int],
+    profile: GestureProfile = SCROLL,
+    duration_ms: float | None = None,
+    latency_s: float | None = None,
+) -> list[GesturePoint]:
+    """
+    Precompute the eased trajectory of a gesture.
+
+    Args:
+        start: Start point in HID coordinates.
+        end: End point in HID coordinates.
+        profile: Gesture profile.
+        duration_ms: Motion duration; defaults to the profile's duration.
+        latency_s: Transport latency per move; defaults to the measured one.
+
+    Returns:
+        Moves after the initial press, the last one exactly at `end`.
+    """
+    if duration_ms is None:
+        duration_ms = profile.duration_ms
+    duration_s = max(0.0, duration_ms / 1000.0)
+    if latency_s is None:
+        latency_s = move_latency.value
+    count = event_count(duration_s, latency_s, profile)
+
+    (x0, y0), (x1, y1) = start, end
+    points: list[GesturePoint] = []
+    for i in range(1, count + 1):
+        t = i / count
+        progress = profile.easing(t)
+        x = int(round(x0 + (x1 - x0) * progress))
+        y = int(round(y0 + (y1 - y0) * progress))
+        if points and (points[-1].x, points[-1].y) == (x, y):
+            continue
+        points.append(GesturePoint(at_s=t * duration_s, x=x, y=y))
+    if not points or (points[-1].x, points[-1].y) != (x1, y1):
+        points.append(GesturePoint(at_s=duration_s, x=x1, y=y1))
+    return points
+
+
+def _move(x: int, y: int) -> None:
+    start = time.perf_counter()
+    client.request(
+        f"/api/hid/events/send_mouse_move?to_x={x}&to_y={y}",
+        "POST",
+        timeout=_DEFAULT_TIMEOUT,
+    )
+    move_latency.observe(time.perf_counter() - start)
+
+
+def _button(state: int) -> None:
+    client.request(
+        f"/api/hid/events/send_mouse_button?button=left&state={state}",
+        "POST",
+        timeout=_DEFAULT_TIMEOUT,
+    )
+
+
+def perform_gesture(
+    start: tuple[int, int],
+    end: tuple[int, int],
+    profile: GestureProfile = SCROLL,
+    duration_ms: float | None = None,
+) -> GestureResult:
+    """
+    Press at `start`, move along the planned trajectory and release at `end`.
+
+    Moves are sent on a fixed schedule, each started one transport latency
+    early; a move whose successor is already due is skipped, so slow
+    transports get fewer events instead of a longer gesture.
+
+    Args:
+        start: Start point in HID coordinates.
+        end: End point in HID coordinates.
+        profile: Gesture profile.
+        duration_ms: Motion duration; defaults to the profile's duration.
+
+    Returns:
+        GestureResult with the measured timing.
+    """
+    requested_ms = profile.duration_ms if duration_ms is None else duration_ms
+    points = plan_gesture(start, end, profile, requested_ms)
+
+    begin = time.perf_counter()
+    # Always release the button, even if the task is cancelled meanwhile.
+    with cancellation.shielded():
+        _move(*start)
+        _button(1)
+        if profile.hold_before_ms > 0:
+            time.sleep(profile.hold_before_ms / 1000.0)
+
+        sent = 0
+        motion_start = time.perf_counter()
+        last = len(points) - 1
+        for i, point in enumerate(points):
+            # Start each request early so it lands on schedule.
+            lead = move_latency.value
+            now = time.perf_counter() - motion_start
+            if i < last and now >= points[i + 1].at_s - lead:
+                continue
+            if point.at_s - lead > now:
+                time.sleep(point.at_s - lead - now)
+            _move(point.x, point.y)
+            sent += 1
+        motion_ms = (time.perf_counter() - motion_start) * 1000.0
+
+        if profile.hold_after_ms > 0:
+            time.sleep(profile.hold_after_ms / 1000.0)
+        _button(0)
+
+    return GestureResult(
+        profile=profile.name,
+        requested_ms=float(requested_ms),
+        motion_ms=motion_ms,
+        total_ms=(time.perf_counter() - begin) * 1000.0,
+        planned_events=len(points),
+        sent_events=sent,
+    )
@@ -0,0 +1,109 @@
+"""Shared executor for CPU-bound screenshot processing.
+
+Decoding the streamer snapshot, cropping its borders and re-encoding it as PNG
+run in one pool per process instead of on every agent's thread:
+
+- ``thread`` (default): cv2 releases the GIL in `imdecode`, `cvtColor` and
+  `imencode`, so a pool sized to the cores runs frames in parallel and bounds
+  how many are processed at once when many agents share the process.
+- ``process``: worker processes, for the parts that hold the GIL (the PIL
+  fallback without cv2, numpy bookkeeping) at the cost of copying each frame
+  to and from the worker.
+- ``inline``: on the calling thread, as before.
+
+Select with `SCREENSHOT_EXECUTOR` and `SCREENSHOT_WORKERS` (default: CPU
+count), or `configure_image_executor`.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+EXECUTOR_KINDS = ("inline", "thread", "process")
+
+
+class ImageExecutor:
+    """
+    Runs image jobs inline or in a lazily started thread or process pool.
+
+    Args:
+        kind: "inline", "thread" or "process".
+        workers: Pool size (default: CPU count); ignored for "inline".
+    """
+
+    def __init__(self, kind: str = "thread", workers: int | None = None) -> None:
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"kind must be one of {EXECUTOR_KINDS}")
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Executor | None = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    # Spawned workers: forking a process with running agent
+                    # threads can deadlock on locks held at fork time.
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="image"
+                    )
+            return self._pool
+
+    def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Run `fn(*args)` and wait for the result.
+
+        For "process", `fn` must be a module-level function and its arguments
+        and result picklable.
+        """
+        if self.kind == "inline":
+            return fn(*args)
+        return self._get_pool().submit(fn, *args).result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+_active_executor: ImageExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_image_executor() -> ImageExecutor:
+    """Get the shared executor, created from the environment on first use."""
+    global _active_executor
+    with _executor_lock:
+        if _active_executor is None:
+            workers = os.getenv("SCREENSHOT_WORKERS")
+            _active_executor = ImageExecutor(
+                kind=os.getenv("SCREENSHOT_EXECUTOR", "thread"),
+                workers=int(workers) if workers else None,
+            )
+        return _active_executor
+
+
+def configure_image_executor(kind: str, workers: int | None = None) -> ImageExecutor:
+    """Replace the shared executor, shutting the previous one down."""
+    global _active_executor
+    executor = ImageExecutor(kind, workers)
+    with _executor_lock:
+        previous, _active_executor = _active_executor, executor
+    if previous is not None:
+        previous.shutdown()
+    return executor
@@ -1,7 +1,51 @@
 """Input utilities for Android device text input."""
-import time
+import os
 import requests
+from iphone_agent import cancellation
 from iphone_agent.idb.connection import client, ensure_connected
+from iphone_agent.idb.publisher import publish_content
+from iphone_agent.idb.timing import get_timing_profile
+
+_DEFAULT_TIMEOUT = float(os.getenv("PIKVM_TIMEOUT", "10"))
+# Longest text typed key by key; longer text is pasted through the clipboard.
+MAX_PRINT_LENGTH = int(os.getenv("PIKVM_MAX_PRINT_LENGTH", "64"))
+PIKVM_KEYMAP = os.getenv("PIKVM_KEYMAP", "en-us")
+
+TYPING_STRATEGIES = ("print", "clipboard")
+
+
+def can_print(text: str) -> bool:
+    """Whether the HID keyboard can type the text (short printable ASCII)."""
+    return 0 < len(text) <= MAX_PRINT_LENGTH and all(" " <= c <= "~" for c in text)
+
+
+def choose_typing_strategy(text: str) -> str:
+    """
+    Pick the fastest way to enter text.
+
+    Returns:
+        "print" for short printable ASCII typed through the HID keyboard,
+        "clipboard" for CJK, control characters or long text.
+    """
+    return "print" if can_print(text) else "clipboard"
+
+
+@ensure_connected
+def type_text(text: str, device_id: str | None = None) -> None:
+    """
+    Type text key by key through the PiKVM HID keyboard.
+
+    Only characters present in the PiKVM keymap can be typed; use
+    `choose_typing_strategy` to decide between this and `copy_text`.
+    """
+    client.request(
+        f"/api/hid/print?limit=0&keymap={PIKVM_KEYMAP}",
+        "POST",
+        data=text.encode("utf-8"),
+        headers={"Content-Type": "text/plain; charset=utf-8"},
+        timeout=_DEFAULT_TIMEOUT,
+    )
+    cancellation.sleep(get_timing_profile().print_after)
 
 @ensure_connected
 def copy_text(text: str, device_id: str | None = None) -> None:
@@ -9,26 +53,22 @@ def copy_text(text: str, device_id: str | None = None) -> None:
     Type text into the currently focused input field.
     """
     try:
-        resp = requests.post(
-            "http://127.0.0.1:6666/content",
-            json={"content": text,
-                  "launch_app":False},
-        )
-        resp.raise_for_status()
+        publish_content(text, device_id=device_id)
     except requests.RequestException:
         pass
+    timing = get_timing_profile()
     client.request(
         "/api/hid/events/send_shortcut?keys=AltLeft,KeyC",
         "POST",
     )
-    time.sleep(0.5)
+    cancellation.sleep(timing.copy_trigger_interval)
     client.request(
         "/api/hid/events/send_shortcut?keys=AltLeft,KeyC",
         "POST",
     )
-    time.sleep(0.5)
+    cancellation.sleep(timing.copy_paste_wait)
     client.request(
         "/api/hid/events/send_shortcut?keys=MetaRight,KeyV",
         "POST",
     )
-    time.sleep(0.5)
\ No newline at end of file
+    cancellation.sleep(timing.copy_after)
\ No newline at end of file
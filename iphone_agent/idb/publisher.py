@@ -0,0 +1,170 @@
+"""Handoff of clipboard and launch payloads to the content server.
+
+`launch_app` and `copy_text` publish through the active `ContentPublisher`:
+
+- `HttpContentPublisher` posts to `CONTENT_SERVER_URL` over a pooled
+  keep-alive session with timeouts (default).
+- `InProcessContentPublisher` writes straight into the channels of
+  `iphone_agent.fastapi_main` when the agent and the server share a process.
+
+Select one with `CONTENT_PUBLISHER=http|inprocess` or `set_content_publisher`.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from abc import ABC, abstractmethod
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from iphone_agent.idb.connection import content_url
+from iphone_agent.metrics import Counter, Histogram
+
+# Seconds to wait for the content server to accept a connection / answer.
+CONNECT_TIMEOUT = float(os.getenv("CONTENT_CONNECT_TIMEOUT", "2"))
+READ_TIMEOUT = float(os.getenv("CONTENT_READ_TIMEOUT", "5"))
+
+CONTENT_PUBLISH_SECONDS = Histogram(
+    "content_publish_seconds", "Content publish latency", ["publisher"]
+)
+CONTENT_PUBLISH_ERRORS = Counter(
+    "content_publish_errors_total", "Failed content publishes", ["publisher"]
+)
+
+
+class ContentPublisher(ABC):
+    """Hands a payload to the Shortcut through the content server."""
+
+    name = "base"
+
+    def publish(
+        self, content: str, launch_app: bool = False, device_id: str | None = None
+    ) -> int:
+        """
+        Publish a payload to the channel of a device.
+
+        Args:
+            content: Text or app URL.
+            launch_app: Whether the Shortcut should open `content` as an app URL.
+            device_id: Device channel (the shared channel if None).
+
+        Returns:
+            Sequence number assigned by the server.
+
+        Raises:
+            requests.RequestException: If the HTTP publisher fails.
+        """
+        try:
+            with CONTENT_PUBLISH_SECONDS.labels(self.name).time():
+                return self._publish(content, launch_app, device_id)
+        except Exception:
+            CONTENT_PUBLISH_ERRORS.labels(self.name).inc()
+            raise
+
+    @abstractmethod
+    def _publish(self, content: str, launch_app: bool, device_id: str | None) -> int:
+        """Deliver the payload; returns the sequence number."""
+
+    def snapshot(self) -> dict[str, float]:
+        """Count, mean latency (ms) and errors of all publishers of this kind."""
+        _, total, count = CONTENT_PUBLISH_SECONDS.labels(self.name).snapshot()
+        return {
+            "count": int(count),
+            "mean_ms": total / count * 1000.0 if count else 0.0,
+            "errors": int(CONTENT_PUBLISH_ERRORS.labels(self.name).value),
+        }
+
+
+class HttpContentPublisher(ContentPublisher):
+    """Posts to the content server over a pooled keep-alive session."""
+
+    name = "http"
+
+    def __init__(
+        self,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        pool_size: int = 16,
+    ) -> None:
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _publish(self, content: str, launch_app: bool, device_id: str | None) -> int:
+        resp = self.session.post(
+            content_url(device_id),
+            json={"content": content, "launch_app": launch_app},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        return resp.json().get("seq", 0)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class InProcessContentPublisher(ContentPublisher):
+    """Writes into the content server's channels without an HTTP hop."""
+
+    name = "inprocess"
+
+    def __init__(self) -> None:
+        # Imported here so the HTTP-only setup does not need FastAPI loaded.
+        from iphone_agent import fastapi_main
+
+        self._server = fastapi_main
+
+    def _publish(self, content: str, launch_app: bool, device_id: str | None) -> int:
+        if device_id:
+            channel = self._server.DEVICE_CHANNELS.get(device_id)
+        else:
+            channel = self._server.CONTENT_CHANNEL
+        return channel.publish(content, launch_app).seq
+
+
+PUBLISHERS = {
+    HttpContentPublisher.name: HttpContentPublisher,
+    InProcessContentPublisher.name: InProcessContentPublisher,
+}
+
+_active_publisher: ContentPublisher | None = None
+_publisher_lock = threading.Lock()
+
+
+def get_content_publisher() -> ContentPublisher:
+    """Get the active publisher, created from `CONTENT_PUBLISHER` on first use."""
+    global _active_publisher
+    with _publisher_lock:
+        if _active_publisher is None:
+            name = os.getenv("CONTENT_PUBLISHER", HttpContentPublisher.name)
+            if name not in PUBLISHERS:
+                raise ValueError(
+                    f"Unknown CONTENT_PUBLISHER '{name}', expected one of: "
+                    + ", ".join(PUBLISHERS)
+                )
+            _active_publisher = PUBLISHERS[name]()
+        return _active_publisher
+
+
+def set_content_publisher(publisher: ContentPublisher) -> None:
+    """Replace the active publisher."""
+    global _active_publisher
+    with _publisher_lock:
+        _active_publisher = publisher
+
+
+def publish_content(
+    content: str, launch_app: bool = False, device_id: str | None = None
+) -> int:
+    """Publish through the active publisher; see `ContentPublisher.publish`."""
+    return get_content_publisher().publish(content, launch_app, device_id)
+
+
+def get_publish_stats() -> dict:
+    """Publish latency and errors of the active publisher."""
+    publisher = get_content_publisher()
+    return {"publisher": publisher.name, **publisher.snapshot()}
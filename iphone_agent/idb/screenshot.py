@@ -2,29 +2,123 @@
 import time
 import base64
 import os
-from dataclasses import dataclass
+import threading
 from io import BytesIO
 
 from PIL import Image
-from iphone_agent.idb.connection import client
 from iphone_agent.idb.connection import client, ensure_connected
+from iphone_agent.idb.image_executor import get_image_executor
+from iphone_agent.metrics import BYTES_BUCKETS, Counter, Histogram
 
-try:
-    import cv2  # type: ignore
-    import numpy as np  # type: ignore
-except Exception:  # Optional dependency
-    cv2 = None
-    np = None
+# OpenCV and numpy (optional), imported by the first crop: see `_load_cv2`.
+_cv2_modules: tuple | None = None
+
+
+SCREENSHOT_PHASE_SECONDS = Histogram(
+    "screenshot_phase_seconds", "Screenshot fetch, decode and encode time", ["phase"]
+)
+SCREENSHOT_BYTES = Histogram(
+    "screenshot_bytes", "Snapshot size as fetched and as sent", ["kind"], BYTES_BUCKETS
+)
+SCREENSHOTS = Counter("screenshots_total", "Screenshots taken by result", ["result"])
+
+
+_DATA_URL_PREFIX = b"data:image/png;base64,"
+# Raw bytes base64-encoded per chunk (a multiple of 3, so chunks concatenate).
+_BASE64_CHUNK = 3 * 16 * 1024
+# PNG of the black fallback screen, encoded once and shared.
+_fallback_png: bytes | None = None
+_fallback_lock = threading.Lock()
 
 
-@dataclass
 class Screenshot:
-    """Represents a captured screenshot."""
+    """
+    Represents a captured screenshot.
+
+    Holds the PNG bytes; the base64 data URL sent to the model is encoded on
+    first use into one buffer that every consumer shares. `release()` drops
+    both once the model request has been sent.
+
+    Args:
+        data: PNG bytes.
+        width: Device screen width in pixels.
+        height: Device screen height in pixels.
+        is_sensitive: Whether the screen could not be captured.
+    """
+
+    __slots__ = ("_data", "_data_url", "width", "height", "is_sensitive")
+
+    def __init__(
+        self, data: bytes, width: int, height: int, is_sensitive: bool = False
+    ) -> None:
+        self._data: bytes | None = data
+        self._data_url: bytearray | None = None
+        self.width = width
+        self.height = height
+        self.is_sensitive = is_sensitive
+
+    @classmethod
+    def from_base64(
+        cls, base64_data: str, width: int, height: int, is_sensitive: bool = False
+    ) -> "Screenshot":
+        return cls(base64.b64decode(base64_data), width, height, is_sensitive)
+
+    @property
+    def data(self) -> bytes:
+        """PNG bytes."""
+        if self._data is None:
+            raise ValueError("Screenshot image data has been released")
+        return self._data
+
+    @property
+    def data_url_bytes(self) -> bytearray:
+        """ASCII `data:image/png;base64,...` URL, encoded on first access."""
+        if self._data_url is None:
+            data = memoryview(self.data)
+            prefix = len(_DATA_URL_PREFIX)
+            buf = bytearray(prefix + 4 * ((len(data) + 2) // 3))
+            buf[:prefix] = _DATA_URL_PREFIX
+            # Encode chunk by chunk straight into the buffer, so no second
+            # full-size copy of the base64 exists.
+            offset = prefix
+            for start in range(0, len(data), _BASE64_CHUNK):
+                encoded = base64.b64encode(data[start : start + _BASE64_CHUNK])
+                buf[offset : offset + len(encoded)] = encoded
+                offset += len(encoded)
+            self._data_url = buf
+        return self._data_url
+
+    @property
+    def data_url(self) -> str:
+        """The data URL as `str` (a copy; prefer `data_url_bytes`)."""
+        return self.data_url_bytes.decode("ascii")
+
+    @property
+    def base64_data(self) -> str:
+        """Base64 of the PNG (a copy; prefer `data` or `data_url_bytes`)."""
+        return self.data_url_bytes[len(_DATA_URL_PREFIX) :].decode("ascii")
+
+    @property
+    def released(self) -> bool:
+        return self._data is None
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the PNG and the cached data URL."""
+        return len(self._data or b"") + len(self._data_url or "")
+
+    def release(self) -> None:
+        """Drop the image data; the size and sensitivity stay available."""
+        self._data = None
+        self._data_url = None
+
+    def __repr__(self) -> str:
+        state = "released" if self._data is None else f"{len(self._data)} bytes"
+        return (
+            f"Screenshot({self.width}x{self.height}, {state}, "
+            f"is_sensitive={self.is_sensitive})"
+        )
 
-    base64_data: str
-    width: int
-    height: int
-    is_sensitive: bool = False
 
 @ensure_connected
 def get_screenshot(timeout: int = 10) -> Screenshot:
@@ -44,62 +138,134 @@ def get_screenshot(timeout: int = 10) -> Screenshot:
     """
 
     try:
-        resp = client.request("/streamer/snapshot", "GET", timeout=float(timeout))
-        image_bytes = resp.body
-
-        # Crop black borders (non-black bounding box)
-        try:
-            if cv2 is None or np is None:
-                raise ImportError("cv2/numpy not installed")
-            arr = np.frombuffer(image_bytes, dtype=np.uint8)
-            img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-            if img is None:
-                raise ValueError("Failed to decode image")
-
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            threshold = 15
-            ys, xs = np.where(gray > threshold)
-            if ys.size == 0 or xs.size == 0:
-                # All black (or effectively black) -> treat as sensitive
-                return _create_fallback_screenshot(is_sensitive=True)
-
-            x_min, x_max = int(xs.min()), int(xs.max())
-            y_min, y_max = int(ys.min()), int(ys.max())
-            crop = img[y_min : y_max + 1, x_min : x_max + 1]
-
-            ok, buf = cv2.imencode(".png", crop)
-            if not ok:
-                raise ValueError("Failed to encode cropped image")
-
-            out_bytes = buf.tobytes()
-            height, width = crop.shape[:2]
-        except Exception:
-            # If cropping fails for any reason, fall back to original image bytes
-            img_pil = Image.open(BytesIO(image_bytes))
-            width, height = img_pil.size
-            out_bytes = image_bytes
-
-        return Screenshot(
-            base64_data=base64.b64encode(out_bytes).decode("utf-8"),
-            width=width,
-            height=height,
-            is_sensitive=False,
-        )
+        with SCREENSHOT_PHASE_SECONDS.labels("fetch").time():
+            resp = client.request("/streamer/snapshot", "GET", timeout=float(timeout))
+        SCREENSHOT_BYTES.labels("raw").observe(len(resp.body))
+        screenshot = _process_snapshot(resp.body)
     except Exception:
         # Treat unknown failure as potentially sensitive.
+        SCREENSHOTS.labels("error").inc()
         return _create_fallback_screenshot(is_sensitive=True)
-    
+    SCREENSHOTS.labels("sensitive" if screenshot.is_sensitive else "ok").inc()
+    return screenshot
+
+
+def _process_snapshot(image_bytes: bytes) -> Screenshot:
+    """Crop black borders off a raw streamer snapshot and encode it."""
+    result = get_image_executor().run(_crop_encode, image_bytes)
+    if result is None:
+        # All black (or effectively black) -> treat as sensitive
+        return _create_fallback_screenshot(is_sensitive=True)
+    out_bytes, width, height, decode_seconds, encode_seconds = result
+    if decode_seconds:
+        SCREENSHOT_PHASE_SECONDS.labels("decode").observe(decode_seconds)
+        SCREENSHOT_PHASE_SECONDS.labels("encode").observe(encode_seconds)
+    SCREENSHOT_BYTES.labels("encoded").observe(len(out_bytes))
+    return Screenshot(out_bytes, width=width, height=height, is_sensitive=False)
+
+
+def _load_cv2() -> tuple:
+    """(cv2, numpy), or (None, None) if not installed; imported on first call."""
+    global _cv2_modules
+    if _cv2_modules is None:
+        try:
+            import cv2  # type: ignore
+            import numpy as np  # type: ignore
+        except Exception:  # Optional dependency
+            cv2 = None
+            np = None
+        _cv2_modules = (cv2, np)
+    return _cv2_modules
+
+
+def _crop_encode(image_bytes: bytes) -> tuple[bytes, int, int, float, float] | None:
+    """
+    Decode, crop and PNG-encode a snapshot; runs on the image executor.
+
+    Returns:
+        (image bytes, width, height, decode seconds, encode seconds), or None
+        if the frame is all black. Timings are zero when cropping failed and
+        the original bytes are returned.
+    """
+    # Crop black borders (non-black bounding box)
+    try:
+        cv2, np = _load_cv2()
+        if cv2 is None or np is None:
+            raise ImportError("cv2/numpy not installed")
+        start = time.perf_counter()
+        arr = np.frombuffer(image_bytes, dtype=np.uint8)
+        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+        decode_seconds = time.perf_counter() - start
+        if img is None:
+            raise ValueError("Failed to decode image")
+
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        threshold = 15
+        ys, xs = np.where(gray > threshold)
+        if ys.size == 0 or xs.size == 0:
+            return None
+
+        x_min, x_max = int(xs.min()), int(xs.max())
+        y_min, y_max = int(ys.min()), int(ys.max())
+        crop = img[y_min : y_max + 1, x_min : x_max + 1]
+
+        start = time.perf_counter()
+        ok, buf = cv2.imencode(".png", crop)
+        encode_seconds = time.perf_counter() - start
+        if not ok:
+            raise ValueError("Failed to encode cropped image")
+
+        height, width = crop.shape[:2]
+        return buf.tobytes(), width, height, decode_seconds, encode_seconds
+    except Exception:
+        # If cropping fails for any reason, fall back to original image bytes
+        img_pil = Image.open(BytesIO(image_bytes))
+        width, height = img_pil.size
+        return image_bytes, width, height, 0.0, 0.0
+
+
+def downscale_screenshot(screenshot: Screenshot, max_side: int = 512) -> Screenshot:
+    """
+    Re-encode a screenshot at low resolution to cut image tokens.
+
+    Width and height keep the device size, since actions use relative
+    coordinates.
+
+    Args:
+        screenshot: Screenshot to shrink.
+        max_side: Longest side of the encoded image in pixels.
+
+    Returns:
+        Screenshot with smaller image data (the input if already small enough).
+    """
+    img = Image.open(BytesIO(screenshot.data))
+    if max(img.size) <= max_side:
+        return screenshot
+    img.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return Screenshot(
+        buffered.getvalue(),
+        width=screenshot.width,
+        height=screenshot.height,
+        is_sensitive=screenshot.is_sensitive,
+    )
+
+
 def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
     """Create a black fallback image when screenshot fails."""
+    global _fallback_png
     default_width, default_height = 1080, 2400
 
-    black_img = Image.new("RGB", (default_width, default_height), color="black")
-    buffered = BytesIO()
-    black_img.save(buffered, format="PNG")
-    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
+    with _fallback_lock:
+        if _fallback_png is None:
+            black_img = Image.new("RGB", (default_width, default_height), color="black")
+            buffered = BytesIO()
+            black_img.save(buffered, format="PNG")
+            _fallback_png = buffered.getvalue()
 
     return Screenshot(
-        base64_data=base64_data,
+        _fallback_png,
         width=default_width,
         height=default_height,
         is_sensitive=is_sensitive,
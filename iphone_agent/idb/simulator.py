@@ -0,0 +1,632 @@
+"""Local PiKVM simulator for hardware-free runs and benchmarks.
+
+The simulator implements the subset of the PiKVM HTTP API used by this project:
+- POST /api/hid/set_connected
+- POST /api/hid/events/send_mouse_move
+- POST /api/hid/events/send_mouse_button
+- POST /api/hid/events/send_shortcut
+- POST /api/hid/print
+- GET  /streamer/snapshot
+
+The snapshot is a synthetic iPhone screen letterboxed in a black HDMI frame, so
+`get_screenshot` crops it exactly like a real capture. Taps open apps from the
+home grid, drags scroll app pages and shortcuts (home, back, OpenAPP,
+CopyToClipboard, paste) change the page, and printed text shows up in a text
+field. Every HID request is recorded.
+
+It intentionally uses only the Python standard library and Pillow.
+
+Usage:
+    python -m iphone_agent.idb.simulator --port 8443 --latency-ms 20 --jitter-ms 5
+
+    PIKVM_BASE_URL=http://127.0.0.1:8443 python main.py "Open WeChat"
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import random
+import ssl
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image, ImageDraw
+
+# PiKVM absolute mouse coordinates span a signed 16-bit range.
+_HID_MIN = -32768
+_HID_MAX = 32767
+
+# Movement (in screen pixels) above which a press/release is a drag, not a tap.
+_DRAG_THRESHOLD_PX = 12
+_LONG_PRESS_S = 0.5
+_DOUBLE_TAP_S = 0.4
+
+_HOME_COLUMNS = 4
+_HOME_ROWS = 6
+_APP_COLORS = [
+    (52, 199, 89),
+    (255, 59, 48),
+    (0, 122, 255),
+    (255, 149, 0),
+    (175, 82, 222),
+    (255, 45, 85),
+    (90, 200, 250),
+    (255, 204, 0),
+]
+
+
+@dataclass
+class SimulatorConfig:
+    """Configuration for the PiKVM simulator."""
+
+    host: str = "127.0.0.1"
+    port: int = 0
+    username: str | None = "admin"
+    password: str | None = "admin"
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    settle_ms: float = 0.0
+    key_interval_ms: float = 0.0
+    frame_size: tuple[int, int] = (1280, 720)
+    screen_size: tuple[int, int] = (332, 720)
+    jpeg_quality: int = 80
+    max_events: int = 100_000
+    seed: int | None = None
+    certfile: str | None = None
+    keyfile: str | None = None
+    verbose: bool = False
+
+
+@dataclass(frozen=True)
+class HidEvent:
+    """A single HID request received by the simulator."""
+
+    timestamp: float
+    endpoint: str
+    params: dict[str, str]
+
+
+@dataclass(frozen=True)
+class _ScreenState:
+    """Immutable snapshot of what the simulated phone displays."""
+
+    version: int = 0
+    page: str = "home"
+    previous_page: str = "home"
+    scroll: int = 0
+    tap: tuple[int, int] | None = None
+    banner: str = ""
+    text: str = ""
+
+
+@dataclass
+class _Pointer:
+    x: int = 0
+    y: int = 0
+    pressed: bool = False
+    press_x: int = 0
+    press_y: int = 0
+    press_scroll: int = 0
+    press_time: float = 0.0
+    last_click_time: float = 0.0
+
+
+class SimulatedScreen:
+    """
+    Synthetic phone screen that reacts to HID events.
+
+    State changes become visible to snapshots only after `settle_ms`, which
+    mimics the animation and capture delay of a real device.
+
+    Args:
+        screen_size: Phone screen size in pixels (width, height).
+        frame_size: HDMI frame size in pixels; the screen is centered in it.
+        settle_ms: Delay before a state change appears in snapshots.
+        jpeg_quality: JPEG quality of snapshots.
+    """
+
+    def __init__(
+        self,
+        screen_size: tuple[int, int] = (332, 720),
+        frame_size: tuple[int, int] = (1280, 720),
+        settle_ms: float = 0.0,
+        jpeg_quality: int = 80,
+    ):
+        self.screen_width, self.screen_height = screen_size
+        self.frame_width, self.frame_height = frame_size
+        if self.screen_width > self.frame_width or self.screen_height > self.frame_height:
+            raise ValueError("screen_size must fit inside frame_size")
+        self.settle_s = max(0.0, settle_ms / 1000.0)
+        self.jpeg_quality = jpeg_quality
+
+        self._lock = threading.Lock()
+        self._state = _ScreenState()
+        self._pointer = _Pointer(x=self.screen_width // 2, y=self.screen_height // 2)
+        # (visible_at, state) pairs not yet visible to snapshots
+        self._pending: deque[tuple[float, _ScreenState]] = deque()
+        self._visible = self._state
+        self._render_cache: tuple[int, bytes] | None = None
+
+    @property
+    def state(self) -> _ScreenState:
+        """Latest state, including changes that have not settled yet."""
+        with self._lock:
+            return self._state
+
+    def reset(self) -> None:
+        """Return to the home screen and drop pending changes."""
+        with self._lock:
+            version = self._state.version + 1
+            self._state = _ScreenState(version=version)
+            self._visible = self._state
+            self._pending.clear()
+            self._pointer = _Pointer(x=self.screen_width // 2, y=self.screen_height // 2)
+
+    def move(self, hid_x: int, hid_y: int) -> None:
+        """Move the absolute pointer to HID coordinates."""
+        x, y = self._to_screen(hid_x, hid_y)
+        with self._lock:
+            self._pointer.x, self._pointer.y = x, y
+            pointer = self._pointer
+            if pointer.pressed and self._state.page.startswith("app"):
+                # Content follows the finger while dragging.
+                scroll = max(0, pointer.press_scroll + (pointer.press_y - y))
+                if scroll != self._state.scroll:
+                    self._update(scroll=scroll)
+
+    def button(self, state: bool | None) -> None:
+        """Press (True), release (False) or click (None) the left button."""
+        now = time.perf_counter()
+        with self._lock:
+            pointer = self._pointer
+            if state is None:
+                self._click(now)
+                return
+            if state:
+                pointer.pressed = True
+                pointer.press_x, pointer.press_y = pointer.x, pointer.y
+                pointer.press_scroll = self._state.scroll
+                pointer.press_time = now
+                return
+            if not pointer.pressed:
+                return
+            pointer.pressed = False
+            distance = abs(pointer.x - pointer.press_x) + abs(pointer.y - pointer.press_y)
+            if distance >= _DRAG_THRESHOLD_PX:
+                self._update(banner="swipe")
+            elif now - pointer.press_time >= _LONG_PRESS_S:
+                self._update(tap=(pointer.x, pointer.y), banner="long press")
+            else:
+                self._click(now)
+
+    def shortcut(self, keys: list[str]) -> None:
+        """Apply a keyboard shortcut bound on the phone."""
+        combo = ",".join(keys)
+        with self._lock:
+            state = self._state
+            if combo == "AltLeft,KeyH":
+                self._update(page="home", previous_page=state.page, scroll=0, banner="")
+            elif combo == "Tab,KeyB":
+                self._update(page=state.previous_page, previous_page=state.page, scroll=0)
+            elif combo == "AltLeft,KeyO":
+                self._update(page="app:launch", previous_page=state.page, scroll=0)
+            elif combo == "AltLeft,KeyC":
+                self._update(banner="shortcut")
+            elif combo == "MetaRight,KeyV":
+                self._update(text=f"pasted #{state.version}", banner="paste")
+            else:
+                self._update(banner=combo)
+
+    def type_text(self, text: str) -> None:
+        """Append typed text to the focused field."""
+        with self._lock:
+            self._update(text=(self._state.text + text)[-64:], banner="typing")
+
+    def snapshot(self) -> bytes:
+        """Render the currently visible state as a JPEG frame."""
+        with self._lock:
+            state = self._settled_state()
+            cached = self._render_cache
+            if cached is not None and cached[0] == state.version:
+                return cached[1]
+        frame = self._render(state)
+        with self._lock:
+            self._render_cache = (state.version, frame)
+        return frame
+
+    def _click(self, now: float) -> None:
+        pointer = self._pointer
+        double = now - pointer.last_click_time <= _DOUBLE_TAP_S
+        pointer.last_click_time = now
+        state = self._state
+        tap = (pointer.x, pointer.y)
+        if double:
+            self._update(tap=tap, banner="double tap")
+            return
+        if state.page == "home":
+            index = self._home_index(pointer.x, pointer.y)
+            if index is not None:
+                self._update(page=f"app:{index}", previous_page="home", scroll=0, tap=tap)
+                return
+        self._update(tap=tap)
+
+    def _update(self, **changes: Any) -> None:
+        """Derive a new state (caller holds the lock)."""
+        self._state = replace(self._state, version=self._state.version + 1, **changes)
+        if self.settle_s <= 0:
+            self._visible = self._state
+            self._pending.clear()
+        else:
+            self._pending.append((time.perf_counter() + self.settle_s, self._state))
+
+    def _settled_state(self) -> _ScreenState:
+        now = time.perf_counter()
+        while self._pending and self._pending[0][0] <= now:
+            self._visible = self._pending.popleft()[1]
+        return self._visible
+
+    def _to_screen(self, hid_x: int, hid_y: int) -> tuple[int, int]:
+        hid_x = min(max(hid_x, _HID_MIN), _HID_MAX)
+        hid_y = min(max(hid_y, _HID_MIN), _HID_MAX)
+        span = _HID_MAX - _HID_MIN
+        x = int((hid_x - _HID_MIN) / span * (self.screen_width - 1))
+        y = int((hid_y - _HID_MIN) / span * (self.screen_height - 1))
+        return x, y
+
+    def _home_cell(self) -> tuple[int, int, int]:
+        """Return (cell width, cell height, top margin) of the home grid."""
+        top = self.screen_height // 10
+        cell_w = self.screen_width // _HOME_COLUMNS
+        cell_h = (self.screen_height - 2 * top) // _HOME_ROWS
+        return cell_w, cell_h, top
+
+    def _home_index(self, x: int, y: int) -> int | None:
+        cell_w, cell_h, top = self._home_cell()
+        column, row = x // cell_w, (y - top) // cell_h
+        if y < top or row >= _HOME_ROWS or column >= _HOME_COLUMNS:
+            return None
+        return row * _HOME_COLUMNS + column
+
+    def _render(self, state: _ScreenState) -> bytes:
+        width, height = self.screen_width, self.screen_height
+        screen = Image.new("RGB", (width, height), (242, 242, 247))
+        draw = ImageDraw.Draw(screen)
+
+        if state.page == "home":
+            cell_w, cell_h, top = self._home_cell()
+            pad = cell_w // 5
+            for index in range(_HOME_ROWS * _HOME_COLUMNS):
+                row, column = divmod(index, _HOME_COLUMNS)
+                x0 = column * cell_w + pad
+                y0 = top + row * cell_h + pad
+                color = _APP_COLORS[index % len(_APP_COLORS)]
+                draw.rounded_rectangle(
+                    (x0, y0, x0 + cell_w - 2 * pad, y0 + cell_w - 2 * pad),
+                    radius=pad,
+                    fill=color,
+                )
+        else:
+            seed = sum(ord(c) for c in state.page)
+            header = _APP_COLORS[seed % len(_APP_COLORS)]
+            row_h = 48
+            header_h = height // 8
+            first_row = state.scroll // row_h
+            offset = state.scroll % row_h
+            for i in range(height // row_h + 2):
+                y0 = header_h + i * row_h - offset
+                shade = 255 if (first_row + i) % 2 == 0 else 225
+                draw.rectangle((0, y0, width, y0 + row_h - 1), fill=(shade, shade, shade))
+                draw.text((12, y0 + 16), f"{state.page} item {first_row + i}", fill=(60, 60, 67))
+            draw.rectangle((0, 0, width, header_h), fill=header)
+            draw.text((12, header_h // 2), state.page, fill=(255, 255, 255))
+
+        if state.text:
+            draw.rectangle((8, height - 64, width - 8, height - 32), fill=(255, 255, 255))
+            draw.text((16, height - 56), state.text, fill=(0, 0, 0))
+        if state.banner:
+            draw.rectangle((8, 8, width - 8, 32), fill=(28, 28, 30))
+            draw.text((16, 14), state.banner, fill=(255, 255, 255))
+        if state.tap is not None:
+            tx, ty = state.tap
+            draw.ellipse((tx - 10, ty - 10, tx + 10, ty + 10), outline=(0, 0, 0), width=3)
+
+        frame = Image.new("RGB", (self.frame_width, self.frame_height), (0, 0, 0))
+        frame.paste(
+            screen,
+            ((self.frame_width - width) // 2, (self.frame_height - height) // 2),
+        )
+        buffered = BytesIO()
+        frame.save(buffered, format="JPEG", quality=self.jpeg_quality)
+        return buffered.getvalue()
+
+
+class PiKvmSimulator:
+    """
+    In-process HTTP(S) server that emulates a PiKVM attached to an iPhone.
+
+    Args:
+        config: Simulator configuration.
+
+    Example:
+        >>> with PiKvmSimulator(SimulatorConfig(latency_ms=10)) as sim:
+        ...     client = PiKvmHttpsClient(sim.base_url)
+        ...     client.request("/api/hid/set_connected?connected=1", "POST")
+        ...     len(sim.events)
+        1
+    """
+
+    def __init__(self, config: SimulatorConfig | None = None):
+        self.config = config or SimulatorConfig()
+        self.screen = SimulatedScreen(
+            screen_size=self.config.screen_size,
+            frame_size=self.config.frame_size,
+            settle_ms=self.config.settle_ms,
+            jpeg_quality=self.config.jpeg_quality,
+        )
+        self.connected = False
+        self._events: deque[HidEvent] = deque(maxlen=self.config.max_events)
+        self._events_lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+        self._auth_header: str | None = None
+        if self.config.username is not None and self.config.password is not None:
+            token = base64.b64encode(
+                f"{self.config.username}:{self.config.password}".encode("utf-8")
+            ).decode("ascii")
+            self._auth_header = f"Basic {token}"
+
+    @property
+    def base_url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("Simulator is not running")
+        host, port = self._server.server_address[:2]
+        scheme = "https" if self.config.certfile else "http"
+        return f"{scheme}://{host}:{port}"
+
+    @property
+    def events(self) -> list[HidEvent]:
+        """Recorded HID events, oldest first."""
+        with self._events_lock:
+            return list(self._events)
+
+    def clear_events(self) -> None:
+        with self._events_lock:
+            self._events.clear()
+
+    def reset(self) -> None:
+        """Clear recorded events and return the screen to its initial state."""
+        self.clear_events()
+        self.screen.reset()
+
+    def start(self) -> "PiKvmSimulator":
+        """Start serving on a background thread."""
+        if self._server is not None:
+            return self
+        server = ThreadingHTTPServer(
+            (self.config.host, self.config.port), _make_handler(self)
+        )
+        server.daemon_threads = True
+        if self.config.certfile:
+            ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ctx.load_cert_chain(self.config.certfile, self.config.keyfile)
+            server.socket = ctx.wrap_socket(server.socket, server_side=True)
+        self._server = server
+        self._thread = threading.Thread(
+            target=server.serve_forever, name="pikvm-simulator", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def serve_forever(self) -> None:
+        """Start and block until interrupted."""
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def __enter__(self) -> "PiKvmSimulator":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _simulate_latency(self) -> None:
+        latency_ms = self.config.latency_ms
+        if self.config.jitter_ms:
+            with self._rng_lock:
+                latency_ms += self._rng.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000.0)
+
+    def _record(self, endpoint: str, params: dict[str, str]) -> None:
+        event = HidEvent(timestamp=time.perf_counter(), endpoint=endpoint, params=params)
+        with self._events_lock:
+            self._events.append(event)
+
+    def _handle_hid(
+        self, endpoint: str, params: dict[str, str], body: bytes
+    ) -> tuple[int, Any]:
+        """Apply a HID request; returns (status, result)."""
+        if endpoint == "/api/hid/set_connected":
+            self.connected = params.get("connected", "1") in {"1", "true"}
+            return 200, {}
+        if endpoint == "/api/hid/events/send_mouse_move":
+            try:
+                x, y = int(params["to_x"]), int(params["to_y"])
+            except (KeyError, ValueError):
+                return 400, {"error": "to_x and to_y are required integers"}
+            self.screen.move(x, y)
+            return 200, {}
+        if endpoint == "/api/hid/events/send_mouse_button":
+            if params.get("button", "left") != "left":
+                return 200, {}
+            state = params.get("state")
+            self.screen.button(None if state is None else state in {"1", "true"})
+            return 200, {}
+        if endpoint == "/api/hid/events/send_shortcut":
+            keys = [key for key in params.get("keys", "").split(",") if key]
+            if not keys:
+                return 400, {"error": "keys is required"}
+            self.screen.shortcut(keys)
+            return 200, {}
+        if endpoint == "/api/hid/print":
+            text = body.decode("utf-8", errors="replace")
+            if self.config.key_interval_ms > 0:
+                # PiKVM returns once every key has been sent.
+                time.sleep(len(text) * self.config.key_interval_ms / 1000.0)
+            self.screen.type_text(text)
+            return 200, {}
+        return 404, {"error": f"Unknown endpoint: {endpoint}"}
+
+
+def _make_handler(sim: PiKvmSimulator) -> type[BaseHTTPRequestHandler]:
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            self._dispatch("GET")
+
+        def do_POST(self) -> None:
+            self._dispatch("POST")
+
+        def log_message(self, format: str, *args: Any) -> None:
+            if sim.config.verbose:
+                super().log_message(format, *args)
+
+        def _dispatch(self, method: str) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            parts = urlsplit(self.path)
+            params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            endpoint = parts.path
+
+            if endpoint.startswith("/sim/"):
+                self._handle_sim(method, endpoint)
+                return
+
+            if sim._auth_header and self.headers.get("Authorization") != sim._auth_header:
+                self._send_json(401, {"ok": False, "result": {"error": "Unauthorized"}})
+                return
+
+            sim._simulate_latency()
+
+            if endpoint == "/streamer/snapshot" and method == "GET":
+                self._send(200, sim.screen.snapshot(), "image/jpeg")
+                return
+
+            if endpoint.startswith("/api/hid") and method == "POST":
+                sim._record(endpoint, params)
+                status, result = sim._handle_hid(endpoint, params, body)
+                self._send_json(status, {"ok": status == 200, "result": result})
+                return
+
+            self._send_json(404, {"ok": False, "result": {"error": "Not found"}})
+
+        def _handle_sim(self, method: str, endpoint: str) -> None:
+            """Simulator-only control endpoints (not part of the PiKVM API)."""
+            if endpoint == "/sim/events" and method == "GET":
+                events = [asdict(event) for event in sim.events]
+                self._send_json(200, {"ok": True, "result": {"events": events}})
+            elif endpoint == "/sim/state" and method == "GET":
+                self._send_json(200, {"ok": True, "result": asdict(sim.screen.state)})
+            elif endpoint == "/sim/reset" and method == "POST":
+                sim.reset()
+                self._send_json(200, {"ok": True, "result": {}})
+            else:
+                self._send_json(404, {"ok": False, "result": {"error": "Not found"}})
+
+        def _send_json(self, status: int, payload: Any) -> None:
+            self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return _Handler
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Local PiKVM simulator")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=8443, help="Bind port")
+    parser.add_argument("--username", type=str, default="admin", help="Basic auth user")
+    parser.add_argument("--password", type=str, default="admin", help="Basic auth password")
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Added latency per request"
+    )
+    parser.add_argument(
+        "--jitter-ms", type=float, default=0.0, help="Uniform jitter around the latency"
+    )
+    parser.add_argument(
+        "--settle-ms",
+        type=float,
+        default=0.0,
+        help="Delay before a screen change is visible in snapshots",
+    )
+    parser.add_argument(
+        "--key-interval-ms",
+        type=float,
+        default=0.0,
+        help="Time to type one character through /api/hid/print",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Jitter random seed")
+    parser.add_argument("--certfile", type=str, default=None, help="TLS certificate")
+    parser.add_argument("--keyfile", type=str, default=None, help="TLS private key")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log requests")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    sim = PiKvmSimulator(
+        SimulatorConfig(
+            host=args.host,
+            port=args.port,
+            username=args.username,
+            password=args.password,
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            settle_ms=args.settle_ms,
+            key_interval_ms=args.key_interval_ms,
+            seed=args.seed,
+            certfile=args.certfile,
+            keyfile=args.keyfile,
+            verbose=args.verbose,
+        )
+    )
+    sim.start()
+    print(f"PiKVM simulator listening on {sim.base_url}")
+    print(f"  export PIKVM_BASE_URL={sim.base_url}")
+    sim.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Per-action timing profile for PiKVM HID helpers.
+
+The delays between and after HID events depend on the phone, the capture
+chain and the iOS animations, so they are kept in one `TimingProfile` that can
+be loaded from a JSON file (see `python -m iphone_agent.idb.calibration`).
+
+The active profile is read from `PIKVM_TIMING_PROFILE` (a JSON file path) on
+first use, or set explicitly with `set_timing_profile`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Iterator
+
+
+@dataclass
+class TimingProfile:
+    """Named delays, in seconds, used by the HID helpers."""
+
+    # Tap: settle after the click
+    tap_after: float = 0.0
+    # Double tap: move -> click -> click
+    double_tap_move: float = 0.5
+    double_tap_interval: float = 0.2
+    double_tap_after: float = 1.0
+    # Long press: move -> press -> hold -> release
+    long_press_move: float = 0.5
+    long_press_hold: float = 3.0
+    long_press_after: float = 1.0
+    # Swipe, back and home: settle after the gesture / shortcut
+    swipe_after: float = 1.0
+    back_after: float = 1.0
+    home_after: float = 1.0
+    # Launch: post URL -> CopyToClipboard x2 -> OpenAPP -> wait for foreground
+    launch_trigger_interval: float = 0.5
+    launch_open_wait: float = 1.0
+    launch_timeout: float = 5.0
+    launch_after: float = 0.0
+    # Copy text: post text -> CopyToClipboard x2 -> paste
+    copy_trigger_interval: float = 0.5
+    copy_paste_wait: float = 0.5
+    copy_after: float = 0.5
+    # Type action: settle after pasted / HID-typed text is entered
+    type_after: float = 1.0
+    print_after: float = 0.2
+
+    def __post_init__(self):
+        for f in fields(self):
+            if getattr(self, f.name) < 0:
+                raise ValueError(f"Timing '{f.name}' must not be negative")
+
+    @classmethod
+    def from_dict(cls, data: dict[str, float]) -> "TimingProfile":
+        """
+        Build a profile from a dict; missing keys keep their defaults.
+
+        Raises:
+            ValueError: If the dict contains unknown keys.
+        """
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown timing keys: {', '.join(sorted(unknown))}")
+        return cls(**{key: float(value) for key, value in data.items()})
+
+    def to_dict(self) -> dict[str, float]:
+        return asdict(self)
+
+
+def load_timing_profile(path: str) -> TimingProfile:
+    """
+    Load a timing profile from a JSON file.
+
+    Args:
+        path: Path of a JSON object mapping timing names to seconds.
+
+    Returns:
+        The loaded TimingProfile.
+    """
+    with open(path, encoding="utf-8") as f:
+        return TimingProfile.from_dict(json.load(f))
+
+
+def save_timing_profile(profile: TimingProfile, path: str) -> None:
+    """Write a timing profile as JSON."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile.to_dict(), f, indent=2)
+        f.write("\n")
+
+
+# Delays that only let the screen settle after an action. A pipelined agent
+# skips them (see `deferred_settle`) and waits for a stable frame instead.
+SETTLE_TIMINGS = (
+    "tap_after",
+    "double_tap_after",
+    "long_press_after",
+    "swipe_after",
+    "back_after",
+    "home_after",
+    "launch_after",
+    "copy_after",
+    "type_after",
+    "print_after",
+)
+
+_active_profile: TimingProfile | None = None
+_settle_deferred: ContextVar[bool] = ContextVar("settle_deferred", default=False)
+
+
+def get_timing_profile() -> TimingProfile:
+    """Get the active timing profile (settle delays zeroed in `deferred_settle`)."""
+    global _active_profile
+    if _active_profile is None:
+        path = os.getenv("PIKVM_TIMING_PROFILE")
+        _active_profile = load_timing_profile(path) if path else TimingProfile()
+    if _settle_deferred.get():
+        return replace(_active_profile, **{name: 0.0 for name in SETTLE_TIMINGS})
+    return _active_profile
+
+
+@contextmanager
+def deferred_settle() -> Iterator[None]:
+    """
+    Skip the settle delays of HID helpers called in this context.
+
+    The caller takes over waiting for the screen, e.g. by polling frames.
+    """
+    token = _settle_deferred.set(True)
+    try:
+        yield
+    finally:
+        _settle_deferred.reset(token)
+
+
+def set_timing_profile(profile: TimingProfile) -> None:
+    """Replace the active timing profile."""
+    global _active_profile
+    _active_profile = profile
@@ -0,0 +1,134 @@
+"""Detection of repeated actions and action cycles on an unchanged screen.
+
+The detector keeps a rolling window of (screen fingerprint, action) pairs.
+It reports a *repeat* when the same action is taken on the same screen
+several times, and a *cycle* when the last few pairs repeat as a block
+(e.g. Tap A, Back, Tap A, Back on the same two screens).
+"""
+
+from __future__ import annotations
+
+import base64
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+from iphone_agent.idb.frames import frame_signature, hamming_distance
+
+LOOP_RESPONSES = ("hint", "takeover", "abort")
+# Coordinates (0-1000) closer than this grid are treated as the same target.
+_COORDINATE_GRID = 25
+
+
+@dataclass
+class LoopDetectorConfig:
+    """Configuration of loop and stall detection."""
+
+    enabled: bool = True
+    # Number of recent steps kept.
+    window: int = 12
+    # Same action on the same screen this many times is a repeat.
+    max_repeats: int = 3
+    # Longest cycle (in steps) looked for, and how often it must repeat.
+    max_cycle_length: int = 4
+    cycle_repeats: int = 2
+    # dHash bit distance below which two screens count as the same.
+    screen_distance: int = 6
+    # "hint" adds a note to the next prompt, "takeover" asks the user to step
+    # in, "abort" ends the task.
+    response: str = "hint"
+    # Detections answered with a hint before escalating to abort.
+    max_hints: int = 2
+
+    def __post_init__(self):
+        if self.response not in LOOP_RESPONSES:
+            raise ValueError(f"response must be one of {LOOP_RESPONSES}")
+
+
+@dataclass(frozen=True)
+class LoopDetection:
+    """A detected repeat or cycle."""
+
+    kind: str
+    # Steps in the repeating unit (1 for a repeat).
+    length: int
+    # How many times the unit occurred.
+    count: int
+
+    def describe(self) -> str:
+        if self.kind == "repeat":
+            return f"same action on an unchanged screen {self.count} times"
+        return f"cycle of {self.length} steps repeated {self.count} times"
+
+
+def screen_fingerprint(image: bytes | str) -> int:
+    """dHash of a screenshot, given as image bytes or base64."""
+    if isinstance(image, str):
+        image = base64.b64decode(image)
+    return frame_signature(image).dhash
+
+
+def action_key(action: dict[str, Any]) -> tuple:
+    """
+    Hashable form of an action, with coordinates snapped to a grid.
+
+    Points that are not two numbers (a malformed model reply) are left out.
+    """
+    parts: list[Any] = [action.get("_metadata"), action.get("action")]
+    for name in ("element", "start", "end"):
+        point = action.get(name)
+        if isinstance(point, (list, tuple)) and len(point) == 2:
+            try:
+                parts.append(tuple(int(v) // _COORDINATE_GRID for v in point))
+            except (TypeError, ValueError, OverflowError):
+                continue
+    for name in ("text", "app"):
+        if name in action:
+            parts.append(action[name])
+    return tuple(parts)
+
+
+class LoopDetector:
+    """Rolling window of (screen, action) pairs checked for repeats and cycles."""
+
+    def __init__(self, config: LoopDetectorConfig | None = None):
+        self.config = config or LoopDetectorConfig()
+        self._steps: deque[tuple[int, tuple]] = deque(maxlen=self.config.window)
+
+    def reset(self) -> None:
+        self._steps.clear()
+
+    def observe(self, screen: int, action: dict[str, Any]) -> LoopDetection | None:
+        """
+        Record one step and check the window.
+
+        Args:
+            screen: Fingerprint of the screen the action was taken on.
+            action: Parsed action.
+
+        Returns:
+            LoopDetection if the step completes a repeat or cycle, else None.
+        """
+        self._steps.append((screen, action_key(action)))
+        return self._find_repeat() or self._find_cycle()
+
+    def _same(self, a: tuple[int, tuple], b: tuple[int, tuple]) -> bool:
+        return a[1] == b[1] and hamming_distance(a[0], b[0]) <= self.config.screen_distance
+
+    def _find_repeat(self) -> LoopDetection | None:
+        last = self._steps[-1]
+        count = sum(1 for step in self._steps if self._same(step, last))
+        if count >= self.config.max_repeats:
+            return LoopDetection("repeat", 1, count)
+        return None
+
+    def _find_cycle(self) -> LoopDetection | None:
+        steps = list(self._steps)
+        repeats = self.config.cycle_repeats
+        for length in range(2, self.config.max_cycle_length + 1):
+            if length * repeats > len(steps):
+                break
+            tail = steps[-length * repeats :]
+            if all(self._same(tail[i], tail[i + length]) for i in range(len(tail) - length)):
+                return LoopDetection("cycle", length, repeats)
+        return None
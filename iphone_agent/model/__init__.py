@@ -1,5 +1,27 @@
 """Model client module for AI inference."""
 
-from iphone_agent.model.client import ModelClient, ModelConfig
+from importlib import import_module
+from typing import TYPE_CHECKING
 
-__all__ = ["ModelClient", "ModelConfig"]
+if TYPE_CHECKING:
+    from iphone_agent.model.client import ModelClient, ModelConfig, TokenUsage
+    from iphone_agent.model.context import MessageContext
+
+__all__ = ["MessageContext", "ModelClient", "ModelConfig", "TokenUsage"]
+
+# Imported on first access: the client loads requests and, when used, the
+# OpenAI SDK.
+_LAZY = {
+    "MessageContext": "iphone_agent.model.context",
+    "ModelClient": "iphone_agent.model.client",
+    "ModelConfig": "iphone_agent.model.client",
+    "TokenUsage": "iphone_agent.model.client",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        value = getattr(import_module(_LAZY[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
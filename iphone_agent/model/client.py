@@ -1,10 +1,48 @@
-"""Model client for AI inference using OpenAI-compatible API."""
+"""Model client for AI inference using OpenAI-compatible API.
+
+The OpenAI SDK takes most of a second to import, so it is loaded on first
+use: by the first request's response parsing, or when a request goes through
+the SDK instead of the pre-encoded transport.
+"""
+
+from __future__ import annotations
 
 import json
+import time
 from dataclasses import dataclass, field
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from iphone_agent import cancellation
+from iphone_agent.metrics import Counter, Histogram
+from iphone_agent.model.context import MessageContext
 
-from openai import OpenAI
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from openai.types.chat import ChatCompletion
+
+MODEL_REQUEST_SECONDS = Histogram("model_request_seconds", "Model request latency", ["model"])
+MODEL_REQUESTS = Counter(
+    "model_requests_total", "Model requests by status", ["model", "status"]
+)
+MODEL_TOKENS = Counter(
+    "model_tokens_total", "Tokens reported by the model API", ["model", "kind"]
+)
+MODEL_ESCALATIONS = Counter(
+    "model_escalations_total", "Fast-tier responses escalated to the main model", ["reason"]
+)
+
+# Model tiers: the optional fast model is tried first, the main model decides
+# escalated steps.
+FAST_TIER = "fast"
+MAIN_TIER = "main"
+
+# Read timeout and retries of the pre-encoded transport (the OpenAI SDK's defaults).
+RAW_BODY_TIMEOUT = 600.0
+RAW_BODY_RETRIES = 2
 
 
 @dataclass
@@ -19,6 +57,47 @@ class ModelConfig:
     top_p: float = 0.85
     frequency_penalty: float = 0.2
     extra_body: dict[str, Any] = field(default_factory=dict)
+    # Optional small, fast model tried before `model_name` (None: single tier).
+    fast_model_name: str | None = None
+    # Server and key of the fast model (default: same as the main model).
+    fast_base_url: str | None = None
+    fast_api_key: str | None = None
+    # Send a MessageContext's pre-encoded body as-is instead of through the
+    # OpenAI SDK, which re-serializes every message on every request.
+    raw_body: bool = True
+
+
+@dataclass
+class TokenUsage:
+    """Token counts reported by the model API."""
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # Prompt tokens served from the server's prefix cache (subset of prompt_tokens).
+    cached_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def __add__(self, other: "TokenUsage") -> "TokenUsage":
+        return TokenUsage(
+            prompt_tokens=self.prompt_tokens + other.prompt_tokens,
+            completion_tokens=self.completion_tokens + other.completion_tokens,
+            cached_tokens=self.cached_tokens + other.cached_tokens,
+        )
+
+    @classmethod
+    def from_api(cls, usage: Any) -> "TokenUsage | None":
+        """Build from an OpenAI `usage` object (None if the server sent none)."""
+        if usage is None:
+            return None
+        details = getattr(usage, "prompt_tokens_details", None)
+        return cls(
+            prompt_tokens=usage.prompt_tokens or 0,
+            completion_tokens=usage.completion_tokens or 0,
+            cached_tokens=getattr(details, "cached_tokens", None) or 0,
+        )
 
 
 @dataclass
@@ -28,6 +107,53 @@ class ModelResponse:
     thinking: str
     action: str
     raw_content: str
+    usage: TokenUsage | None = None
+    # Tier that produced the response, and why the fast tier was overruled.
+    tier: str = MAIN_TIER
+    escalation_reason: str | None = None
+
+
+class RawBodyTransport:
+    """
+    Posts pre-encoded chat completion bodies over a pooled keep-alive session.
+
+    Args:
+        base_url: OpenAI-compatible API base URL.
+        api_key: Bearer token.
+    """
+
+    def __init__(self, base_url: str, api_key: str):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.session = requests.Session()
+        self.session.headers.update(
+            {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        )
+        retry = Retry(
+            total=RAW_BODY_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=(408, 409, 429, 500, 502, 503, 504),
+            allowed_methods=None,
+        )
+        adapter = HTTPAdapter(max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Requests under a deadline are sent once: retries could outlast it.
+        self.single_session = requests.Session()
+        self.single_session.headers.update(self.session.headers)
+
+    def create(self, body: bytes, timeout: float | None = None) -> ChatCompletion:
+        from openai.types.chat import ChatCompletion
+
+        if timeout is None:
+            resp = self.session.post(self.url, data=body, timeout=(10, RAW_BODY_TIMEOUT))
+        else:
+            resp = self.single_session.post(self.url, data=body, timeout=timeout)
+        resp.raise_for_status()
+        return ChatCompletion.model_validate(resp.json())
+
+    def close(self) -> None:
+        self.session.close()
+        self.single_session.close()
 
 
 class ModelClient:
@@ -40,38 +166,148 @@ class ModelClient:
 
     def __init__(self, config: ModelConfig | None = None):
         self.config = config or ModelConfig()
-        self.client = OpenAI(base_url=self.config.base_url, api_key=self.config.api_key)
-
-    def request(self, messages: list[dict[str, Any]]) -> ModelResponse:
+        # (base URL, API key) of each tier.
+        self._endpoints = {MAIN_TIER: (self.config.base_url, self.config.api_key)}
+        if self.config.fast_model_name:
+            self._endpoints[FAST_TIER] = (
+                self.config.fast_base_url or self.config.base_url,
+                self.config.fast_api_key or self.config.api_key,
+            )
+        # SDK clients, built on first use.
+        self._sdk_clients: dict[str, OpenAI] = {}
+        self._transports: dict[str, RawBodyTransport] = {}
+        if self.config.raw_body:
+            for tier, (base_url, api_key) in self._endpoints.items():
+                self._transports[tier] = RawBodyTransport(base_url, api_key)
+        self.tier_counts = {FAST_TIER: 0, MAIN_TIER: 0, "escalated": 0}
+
+    @property
+    def client(self) -> OpenAI:
+        """SDK client of the main model."""
+        return self._sdk_client(MAIN_TIER)
+
+    @property
+    def fast_client(self) -> OpenAI | None:
+        """SDK client of the fast model (None without one)."""
+        return self._sdk_client(FAST_TIER) if self.has_fast_tier else None
+
+    @property
+    def has_fast_tier(self) -> bool:
+        return FAST_TIER in self._endpoints
+
+    def _sdk_client(self, tier: str) -> OpenAI:
+        client = self._sdk_clients.get(tier)
+        if client is None:
+            from openai import OpenAI
+
+            base_url, api_key = self._endpoints[tier]
+            client = self._sdk_clients[tier] = OpenAI(base_url=base_url, api_key=api_key)
+        return client
+
+    def request(
+        self,
+        messages: list[dict[str, Any]] | MessageContext,
+        validate: Callable[[ModelResponse], str | None] | None = None,
+        tier: str | None = None,
+    ) -> ModelResponse:
         """
         Send a request to the model.
 
+        With a fast model configured, the fast tier answers first and the main
+        model is asked only when the fast request fails or `validate` rejects
+        its response.
+
         Args:
-            messages: List of message dictionaries in OpenAI format.
+            messages: Messages in OpenAI format; a MessageContext is sent as
+                its pre-encoded body.
+            validate: Returns a reason ("parse", "invalid", ...) to reject a
+                fast-tier response, or None to accept it.
+            tier: Force a tier (MAIN_TIER skips the fast model).
 
         Returns:
             ModelResponse containing thinking and action.
 
         Raises:
             ValueError: If the response cannot be parsed.
+            Cancelled: If the running task was cancelled or is past its deadline.
         """
-        response = self.client.chat.completions.create(
-            messages=messages,
-            model=self.config.model_name,
-            max_tokens=self.config.max_tokens,
-            temperature=self.config.temperature,
-            top_p=self.config.top_p,
-            frequency_penalty=self.config.frequency_penalty,
-            extra_body=self.config.extra_body,
-            stream=False,
-        )
+        if not self.has_fast_tier or tier == MAIN_TIER:
+            return self._request_tier(MAIN_TIER, messages)
+
+        try:
+            fast = self._request_tier(FAST_TIER, messages)
+        except Exception:
+            fast, reason = None, "error"
+        else:
+            reason = validate(fast) if validate is not None else None
+            if reason is None:
+                return fast
+
+        MODEL_ESCALATIONS.labels(reason).inc()
+        self.tier_counts["escalated"] += 1
+        response = self._request_tier(MAIN_TIER, messages)
+        response.escalation_reason = reason
+        if fast is not None and fast.usage is not None:
+            response.usage = fast.usage + (response.usage or TokenUsage())
+        return response
+
+    def _request_tier(
+        self, tier: str, messages: list[dict[str, Any]] | MessageContext
+    ) -> ModelResponse:
+        """Send one request to the model of a tier."""
+        model = self.config.fast_model_name if tier == FAST_TIER else self.config.model_name
+        transport = self._transports.get(tier)
+        params = {
+            "model": model,
+            "max_tokens": self.config.max_tokens,
+            "temperature": self.config.temperature,
+            "top_p": self.config.top_p,
+            "frequency_penalty": self.config.frequency_penalty,
+            "stream": False,
+        }
+        # Time left before the running task's deadline (None without one).
+        timeout = cancellation.remaining()
+        self.tier_counts[tier] += 1
+        start = time.perf_counter()
+        try:
+            if isinstance(messages, MessageContext) and transport is not None:
+                response = transport.create(
+                    messages.body(**{**params, **self.config.extra_body}), timeout
+                )
+            else:
+                if isinstance(messages, MessageContext):
+                    messages = messages.copy()
+                client = self._sdk_client(tier)
+                if timeout is not None:
+                    # Sent once: SDK retries could outlast the deadline.
+                    client = client.with_options(timeout=timeout, max_retries=0)
+                response = client.chat.completions.create(
+                    messages=messages, extra_body=self.config.extra_body, **params
+                )
+        except Exception:
+            MODEL_REQUESTS.labels(model, "error").inc()
+            raise
+        finally:
+            MODEL_REQUEST_SECONDS.labels(model).observe(time.perf_counter() - start)
+        MODEL_REQUESTS.labels(model, "ok").inc()
+        usage = TokenUsage.from_api(response.usage)
+        if usage is not None:
+            MODEL_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens)
+            MODEL_TOKENS.labels(model, "completion").inc(usage.completion_tokens)
+            MODEL_TOKENS.labels(model, "cached").inc(usage.cached_tokens)
 
         raw_content = response.choices[0].message.content
 
         # Parse thinking and action from response
         thinking, action = self._parse_response(raw_content)
 
-        return ModelResponse(thinking=thinking, action=action, raw_content=raw_content)
+        return ModelResponse(
+            thinking=thinking,
+            action=action,
+            raw_content=raw_content,
+            usage=usage,
+            tier=tier,
+        )
 
     def _parse_response(self, content: str) -> tuple[str, str]:
         """
@@ -126,27 +362,29 @@ class MessageBuilder:
 
     @staticmethod
     def create_user_message(
-        text: str, image_base64: str | None = None
+        text: str,
+        image_base64: str | None = None,
+        image_url: str | bytes | bytearray | None = None,
     ) -> dict[str, Any]:
         """
         Create a user message with optional image.
 
         Args:
             text: Text content.
-            image_base64: Optional base64-encoded image.
+            image_base64: Optional base64-encoded PNG image.
+            image_url: Optional image URL used as-is. An ASCII bytes data URL
+                (`Screenshot.data_url_bytes`) avoids copying the base64 into a
+                string; MessageContext encodes it and `copy()` decodes it.
 
         Returns:
             Message dictionary.
         """
         content = []
 
-        if image_base64:
-            content.append(
-                {
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/png;base64,{image_base64}"},
-                }
-            )
+        if image_base64 and not image_url:
+            image_url = f"data:image/png;base64,{image_base64}"
+        if image_url:
+            content.append({"type": "image_url", "image_url": {"url": image_url}})
 
         content.append({"type": "text", "text": text})
 
@@ -0,0 +1,178 @@
+"""Conversation context kept pre-encoded as JSON.
+
+The context grows by one user and one assistant message per step, and the
+request body of every step repeats all of them. `MessageContext` encodes each
+message once, when it is added or replaced, so building a request body only
+joins the stored bytes; the newest message (with its screenshot) is the only
+one serialized per step.
+
+Base64 screenshots need no JSON escaping, so their bytes are spliced into the
+encoded message instead of being scanned by `json.dumps`. Image URLs may be
+given as ASCII bytes (`Screenshot.data_url_bytes`), which are spliced without
+any copy until the request body is joined.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Iterator
+
+
+# Printable ASCII except the two characters JSON strings escape.
+_JSON_SAFE = bytes(c for c in range(0x20, 0x7F) if c not in b'"\\')
+# Stands in for image URLs while the rest of a message is encoded.
+_IMAGE_PLACEHOLDER = "\x00image\x00"
+_ENCODED_PLACEHOLDER = b'"\\u0000image\\u0000"'
+
+
+def encode_json(value: Any) -> bytes:
+    """Compact UTF-8 JSON, as sent in request bodies."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_message(message: dict[str, Any]) -> bytes:
+    """Encode a chat message, splicing base64 image data URLs in unescaped."""
+    return b"".join(encode_message_parts(message))
+
+
+def encode_message_parts(message: dict[str, Any]) -> list[bytes]:
+    """
+    Encode a message as chunks, so large images are copied only into the body.
+
+    The result can be passed to `MessageContext.append` to encode a message
+    ahead of time, e.g. on another thread.
+    """
+    content = message.get("content")
+    if not isinstance(content, list):
+        return [encode_json(message)]
+    images: list[bytes] = []
+    items = []
+    for item in content:
+        url = item.get("image_url", {}).get("url") if item.get("type") == "image_url" else None
+        data = _data_url_bytes(url) if url is not None else None
+        if data is None:
+            items.append(item)
+            continue
+        images.append(data)
+        items.append({**item, "image_url": {**item["image_url"], "url": _IMAGE_PLACEHOLDER}})
+    if not images:
+        return [encode_json(plain_message(message))]
+    parts = encode_json(plain_message({**message, "content": items})).split(
+        _ENCODED_PLACEHOLDER
+    )
+    if len(parts) != len(images) + 1:
+        return [encode_json(plain_message(message))]
+    chunks = [parts[0]]
+    for image, part in zip(images, parts[1:]):
+        chunks.extend((b'"', image, b'"', part))
+    return chunks
+
+
+def _data_url_bytes(url: Any) -> bytes | bytearray | None:
+    """ASCII bytes of a data URL, or None if it would need JSON escaping."""
+    if isinstance(url, str):
+        if not url.startswith("data:") or not url.isascii():
+            return None
+        data = url.encode("ascii")
+    elif isinstance(url, (bytes, bytearray)):
+        if not url.startswith(b"data:"):
+            return None
+        data = url
+    else:
+        return None
+    if data.translate(None, _JSON_SAFE):
+        return None
+    return data
+
+
+def plain_message(message: dict[str, Any]) -> dict[str, Any]:
+    """The message with bytes image URLs decoded to `str` (JSON-serializable)."""
+    content = message.get("content")
+    if not isinstance(content, list) or not any(
+        isinstance(item.get("image_url", {}).get("url"), (bytes, bytearray))
+        for item in content
+    ):
+        return message
+    items = []
+    for item in content:
+        url = item.get("image_url", {}).get("url")
+        if isinstance(url, (bytes, bytearray)):
+            item = {**item, "image_url": {**item["image_url"], "url": url.decode("utf-8")}}
+        items.append(item)
+    return {**message, "content": items}
+
+
+class MessageContext:
+    """
+    List of chat messages with the JSON encoding of each one.
+
+    Supports the list operations the agent uses (append, indexing, len,
+    iteration); replacing a message re-encodes only that message. Messages
+    must not be mutated in place after they are added.
+    """
+
+    def __init__(self, messages: list[dict[str, Any]] | None = None):
+        self._messages: list[dict[str, Any]] = []
+        self._encoded: list[list[bytes]] = []
+        for message in messages or []:
+            self.append(message)
+
+    def append(
+        self, message: dict[str, Any], encoded: list[bytes] | None = None
+    ) -> None:
+        """Add a message, with its `encode_message_parts` output if already encoded."""
+        self._encoded.append(encode_message_parts(message) if encoded is None else encoded)
+        self._messages.append(message)
+
+    def pop(self, index: int = -1) -> dict[str, Any]:
+        self._encoded.pop(index)
+        return self._messages.pop(index)
+
+    def clear(self) -> None:
+        self._messages.clear()
+        self._encoded.clear()
+
+    def copy(self) -> list[dict[str, Any]]:
+        """The messages as a plain list (bytes image URLs decoded)."""
+        return [plain_message(message) for message in self._messages]
+
+    def __getitem__(self, index: int) -> dict[str, Any]:
+        return self._messages[index]
+
+    def __setitem__(self, index: int, message: dict[str, Any]) -> None:
+        self._encoded[index] = encode_message_parts(message)
+        self._messages[index] = message
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return iter(self._messages)
+
+    @property
+    def encoded_size(self) -> int:
+        """Bytes of all encoded messages."""
+        return sum(len(chunk) for chunks in self._encoded for chunk in chunks)
+
+    def body(self, **params: Any) -> bytes:
+        """
+        Chat completion request body: `params` plus the encoded messages.
+
+        Args:
+            **params: Other top-level request fields (model, max_tokens, ...).
+
+        Returns:
+            The JSON body as bytes.
+        """
+        body = [b'{"messages":[']
+        for i, chunks in enumerate(self._encoded):
+            if i:
+                body.append(b",")
+            body.extend(chunks)
+        if params:
+            # Splice the other fields in after the messages: drop the opening brace.
+            body.extend((b"],", encode_json(params)[1:]))
+        else:
+            body.append(b"]}")
+        # A single join: every stored chunk is copied once.
+        return b"".join(body)
@@ -0,0 +1,264 @@
+"""Startup checks of the model endpoints, the PiKVM and the content server.
+
+Checks run concurrently, each with its own short timeout, so startup takes as
+long as the slowest check instead of the sum of them. Passed checks are
+cached on disk for `PHONE_AGENT_PREFLIGHT_TTL` seconds (default 300), keyed by
+their target, so repeated CLI runs and fleet workers skip them; failures are
+never cached.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, wait
+from dataclasses import dataclass
+from typing import Callable
+
+# Seconds each check may take.
+DEFAULT_TIMEOUT = float(os.getenv("PHONE_AGENT_PREFLIGHT_TIMEOUT", "3"))
+DEFAULT_TTL = float(os.getenv("PHONE_AGENT_PREFLIGHT_TTL", "300"))
+DEFAULT_CACHE_PATH = os.getenv(
+    "PHONE_AGENT_PREFLIGHT_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "iphone_agent", "preflight.json"),
+)
+
+
+@dataclass
+class Check:
+    """One startup check."""
+
+    name: str
+    # Identifies the checked target (URL, model) in the cache.
+    key: str
+    # Called with the timeout; returns a detail line, raises on failure.
+    run: Callable[[float], str]
+    # Whether a failure should stop startup (otherwise only a warning).
+    required: bool = True
+
+
+@dataclass
+class CheckResult:
+    """Outcome of one check."""
+
+    name: str
+    ok: bool
+    detail: str
+    seconds: float
+    cached: bool = False
+    required: bool = True
+
+
+class PreflightCache:
+    """
+    Passed checks stored in a JSON file.
+
+    Args:
+        path: Cache file.
+        ttl: Seconds a passed check stays valid (0 disables the cache).
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL) -> None:
+        self.path = path
+        self.ttl = ttl
+
+    def load(self) -> dict[str, dict]:
+        """Entries that have not expired, by check key."""
+        if self.ttl <= 0:
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        return {
+            key: entry
+            for key, entry in entries.items()
+            if isinstance(entry, dict) and now - entry.get("checked_at", 0) < self.ttl
+        }
+
+    def store(self, entries: dict[str, dict]) -> None:
+        """Replace the file with `entries` (written atomically; errors ignored)."""
+        if self.ttl <= 0:
+            return
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+def run_preflight(
+    checks: list[Check],
+    timeout: float = DEFAULT_TIMEOUT,
+    cache: PreflightCache | None = None,
+) -> list[CheckResult]:
+    """
+    Run checks concurrently, skipping those passed within the cache TTL.
+
+    Args:
+        checks: Checks to run.
+        timeout: Seconds each check may take.
+        cache: Cache of passed checks (None: always run every check).
+
+    Returns:
+        One CheckResult per check, in the order given.
+    """
+    cached = cache.load() if cache is not None else {}
+    results: dict[str, CheckResult] = {}
+    pending = []
+    for check in checks:
+        entry = cached.get(check.key)
+        if entry is not None:
+            results[check.key] = CheckResult(
+                check.name, True, entry["detail"], 0.0, cached=True, required=check.required
+            )
+        else:
+            pending.append(check)
+
+    if pending:
+        def run(check: Check) -> CheckResult:
+            start = time.perf_counter()
+            try:
+                detail = check.run(timeout)
+                ok = True
+            except Exception as e:
+                detail, ok = str(e), False
+            return CheckResult(
+                check.name, ok, detail, time.perf_counter() - start, required=check.required
+            )
+
+        def run_into(check: Check, future: Future) -> None:
+            future.set_result(run(check))
+
+        futures: dict[str, Future] = {}
+        for check in pending:
+            futures[check.key] = Future()
+            # Daemon threads: a check that hangs past its timeout must not
+            # hold up interpreter exit.
+            threading.Thread(
+                target=run_into,
+                args=(check, futures[check.key]),
+                name=f"preflight-{check.name}",
+                daemon=True,
+            ).start()
+        # Each check bounds its own requests; the margin covers name lookups
+        # and connects that do not honour the timeout.
+        wait(futures.values(), timeout=timeout + 1.0)
+        for check in pending:
+            future = futures[check.key]
+            if future.done():
+                results[check.key] = future.result()
+            else:
+                results[check.key] = CheckResult(
+                    check.name,
+                    False,
+                    f"timed out after {timeout:.0f}s",
+                    timeout,
+                    required=check.required,
+                )
+
+        if cache is not None:
+            now = time.time()
+            for check in pending:
+                result = results[check.key]
+                if result.ok:
+                    cached[check.key] = {"detail": result.detail, "checked_at": now}
+                else:
+                    cached.pop(check.key, None)
+            cache.store(cached)
+
+    return [results[check.key] for check in checks]
+
+
+def model_check(
+    base_url: str, model_name: str, api_key: str = "EMPTY", name: str = "model"
+) -> Check:
+    """
+    The endpoint answers and serves `model_name`.
+
+    Passes at once if `/models` lists `model_name`. Otherwise (no such
+    endpoint, an error status, or a list of aliases) a one-token chat
+    completion decides, since that is what the agent actually needs.
+    """
+    import requests
+
+    base = base_url.rstrip("/")
+    headers = {"Authorization": f"Bearer {api_key}"}
+
+    def run(timeout: float) -> str:
+        resp = requests.get(f"{base}/models", headers=headers, timeout=timeout)
+        if resp.ok:
+            try:
+                models = [m.get("id") for m in resp.json().get("data", [])]
+            except (ValueError, AttributeError, TypeError):
+                models = []
+            if model_name in models:
+                return f"{model_name} served at {base}"
+        resp = requests.post(
+            f"{base}/chat/completions",
+            headers=headers,
+            json={
+                "model": model_name,
+                "messages": [{"role": "user", "content": "Hi"}],
+                "max_tokens": 1,
+            },
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+        return f"{model_name} answered at {base}"
+
+    return Check(name, f"model:{base}:{model_name}", run)
+
+
+def pikvm_hid_check() -> Check:
+    """The PiKVM answers and connects its HID (what every action does first)."""
+    from iphone_agent.idb.connection import client
+
+    def run(timeout: float) -> str:
+        client.request("/api/hid/set_connected?connected=1", "POST", timeout=timeout)
+        return f"HID connected at {client.base_url}"
+
+    return Check("pikvm-hid", f"pikvm-hid:{client.base_url}", run)
+
+
+def streamer_check() -> Check:
+    """The PiKVM streamer returns a snapshot."""
+    from iphone_agent.idb.connection import client
+
+    def run(timeout: float) -> str:
+        resp = client.request("/streamer/snapshot", "GET", timeout=timeout)
+        if not resp.body:
+            raise ValueError("empty snapshot")
+        return f"snapshot {len(resp.body) // 1024} KiB"
+
+    return Check("streamer", f"streamer:{client.base_url}", run)
+
+
+def content_server_check(device_id: str | None = None) -> Check | None:
+    """
+    The content server the Shortcuts read from answers (None when in-process).
+
+    Not required: only Launch and Type go through it.
+    """
+    if os.getenv("CONTENT_PUBLISHER", "http") == "inprocess":
+        return None
+    import requests
+
+    from iphone_agent.idb.connection import content_url
+
+    url = content_url(device_id)
+
+    def run(timeout: float) -> str:
+        requests.get(url, timeout=timeout).raise_for_status()
+        return f"content server at {url}"
+
+    return Check("content-server", f"content:{url}", run, required=False)
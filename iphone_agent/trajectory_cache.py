@@ -0,0 +1,300 @@
+"""Cache of successful action sequences, replayed without model calls.
+
+A finished task is stored as its action sequence plus the fingerprint of the
+screen each action was taken on. Text the task mentions and the actions typed
+(e.g. the search term of "open RedNote and search earbuds") becomes a slot, so
+the entry is keyed by a task *template* and also serves other values of the
+slot.
+
+On a hit the agent replays the actions through `ActionHandler`, checking each
+screen against the stored fingerprint, and falls back to the model on the
+first mismatch.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from iphone_agent.metrics import Counter
+
+# Actions that need a person or external input are never cached.
+UNCACHEABLE_ACTIONS = {"Take_over", "Interact", "Call_API", "Note"}
+# dHash bit distance up to which a replayed screen matches the recorded one.
+DEFAULT_SCREEN_DISTANCE = 10
+# Typed text shorter than this is not turned into a slot.
+_MIN_SLOT_LENGTH = 2
+
+TRAJECTORY_LOOKUPS = Counter(
+    "trajectory_cache_lookups_total", "Trajectory cache lookups by result", ["result"]
+)
+TRAJECTORY_STEPS = Counter(
+    "trajectory_cache_steps_total", "Replayed steps by outcome", ["outcome"]
+)
+
+
+def normalize_task(task: str) -> str:
+    """Case-fold, NFKC-normalize and collapse whitespace."""
+    text = unicodedata.normalize("NFKC", task).casefold()
+    return " ".join(text.split())
+
+
+@dataclass
+class TrajectoryStep:
+    """One recorded step: the screen it started on and the action taken."""
+
+    screen: int
+    action: dict[str, Any]
+
+
+@dataclass
+class Trajectory:
+    """Cached action sequence for a task template."""
+
+    template: str
+    steps: list[TrajectoryStep]
+    hits: int = 0
+    fallbacks: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        for step in data["steps"]:
+            step["screen"] = f"{step['screen']:016x}"
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Trajectory":
+        steps = [
+            TrajectoryStep(screen=int(step["screen"], 16), action=step["action"])
+            for step in data["steps"]
+        ]
+        return cls(
+            template=data["template"],
+            steps=steps,
+            hits=data.get("hits", 0),
+            fallbacks=data.get("fallbacks", 0),
+        )
+
+    def bind(self, values: list[str]) -> list[TrajectoryStep]:
+        """Steps with the slots filled in."""
+        return [
+            TrajectoryStep(step.screen, _fill_slots(step.action, values))
+            for step in self.steps
+        ]
+
+
+@dataclass
+class TrajectoryCacheStats:
+    lookups: int = 0
+    hits: int = 0
+    replayed_steps: int = 0
+    fallbacks: int = 0
+    stored: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    @property
+    def model_calls_saved(self) -> int:
+        # Every replayed step is a step the model did not have to decide.
+        return self.replayed_steps
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            **asdict(self),
+            "hit_rate": self.hit_rate,
+            "model_calls_saved": self.model_calls_saved,
+        }
+
+
+@dataclass
+class TrajectoryMatch:
+    """A cache hit: the entry and the steps bound to this task."""
+
+    trajectory: Trajectory
+    steps: list[TrajectoryStep] = field(default_factory=list)
+
+
+class TrajectoryCache:
+    """
+    Task template -> trajectory store, optionally persisted as JSON.
+
+    Args:
+        path: JSON file to load from and save to (memory only if None).
+        screen_distance: dHash distance up to which replayed screens match.
+    """
+
+    def __init__(
+        self, path: str | None = None, screen_distance: int = DEFAULT_SCREEN_DISTANCE
+    ):
+        self.path = path
+        self.screen_distance = screen_distance
+        self.stats = TrajectoryCacheStats()
+        self._lock = threading.Lock()
+        self._entries: dict[str, Trajectory] = {}
+        # Templates with slots, matched by regex when there is no exact hit.
+        self._patterns: dict[str, re.Pattern] = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, task: str) -> TrajectoryMatch | None:
+        """Find the trajectory for a task and bind its slots."""
+        key = normalize_task(task)
+        with self._lock:
+            self.stats.lookups += 1
+            trajectory = self._entries.get(key)
+            values: list[str] = []
+            if trajectory is None:
+                for template, pattern in self._patterns.items():
+                    match = pattern.fullmatch(key)
+                    if match:
+                        trajectory = self._entries[template]
+                        # Groups are named by slot: slot order is step order,
+                        # which need not be the order they appear in the task.
+                        slots = match.groupdict()
+                        values = [slots[f"s{i}"] for i in range(len(slots))]
+                        break
+            if trajectory is None:
+                TRAJECTORY_LOOKUPS.labels("miss").inc()
+                return None
+            self.stats.hits += 1
+            trajectory.hits += 1
+        TRAJECTORY_LOOKUPS.labels("hit").inc()
+        # Slot values come from the normalized task; recover the original case.
+        values = [_original_span(task, value) for value in values]
+        return TrajectoryMatch(trajectory, trajectory.bind(values))
+
+    def store(self, task: str, steps: list[TrajectoryStep]) -> Trajectory | None:
+        """
+        Cache the steps of a successfully finished task.
+
+        Returns:
+            The stored Trajectory, or None if the steps cannot be cached.
+        """
+        if not steps or any(
+            step.action.get("action") in UNCACHEABLE_ACTIONS for step in steps
+        ):
+            return None
+        template, slotted = _make_template(task, steps)
+        trajectory = Trajectory(template=template, steps=slotted)
+        with self._lock:
+            previous = self._entries.get(template)
+            if previous is not None:
+                trajectory.hits = previous.hits
+            self._entries[template] = trajectory
+            if "{0}" in template:
+                self._patterns[template] = _template_pattern(template)
+            self.stats.stored += 1
+        if self.path:
+            self.save(self.path)
+        return trajectory
+
+    def record_replay(self, match: TrajectoryMatch, replayed: int, fell_back: bool) -> None:
+        """Account one replay: steps replayed and whether it fell back."""
+        with self._lock:
+            self.stats.replayed_steps += replayed
+            if fell_back:
+                self.stats.fallbacks += 1
+                match.trajectory.fallbacks += 1
+        TRAJECTORY_STEPS.labels("replayed").inc(replayed)
+        if fell_back:
+            TRAJECTORY_STEPS.labels("mismatch").inc()
+
+    def load(self, path: str) -> None:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            for item in data:
+                trajectory = Trajectory.from_dict(item)
+                self._entries[trajectory.template] = trajectory
+                if "{0}" in trajectory.template:
+                    self._patterns[trajectory.template] = _template_pattern(
+                        trajectory.template
+                    )
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            data = [trajectory.to_dict() for trajectory in self._entries.values()]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+def _make_template(
+    task: str, steps: list[TrajectoryStep]
+) -> tuple[str, list[TrajectoryStep]]:
+    """Replace typed text that also appears in the task with numbered slots."""
+    template = normalize_task(task)
+    slots: list[str] = []
+    for step in steps:
+        text = step.action.get("text")
+        if not isinstance(text, str) or len(text) < _MIN_SLOT_LENGTH:
+            continue
+        normalized = normalize_task(text)
+        if normalized in slots:
+            continue
+        template, found = _slot_regex(normalized).subn(
+            "{%d}" % len(slots), template, count=1
+        )
+        if found:
+            slots.append(normalized)
+
+    slotted = []
+    for step in steps:
+        action = dict(step.action)
+        text = action.get("text")
+        if isinstance(text, str) and normalize_task(text) in slots:
+            action["text"] = "{%d}" % slots.index(normalize_task(text))
+        slotted.append(TrajectoryStep(step.screen, action))
+    return template, slotted
+
+
+def _slot_regex(value: str) -> re.Pattern:
+    """
+    Matches `value` as a whole word, so "an" does not match inside "and".
+
+    Only ASCII letters and digits at the edges of `value` need a boundary:
+    CJK text has no spaces between words.
+    """
+    start = r"(?<![A-Za-z0-9])" if re.match(r"[A-Za-z0-9]", value) else ""
+    end = r"(?![A-Za-z0-9])" if re.search(r"[A-Za-z0-9]$", value) else ""
+    return re.compile(start + re.escape(value) + end)
+
+
+def _template_pattern(template: str) -> re.Pattern:
+    """Regex of a template with one named group `s<N>` per slot `{N}`."""
+    parts = re.split(r"(\{\d+\})", template)
+    pattern = ""
+    for part in parts:
+        slot = re.fullmatch(r"\{(\d+)\}", part)
+        pattern += f"(?P<s{slot.group(1)}>.+?)" if slot else re.escape(part)
+    return re.compile(pattern)
+
+
+def _fill_slots(action: dict[str, Any], values: list[str]) -> dict[str, Any]:
+    text = action.get("text")
+    if not isinstance(text, str) or not values:
+        return dict(action)
+    match = re.fullmatch(r"\{(\d+)\}", text)
+    if match is None or int(match.group(1)) >= len(values):
+        return dict(action)
+    return {**action, "text": values[int(match.group(1))]}
+
+
+def _original_span(task: str, value: str) -> str:
+    """The substring of `task` that normalizes to `value` (or `value` itself)."""
+    folded = task.casefold()
+    index = folded.find(value)
+    if index >= 0 and len(folded) == len(task) and normalize_task(task) == folded:
+        return task[index : index + len(value)]
+    return value
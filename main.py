@@ -9,101 +9,113 @@ Environment Variables:
     PHONE_AGENT_BASE_URL: Model API base URL (default: http://localhost:8000/v1)
     PHONE_AGENT_MODEL: Model name (default: autoglm-phone-9b)
     PHONE_AGENT_API_KEY: API key for model authentication (default: EMPTY)
+    PHONE_AGENT_FAST_MODEL: Fast model tried before --model (default: none)
+    PHONE_AGENT_FAST_BASE_URL: Fast model API base URL (default: --base-url)
     PHONE_AGENT_MAX_STEPS: Maximum steps per task (default: 100)
     PHONE_AGENT_DEVICE_ID: ADB device ID for multi-device setups
+    PHONE_AGENT_DEVICE_CONTENT: 1 to use the device's own content channel
+    PHONE_AGENT_PREFLIGHT_TIMEOUT: Seconds per startup check (default: 3)
+    PHONE_AGENT_PREFLIGHT_TTL: Seconds a passed startup check is cached (default: 300)
 """
 
 import argparse
 import os
 import sys
-from openai import OpenAI
-from iphone_agent import PhoneAgent
-from iphone_agent.agent import AgentConfig
+import time
+from typing import TYPE_CHECKING
+
 from iphone_agent.config.apps import list_supported_apps
-from iphone_agent.model import ModelConfig
 
+# The agent, model client and checks are imported once they are needed, so
+# that --help and --list-apps do not load the OpenAI SDK, OpenCV or requests.
+if TYPE_CHECKING:
+    from iphone_agent import PhoneAgent
+
+
+def _print_model_hint(base_url: str, error_msg: str) -> None:
+    """Suggest fixes for a failed model endpoint check."""
+    if (
+        "Connection refused" in error_msg
+        or "Connection error" in error_msg
+        or "Max retries" in error_msg
+    ):
+        print(f"   Error: Cannot connect to {base_url}")
+        print("   Solution:")
+        print("     1. Check if the model server is running")
+        print("     2. Verify the base URL is correct")
+        print(f"     3. Try: curl {base_url}/models")
+    elif "timed out" in error_msg.lower() or "timeout" in error_msg.lower():
+        print(f"   Error: Connection to {base_url} timed out")
+        print("   Solution:")
+        print("     1. Check your network connection")
+        print("     2. Verify the server is responding")
+    elif (
+        "Name or service not known" in error_msg
+        or "nodename nor servname" in error_msg
+    ):
+        print(f"   Error: Cannot resolve hostname")
+        print("   Solution:")
+        print("     1. Check the URL is correct")
+        print("     2. Verify DNS settings")
+    else:
+        print(f"   Error: {error_msg}")
 
-def check_model_api(base_url: str, model_name: str, api_key: str = "EMPTY") -> bool:
-    """
-    Check if the model API is accessible and the specified model exists.
 
-    Checks:
-    1. Network connectivity to the API endpoint
-    2. Model exists in the available models list
+def check_system(args: argparse.Namespace) -> bool:
+    """
+    Check the model endpoints, the PiKVM and the content server concurrently.
 
-    Args:
-        base_url: The API base URL
-        model_name: The model name to check
-        api_key: The API key for authentication
+    Passed checks are cached for PHONE_AGENT_PREFLIGHT_TTL seconds.
 
     Returns:
         True if all checks pass, False otherwise.
     """
-    print("🔍 Checking model API...")
-    print("-" * 50)
+    from iphone_agent.preflight import (
+        PreflightCache,
+        content_server_check,
+        model_check,
+        pikvm_hid_check,
+        run_preflight,
+        streamer_check,
+    )
 
-    all_passed = True
-
-    # Check 1: Network connectivity using chat API
-    print(f"1. Checking API connectivity ({base_url})...", end=" ")
-    try:
-        # Create OpenAI client
-        client = OpenAI(base_url=base_url, api_key=api_key, timeout=30.0)
-
-        # Use chat completion to test connectivity (more universally supported than /models)
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[{"role": "user", "content": "Hi"}],
-            max_tokens=5,
-            temperature=0.0,
-            stream=False,
-        )
+    print("🔍 Checking system...")
+    print("-" * 50)
 
-        # Check if we got a valid response
-        if response.choices and len(response.choices) > 0:
-            print("✅ OK")
-        else:
-            print("❌ FAILED")
-            print("   Error: Received empty response from API")
-            all_passed = False
-
-    except Exception as e:
-        print("❌ FAILED")
-        error_msg = str(e)
-
-        # Provide more specific error messages
-        if "Connection refused" in error_msg or "Connection error" in error_msg:
-            print(f"   Error: Cannot connect to {base_url}")
-            print("   Solution:")
-            print("     1. Check if the model server is running")
-            print("     2. Verify the base URL is correct")
-            print(f"     3. Try: curl {base_url}/chat/completions")
-        elif "timed out" in error_msg.lower() or "timeout" in error_msg.lower():
-            print(f"   Error: Connection to {base_url} timed out")
-            print("   Solution:")
-            print("     1. Check your network connection")
-            print("     2. Verify the server is responding")
-        elif (
-            "Name or service not known" in error_msg
-            or "nodename nor servname" in error_msg
-        ):
-            print(f"   Error: Cannot resolve hostname")
-            print("   Solution:")
-            print("     1. Check the URL is correct")
-            print("     2. Verify DNS settings")
+    model_urls = {"model": args.base_url}
+    checks = [model_check(args.base_url, args.model, args.apikey)]
+    if args.fast_model:
+        fast_base_url = args.fast_base_url or args.base_url
+        model_urls["fast-model"] = fast_base_url
+        checks.append(model_check(fast_base_url, args.fast_model, args.apikey, "fast-model"))
+    checks += [pikvm_hid_check(), streamer_check()]
+    content = content_server_check(args.device_id if args.device_content else None)
+    if content is not None:
+        checks.append(content)
+
+    start = time.perf_counter()
+    results = run_preflight(checks, cache=None if args.no_preflight_cache else PreflightCache())
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if result.ok:
+            source = "cached" if result.cached else f"{result.seconds * 1000:.0f} ms"
+            print(f"✅ {result.name}: {result.detail} ({source})")
+        elif not result.required:
+            print(f"⚠️  {result.name}: {result.detail}")
         else:
-            print(f"   Error: {error_msg}")
-
-        all_passed = False
+            print(f"❌ {result.name}: FAILED")
+            if result.name in model_urls:
+                _print_model_hint(model_urls[result.name], result.detail)
+            else:
+                print(f"   Error: {result.detail}")
 
     print("-" * 50)
-
-    if all_passed:
-        print("✅ Model API checks passed!\n")
-    else:
-        print("❌ Model API check failed. Please fix the issues above.")
-
-    return all_passed
+    if all(result.ok or not result.required for result in results):
+        print(f"✅ All checks passed in {elapsed:.2f}s\n")
+        return True
+    print("❌ System check failed. Please fix the issues above.")
+    return False
 
 
 def parse_args() -> argparse.Namespace:
@@ -154,6 +166,20 @@ def parse_args() -> argparse.Namespace:
         help="Model name",
     )
 
+    parser.add_argument(
+        "--fast-model",
+        type=str,
+        default=os.getenv("PHONE_AGENT_FAST_MODEL"),
+        help="Small fast model tried first; escalates to --model on invalid output",
+    )
+
+    parser.add_argument(
+        "--fast-base-url",
+        type=str,
+        default=os.getenv("PHONE_AGENT_FAST_BASE_URL"),
+        help="API base URL of the fast model (default: --base-url)",
+    )
+
     parser.add_argument(
         "--apikey",
         type=str,
@@ -168,6 +194,58 @@ def parse_args() -> argparse.Namespace:
         help="Maximum steps per task",
     )
 
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=int(os.getenv("PHONE_AGENT_TOKEN_BUDGET", "0")) or None,
+        help="Model tokens a task may use before --budget-action applies",
+    )
+
+    parser.add_argument(
+        "--budget-action",
+        type=str,
+        choices=["stop", "degrade"],
+        default=os.getenv("PHONE_AGENT_BUDGET_ACTION", "stop"),
+        help="Over budget: stop the task, or degrade to low-resolution screenshots",
+    )
+
+    parser.add_argument(
+        "--trajectory-cache",
+        type=str,
+        default=os.getenv("PHONE_AGENT_TRAJECTORY_CACHE"),
+        metavar="PATH",
+        help="JSON file of cached action sequences replayed for repeated tasks",
+    )
+
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        default=os.getenv("PHONE_AGENT_PIPELINE", "") == "1",
+        help="Capture the next screenshot while a step finishes, waiting for a stable screen",
+    )
+
+    parser.add_argument(
+        "--task-timeout",
+        type=float,
+        default=float(os.getenv("PHONE_AGENT_TASK_TIMEOUT", "0")) or None,
+        metavar="SECONDS",
+        help="Stop a task that runs longer than this, with a partial result",
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=os.getenv("PHONE_AGENT_CHECKPOINT"),
+        metavar="PATH",
+        help="Append the task state to this file after every step",
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the task recorded in --checkpoint instead of starting one",
+    )
+
     # Device options
     parser.add_argument(
         "--device-id",
@@ -177,6 +255,14 @@ def parse_args() -> argparse.Namespace:
         help="ADB device ID",
     )
 
+    parser.add_argument(
+        "--device-content",
+        action="store_true",
+        default=os.getenv("PHONE_AGENT_DEVICE_CONTENT", "") == "1",
+        help="Publish clipboard and launch payloads to /devices/<device-id>/content "
+        "instead of /content",
+    )
+
     parser.add_argument(
         "--connect",
         "-c",
@@ -208,10 +294,30 @@ def parse_args() -> argparse.Namespace:
     )
 
     # Other options
+    parser.add_argument(
+        "--skip-preflight",
+        action="store_true",
+        help="Start without checking the model API, PiKVM and content server",
+    )
+
+    parser.add_argument(
+        "--no-preflight-cache",
+        action="store_true",
+        help="Run every startup check even if it passed recently",
+    )
+
     parser.add_argument(
         "--quiet", "-q", action="store_true", help="Suppress verbose output"
     )
 
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.getenv("PHONE_AGENT_METRICS_PORT", "0")) or None,
+        metavar="PORT",
+        help="Serve Prometheus metrics of the agent on http://0.0.0.0:PORT/metrics",
+    )
+
     parser.add_argument(
         "--list-apps", action="store_true", help="List supported apps and exit"
     )
@@ -235,6 +341,36 @@ def parse_args() -> argparse.Namespace:
 
 
 
+def print_usage(agent: "PhoneAgent") -> None:
+    """Print token usage, loop report and trajectory cache stats."""
+    usage = agent.task_usage
+    if usage.total_tokens:
+        print(
+            f"Tokens: {usage.total_tokens} (prompt {usage.prompt_tokens}, "
+            f"cached {usage.cached_tokens}, completion {usage.completion_tokens}) "
+            f"in {agent.step_count} steps"
+        )
+    loops = agent.loop_report
+    if loops.detections:
+        print(
+            f"Loops: {loops.detections} detected, {loops.hints} hints, "
+            f"{loops.takeovers} takeovers, {loops.steps_saved} steps saved"
+        )
+    tiers = agent.model_client.tier_counts
+    if agent.model_client.has_fast_tier:
+        print(
+            f"Model tiers: {tiers['fast']} fast, {tiers['main']} main, "
+            f"{tiers['escalated']} escalated"
+        )
+    cache = agent.agent_config.trajectory_cache
+    if cache is not None and cache.stats.lookups:
+        print(
+            f"Trajectory cache: hit rate {cache.stats.hit_rate:.0%}, "
+            f"{cache.stats.model_calls_saved} model calls saved, "
+            f"{cache.stats.fallbacks} fallbacks"
+        )
+
+
 def main():
     """Main entry point."""
     args = parse_args()
@@ -246,22 +382,41 @@ def main():
             print(f"  - {app}")
         return
 
-    # Check model API connectivity and model availability
-    if not check_model_api(args.base_url, args.model, args.apikey):
+    from iphone_agent import AgentConfig, PhoneAgent
+    from iphone_agent.metrics import start_metrics_server
+    from iphone_agent.model import ModelConfig
+    from iphone_agent.trajectory_cache import TrajectoryCache
+
+    # Check the model API, PiKVM and content server
+    if not args.skip_preflight and not check_system(args):
         sys.exit(1)
 
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+
     # Create configurations
     model_config = ModelConfig(
         base_url=args.base_url,
         model_name=args.model,
         api_key=args.apikey,
+        fast_model_name=args.fast_model,
+        fast_base_url=args.fast_base_url,
     )
 
     agent_config = AgentConfig(
         max_steps=args.max_steps,
         device_id=args.device_id,
+        device_content=args.device_content,
         verbose=not args.quiet,
         lang=args.lang,
+        token_budget=args.token_budget,
+        budget_action=args.budget_action,
+        trajectory_cache=(
+            TrajectoryCache(args.trajectory_cache) if args.trajectory_cache else None
+        ),
+        pipeline=args.pipeline,
+        checkpoint_path=args.checkpoint,
+        task_timeout=args.task_timeout,
     )
 
     # Create agent
@@ -275,6 +430,8 @@ def main():
     print("Phone Agent - AI-powered phone automation")
     print("=" * 50)
     print(f"Model: {model_config.model_name}")
+    if model_config.fast_model_name:
+        print(f"Fast model: {model_config.fast_model_name}")
     # print(f"Base URL: {model_config.base_url}")
     print(f"Max Steps: {agent_config.max_steps}")
     print(f"Language: {agent_config.lang}")
@@ -289,10 +446,19 @@ def main():
     print("=" * 50)
 
     # Run with provided task or enter interactive mode
-    if args.task:
+    if args.resume:
+        if not args.checkpoint:
+            print("--resume requires --checkpoint")
+            sys.exit(1)
+        print(f"\nResuming: {args.checkpoint}\n")
+        result = agent.resume()
+        print(f"\nResult: {result}")
+        print_usage(agent)
+    elif args.task:
         print(f"\nTask: {args.task}\n")
         result = agent.run(args.task)
         print(f"\nResult: {result}")
+        print_usage(agent)
     else:
         # Interactive mode
         print("\nEntering interactive mode. Type 'quit' to exit.\n")
@@ -310,7 +476,9 @@ def main():
 
                 print()
                 result = agent.run(task)
-                print(f"\nResult: {result}\n")
+                print(f"\nResult: {result}")
+                print_usage(agent)
+                print()
                 agent.reset()
 
             except KeyboardInterrupt:
@@ -1,17 +1,56 @@
+"""检查模型部署是否成功，并对模型服务做压力测试的工具。
+
+默认发送一次 `--messages-file` 中的请求并打印模型输出。
+
+加 `--load` 后作为压测工具使用：按 `--concurrency` 中的并发数依次压测，每个
+并发档位持续 `--duration` 秒。每个并发连接模拟一台设备上的 Agent：系统提示词
++ 逐步增长的历史（历史中的截图已去掉，与 Agent 一致）+ 当前截图，任务执行
+`--task-steps` 步后开始新任务。各连接从不同步数开始，因此每个档位都混合了
+长短不同的历史。每个任务的文本都带唯一编号，不同任务之间只共享系统提示词的前缀缓存。
+
+每个档位统计首 token 时间（TTFT）、总延迟、每秒请求数和每秒 token 数，最后
+给出饱和点：输出吞吐达到峰值 `--saturation-ratio`（默认 90%）的最小并发。
+再增加并发只会拉长延迟，可据此估算 vLLM / SGLang 单副本能承载的设备数。
+"""
+
 import argparse
+import asyncio
+import base64
 import json
 import os
+import time
+import uuid
+from dataclasses import dataclass
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
-if __name__ == "__main__":
+DEFAULT_CONCURRENCY = "1,2,4,8,16,32,64,128,256"
+
+# 历史中模型的回复，按步数轮换。
+HISTORY_REPLIES = [
+    '<think>先打开目标应用。</think><answer>do(action="Launch", app="京东")</answer>',
+    '<think>点击顶部搜索框。</think><answer>do(action="Tap", element=[500,80])</answer>',
+    '<think>输入商品名称。</think><answer>do(action="Type", text="洗发水")</answer>',
+    '<think>向下滑动查看更多商品。</think><answer>do(action="Swipe", start=[500,800], end=[500,300])</answer>',
+    '<think>进入第一个商品的详情页。</think><answer>do(action="Tap", element=[300,450])</answer>',
+    '<think>返回上一页继续比价。</think><answer>do(action="Back")</answer>',
+]
+
+
+def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
-        description="检查模型部署是否成功的工具",
+        description="检查模型部署是否成功的工具，加 --load 可对模型服务做并发压测",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 使用示例:
   python scripts/check_deployment_cn.py --base-url http://localhost:8000/v1 --apikey your-key --model autoglm-phone-9b
   python scripts/check_deployment_cn.py --base-url http://localhost:8000/v1 --apikey your-key --model autoglm-phone-9b --messages-file custom.json
+
+  # 并发压测 1→256，每档 60 秒，结果写入 JSON
+  python scripts/check_deployment_cn.py --base-url http://localhost:8000/v1 --model autoglm-phone-9b --load --output load.json
+
+  # 只压测部分档位，并给出满足 p90 TTFT ≤ 2 秒的最大并发
+  python scripts/check_deployment_cn.py --base-url http://localhost:8000/v1 --model autoglm-phone-9b --load --concurrency 8,16,32 --slo-ttft-ms 2000
         """,
     )
 
@@ -56,15 +95,77 @@ if __name__ == "__main__":
         "--frequency_penalty", type=float, default=0.2, help="频率惩罚参数 (默认: 0.2)"
     )
 
-    args = parser.parse_args()
+    load = parser.add_argument_group("压测参数 (需加 --load)")
+    load.add_argument("--load", action="store_true", help="进行并发压测而不是单次检查")
+    load.add_argument(
+        "--concurrency",
+        type=str,
+        default=DEFAULT_CONCURRENCY,
+        help=f"逗号分隔的并发档位 (默认: {DEFAULT_CONCURRENCY})",
+    )
+    load.add_argument(
+        "--duration", type=float, default=60.0, help="每个并发档位持续的秒数 (默认: 60)"
+    )
+    load.add_argument(
+        "--task-steps",
+        type=int,
+        default=20,
+        help="模拟任务的步数，历史最长为该步数减一 (默认: 20)",
+    )
+    load.add_argument(
+        "--image",
+        type=str,
+        default=None,
+        help="作为当前截图发送的 PNG 文件 (默认: 消息文件中的截图)",
+    )
+    load.add_argument(
+        "--timeout", type=float, default=300.0, help="单个请求的超时秒数 (默认: 300)"
+    )
+    load.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="不使用流式输出 (服务不支持流式时使用，此时无法测量 TTFT)",
+    )
+    load.add_argument(
+        "--saturation-ratio",
+        type=float,
+        default=0.9,
+        help="吞吐达到峰值的该比例即视为饱和 (默认: 0.9)",
+    )
+    load.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=0.1,
+        help="某档位错误率超过该值时停止压测 (默认: 0.1)",
+    )
+    load.add_argument(
+        "--slo-ttft-ms",
+        type=float,
+        default=None,
+        help="p90 TTFT 上限 (毫秒)，用于计算满足 SLO 的最大并发",
+    )
+    load.add_argument(
+        "--slo-latency-ms",
+        type=float,
+        default=None,
+        help="p90 总延迟上限 (毫秒)，用于计算满足 SLO 的最大并发",
+    )
+    load.add_argument("--output", type=str, default=None, help="压测结果 JSON 的输出路径")
+
+    return parser.parse_args()
 
-    # 读取测试消息
-    if not os.path.exists(args.messages_file):
-        print(f"错误: 消息文件 {args.messages_file} 不存在")
+
+def load_messages(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        print(f"错误: 消息文件 {path} 不存在")
         exit(1)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
 
-    with open(args.messages_file) as f:
-        messages = json.load(f)
+def check_once(args: argparse.Namespace) -> None:
+    """发送一次消息文件中的请求并打印结果。"""
+    messages = load_messages(args.messages_file)
 
     base_url = args.base_url
     api_key = args.apikey
@@ -113,3 +214,361 @@ if __name__ == "__main__":
             "\n提示: 请检查 base_url、api_key 和 model 参数是否正确，以及服务是否正在运行。"
         )
         exit(1)
+
+
+# ---------------------------------------------------------------------------
+# 压测
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Sample:
+    """构造请求用的素材：系统提示词、任务文本和截图。"""
+
+    system: dict
+    task: str
+    image_url: str
+
+
+@dataclass
+class RequestResult:
+    ok: bool
+    latency: float
+    # 首个输出 token 的时间 (非流式时为 None)。
+    ttft: float | None = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    error: str | None = None
+    # 是否在 --duration 时间窗内完成 (只有这些请求计入吞吐)。
+    in_window: bool = True
+
+
+def load_sample(messages_file: str, image_path: str | None) -> Sample:
+    """从消息文件中取出系统提示词、任务和截图 (可用 --image 替换截图)。"""
+    messages = load_messages(messages_file)
+    system = next((m for m in messages if m["role"] == "system"), None)
+    user = next((m for m in messages if m["role"] == "user"), None)
+    if system is None or user is None or isinstance(user["content"], str):
+        print(f"错误: 消息文件 {messages_file} 需包含 system 消息和带截图的 user 消息")
+        exit(1)
+    task = "".join(p.get("text", "") for p in user["content"] if p["type"] == "text")
+    # 去掉屏幕信息，只保留任务描述。
+    task = task.split("\n\n", 1)[0]
+    image_url = next(
+        (p["image_url"]["url"] for p in user["content"] if p["type"] == "image_url"), None
+    )
+    if image_path:
+        with open(image_path, "rb") as f:
+            image_url = "data:image/png;base64," + base64.b64encode(f.read()).decode("ascii")
+    if image_url is None:
+        print(f"错误: 消息文件 {messages_file} 中没有截图，请用 --image 指定")
+        exit(1)
+    return Sample(system=system, task=task, image_url=image_url)
+
+
+def build_messages(sample: Sample, task_id: str, step: int) -> list[dict]:
+    """第 `step` 步的请求：历史中的截图已去掉，只有当前这一步带截图。"""
+    screen_info = json.dumps({"current_app": "京东"}, ensure_ascii=False)
+    # 任务编号放在第一条用户消息里，不同任务只共享系统提示词的前缀缓存。
+    first_text = f"{sample.task} (任务 {task_id})\n\n{screen_info}"
+    messages = [sample.system]
+    for i in range(step):
+        text = first_text if i == 0 else f"** Screen Info **\n\n{screen_info}"
+        messages.append({"role": "user", "content": [{"type": "text", "text": text}]})
+        messages.append(
+            {"role": "assistant", "content": HISTORY_REPLIES[i % len(HISTORY_REPLIES)]}
+        )
+    text = first_text if step == 0 else f"** Screen Info **\n\n{screen_info}"
+    messages.append(
+        {
+            "role": "user",
+            "content": [
+                {"type": "image_url", "image_url": {"url": sample.image_url}},
+                {"type": "text", "text": text},
+            ],
+        }
+    )
+    return messages
+
+
+async def send_request(
+    client: AsyncOpenAI, args: argparse.Namespace, messages: list[dict]
+) -> RequestResult:
+    params = dict(
+        messages=messages,
+        model=args.model,
+        max_tokens=args.max_tokens,
+        temperature=args.temperature,
+        top_p=args.top_p,
+        frequency_penalty=args.frequency_penalty,
+    )
+    start = time.perf_counter()
+    try:
+        if args.no_stream:
+            response = await client.chat.completions.create(**params, stream=False)
+            usage = response.usage
+            return RequestResult(
+                ok=True,
+                latency=time.perf_counter() - start,
+                prompt_tokens=usage.prompt_tokens if usage else 0,
+                completion_tokens=usage.completion_tokens if usage else 0,
+            )
+
+        stream = await client.chat.completions.create(
+            **params, stream=True, stream_options={"include_usage": True}
+        )
+        ttft = None
+        chunks = 0
+        usage = None
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            # 推理模型可能先输出 reasoning_content。
+            if delta.content or getattr(delta, "reasoning_content", None):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                chunks += 1
+        return RequestResult(
+            ok=True,
+            latency=time.perf_counter() - start,
+            ttft=ttft,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            # 服务未返回 usage 时按每个增量约一个 token 估算。
+            completion_tokens=usage.completion_tokens if usage else chunks,
+        )
+    except Exception as e:
+        return RequestResult(
+            ok=False, latency=time.perf_counter() - start, error=f"{type(e).__name__}: {e}"
+        )
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def to_ms(seconds: float | None) -> float | None:
+    return None if seconds is None else seconds * 1000.0
+
+
+def summarize_level(
+    concurrency: int, results: list[RequestResult], window: float, elapsed: float, cpu: float
+) -> dict:
+    ok = [r for r in results if r.ok]
+    # 吞吐只统计时间窗内完成的请求，除以时间窗长度；窗口结束时仍在进行的
+    # 请求仍计入延迟分位数和错误率。
+    done = [r for r in ok if r.in_window]
+    latencies = [r.latency for r in ok]
+    ttfts = [r.ttft for r in ok if r.ttft is not None]
+    # 每个输出 token 的平均间隔 (TPOT)。
+    tpots = [
+        (r.latency - r.ttft) / (r.completion_tokens - 1)
+        for r in ok
+        if r.ttft is not None and r.completion_tokens > 1
+    ]
+    errors: dict[str, int] = {}
+    for r in results:
+        if not r.ok:
+            errors[r.error] = errors.get(r.error, 0) + 1
+    completion_tokens = sum(r.completion_tokens for r in done)
+    prompt_tokens = sum(r.prompt_tokens for r in done)
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "window_s": window,
+        "elapsed_s": elapsed,
+        "requests_per_s": len(done) / window if window else 0.0,
+        "output_tokens_per_s": completion_tokens / window if window else 0.0,
+        "prompt_tokens_per_s": prompt_tokens / window if window else 0.0,
+        "mean_prompt_tokens": prompt_tokens / len(done) if done else 0.0,
+        "mean_completion_tokens": completion_tokens / len(done) if done else 0.0,
+        "ttft_ms": {f"p{p}": to_ms(percentile(ttfts, p)) for p in (50, 90, 99)},
+        "latency_ms": {f"p{p}": to_ms(percentile(latencies, p)) for p in (50, 90, 99)},
+        "tpot_ms": {f"p{p}": to_ms(percentile(tpots, p)) for p in (50, 90)},
+        "error_samples": dict(sorted(errors.items(), key=lambda kv: -kv[1])[:3]),
+        # 压测进程自身的 CPU 占用 (接近 1 时压测端本身可能成为瓶颈)。
+        "client_cpu": cpu / elapsed if elapsed else 0.0,
+    }
+
+
+async def run_level(
+    client: AsyncOpenAI, args: argparse.Namespace, sample: Sample, concurrency: int
+) -> dict:
+    """以 `concurrency` 个并发连接持续发送请求 `args.duration` 秒。"""
+    results: list[RequestResult] = []
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    deadline = start + args.duration
+
+    async def agent(index: int) -> None:
+        task_id = uuid.uuid4().hex[:8]
+        # 错开起始步数，使每个档位都混合长短不同的历史。
+        step = index % args.task_steps
+        while time.perf_counter() < deadline:
+            messages = build_messages(sample, task_id, step)
+            result = await send_request(client, args, messages)
+            result.in_window = time.perf_counter() <= deadline
+            results.append(result)
+            step += 1
+            if step >= args.task_steps:
+                task_id, step = uuid.uuid4().hex[:8], 0
+
+    await asyncio.gather(*(agent(i) for i in range(concurrency)))
+    return summarize_level(
+        concurrency,
+        results,
+        args.duration,
+        time.perf_counter() - start,
+        time.process_time() - cpu_start,
+    )
+
+
+def find_saturation(levels: list[dict], ratio: float) -> dict | None:
+    """输出吞吐达到峰值 `ratio` 的最小并发档位。"""
+    usable = [level for level in levels if level["requests"] > level["errors"]]
+    if not usable:
+        return None
+    peak = max(level["output_tokens_per_s"] for level in usable)
+    return next(level for level in usable if level["output_tokens_per_s"] >= ratio * peak)
+
+
+def find_slo_limit(
+    levels: list[dict], ttft_ms: float | None, latency_ms: float | None
+) -> dict | None:
+    """p90 TTFT、p90 延迟满足 SLO 且错误率低于 1% 的最大并发档位，遇到第一个不满足的档位即停止。"""
+    best = None
+    for level in levels:
+        ttft = level["ttft_ms"]["p90"]
+        latency = level["latency_ms"]["p90"]
+        if level["error_rate"] >= 0.01:
+            break
+        if ttft_ms is not None and (ttft is None or ttft > ttft_ms):
+            break
+        if latency_ms is not None and (latency is None or latency > latency_ms):
+            break
+        best = level
+    return best
+
+
+def format_ms(value: float | None) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def print_level(level: dict) -> None:
+    print(
+        f"{level['concurrency']:>6} {level['requests']:>7} {level['errors']:>5} "
+        f"{level['requests_per_s']:>8.2f} {level['output_tokens_per_s']:>10.1f} "
+        f"{format_ms(level['ttft_ms']['p50']):>9} {format_ms(level['ttft_ms']['p90']):>9} "
+        f"{format_ms(level['latency_ms']['p50']):>9} {format_ms(level['latency_ms']['p90']):>9} "
+        f"{level['mean_prompt_tokens']:>9.0f}",
+        flush=True,
+    )
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    try:
+        concurrency_levels = sorted({int(c) for c in args.concurrency.split(",") if c.strip()})
+    except ValueError:
+        print(f"错误: --concurrency 格式不正确: {args.concurrency}")
+        exit(1)
+    if not concurrency_levels or concurrency_levels[0] < 1 or args.task_steps < 1:
+        print("错误: 并发数和 --task-steps 必须为正整数")
+        exit(1)
+    sample = load_sample(args.messages_file, args.image)
+
+    print(f"开始压测模型服务...")
+    print(f"Base URL: {args.base_url}")
+    print(f"Model: {args.model}")
+    print(f"并发档位: {concurrency_levels}，每档 {args.duration:.0f} 秒，任务 {args.task_steps} 步")
+    print("=" * 96)
+
+    # 失败的请求计入错误率，不重试。
+    client = AsyncOpenAI(
+        base_url=args.base_url, api_key=args.apikey, timeout=args.timeout, max_retries=0
+    )
+    # 预热一次 (加载、编译等)，不计入结果。
+    warmup = await send_request(client, args, build_messages(sample, "warmup", 0))
+    if not warmup.ok:
+        print(f"预热请求失败: {warmup.error}")
+        print("\n提示: 请检查 base_url、api_key 和 model 参数是否正确，以及服务是否正在运行。")
+        exit(1)
+
+    print(
+        f"{'并发':>6} {'请求数':>7} {'错误':>5} {'RPS':>8} {'输出tok/s':>10} "
+        f"{'TTFT p50':>9} {'TTFT p90':>9} {'延迟 p50':>9} {'延迟 p90':>9} {'平均prompt':>9}"
+    )
+    levels = []
+    for concurrency in concurrency_levels:
+        level = await run_level(client, args, sample, concurrency)
+        levels.append(level)
+        print_level(level)
+        if level["client_cpu"] > 0.8:
+            print(f"  注意: 压测进程 CPU 占用 {level['client_cpu']:.0%}，结果可能受压测端限制。")
+        if level["error_rate"] > args.max_error_rate:
+            print(f"并发 {concurrency} 时错误率 {level['error_rate']:.0%}，停止压测。错误示例:")
+            for error, count in level["error_samples"].items():
+                print(f"  - {count} 次: {error}")
+            break
+    await client.close()
+    print("=" * 96)
+
+    saturation = find_saturation(levels, args.saturation_ratio)
+    if saturation is not None:
+        peak = max(level["output_tokens_per_s"] for level in levels)
+        print(
+            f"饱和点: 并发 {saturation['concurrency']} "
+            f"(输出 {saturation['output_tokens_per_s']:.1f} tok/s，峰值 {peak:.1f} tok/s 的 "
+            f"{saturation['output_tokens_per_s'] / peak:.0%}；"
+            f"{saturation['requests_per_s']:.2f} RPS，p90 延迟 "
+            f"{format_ms(saturation['latency_ms']['p90'])} ms)"
+        )
+        if saturation is levels[-1] and len(levels) == len(concurrency_levels):
+            print("吞吐在最高并发档位仍在增长，服务尚未饱和，可尝试更高的并发。")
+    else:
+        print("所有请求均失败，无法确定饱和点。")
+
+    slo = None
+    if args.slo_ttft_ms is not None or args.slo_latency_ms is not None:
+        slo = find_slo_limit(levels, args.slo_ttft_ms, args.slo_latency_ms)
+        if slo is None:
+            print("没有满足 SLO 的并发档位。")
+        else:
+            print(
+                f"满足 SLO 的最大并发: {slo['concurrency']} "
+                f"({slo['requests_per_s']:.2f} RPS，{slo['output_tokens_per_s']:.1f} tok/s)"
+            )
+
+    return {
+        "base_url": args.base_url,
+        "model": args.model,
+        "config": {
+            "concurrency": concurrency_levels,
+            "duration_s": args.duration,
+            "task_steps": args.task_steps,
+            "max_tokens": args.max_tokens,
+            "stream": not args.no_stream,
+        },
+        "levels": levels,
+        "saturation_concurrency": saturation["concurrency"] if saturation else None,
+        "slo_concurrency": slo["concurrency"] if slo else None,
+    }
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if not args.load:
+        check_once(args)
+    else:
+        results = asyncio.run(run_load(args))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"\n压测结果已写入 {args.output}")
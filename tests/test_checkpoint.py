@@ -0,0 +1,61 @@
+import pytest
+
+from iphone_agent.agent import AgentConfig, PhoneAgent
+from iphone_agent.checkpoint import CheckpointWriter, load_checkpoint
+from iphone_agent.model import ModelConfig
+
+
+def _step(n: int) -> dict:
+    return {
+        "messages": [{"role": "assistant", "content": f"step {n}"}],
+        "usage": [],
+        "trajectory": [],
+        "state": {"step_count": n},
+    }
+
+
+def test_resume_drops_partial_last_line(tmp_path):
+    path = str(tmp_path / "task.jsonl")
+    writer = CheckpointWriter(path)
+    writer.start("task", {"max_steps": 5})
+    writer.append_step(_step(1))
+    writer.close()
+    # A crash in the middle of writing the second step.
+    with open(path, "ab") as f:
+        f.write(b'{"type": "step", "messages": [{"ro')
+
+    writer.resume()
+    writer.append_step(_step(2))
+    writer.close()
+
+    checkpoint = load_checkpoint(path)
+    assert [m["content"] for m in checkpoint.messages] == ["step 1", "step 2"]
+    assert checkpoint.state == {"step_count": 2}
+
+
+def test_resume_restores_task_config(tmp_path):
+    config = AgentConfig(max_steps=100, verbose=False)
+    agent = PhoneAgent(
+        model_config=ModelConfig(model_name="m"),
+        agent_config=config,
+    )
+
+    agent._restore_config(
+        {"max_steps": 7, "token_budget": 1000, "verbose": True, "model": "m"}
+    )
+
+    assert agent.agent_config.max_steps == 7
+    assert agent.agent_config.token_budget == 1000
+    # Settings of this process are kept, and the shared config is untouched.
+    assert agent.agent_config.verbose is False
+    assert config.max_steps == 100
+
+
+def test_resume_rejects_other_model():
+    agent = PhoneAgent(
+        model_config=ModelConfig(model_name="m"),
+        agent_config=AgentConfig(verbose=False),
+    )
+
+    with pytest.raises(ValueError):
+        agent._restore_config({"model": "other"})
@@ -0,0 +1,57 @@
+import pytest
+
+from iphone_agent.idb.connection import configure_client
+from iphone_agent.idb.device import scroll_by, swipe
+from iphone_agent.idb.gesture import DRAG, FLICK, SCROLL
+from iphone_agent.idb.simulator import PiKvmSimulator, SimulatorConfig
+
+MOVE = "/api/hid/events/send_mouse_move"
+BUTTON = "/api/hid/events/send_mouse_button"
+
+
+@pytest.fixture
+def sim():
+    sim = PiKvmSimulator(SimulatorConfig(latency_ms=5)).start()
+    configure_client(sim.base_url)
+    try:
+        yield sim
+    finally:
+        sim.stop()
+
+
+def _gesture_events(sim):
+    """Moves and button presses from the press to the release."""
+    events = [e for e in sim.events if e.endpoint in (MOVE, BUTTON)]
+    press = next(i for i, e in enumerate(events) if e.params.get("state") == "1")
+    release = next(i for i, e in enumerate(events) if e.params.get("state") == "0")
+    return events[press - 1 : release + 1]
+
+
+def _point(event):
+    return int(event.params["to_x"]), int(event.params["to_y"])
+
+
+@pytest.mark.parametrize("profile", [FLICK, SCROLL, DRAG], ids=lambda p: p.name)
+def test_gesture_endpoints_and_duration(sim, profile):
+    sim.clear_events()
+    result = swipe(0, -10000, 0, 10000, None, delay=0, profile=profile)
+
+    events = _gesture_events(sim)
+    assert _point(events[0]) == (0, -10000)
+    assert _point(events[-2]) == (0, 10000)
+    assert all(e.endpoint == MOVE for e in events[2:-1])
+
+    expected_s = (profile.hold_before_ms + profile.duration_ms + profile.hold_after_ms) / 1000
+    pressed_s = events[-1].timestamp - events[1].timestamp
+    assert expected_s * 0.9 <= pressed_s <= expected_s + 0.15
+    assert result.motion_ms == pytest.approx(profile.duration_ms, abs=100)
+
+
+def test_scroll_by_converts_pixels_to_hid_units(sim):
+    sim.clear_events()
+    scroll_by(0, 5000, dx=100, dy=-200, screen_width=1000, screen_height=2000, delay=0)
+
+    events = _gesture_events(sim)
+    assert _point(events[0]) == (0, 5000)
+    # 65000 HID units span the screen: 100/1000 and 200/2000 of it.
+    assert _point(events[-2]) == (6500, 5000 - 6500)
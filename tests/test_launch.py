@@ -0,0 +1,69 @@
+import pytest
+
+from iphone_agent import fastapi_main
+from iphone_agent.actions import ActionHandler
+from iphone_agent.idb import publisher
+from iphone_agent.idb.connection import configure_client
+from iphone_agent.idb.device import launch_app
+from iphone_agent.idb.simulator import PiKvmSimulator, SimulatorConfig
+from iphone_agent.idb.timing import TimingProfile, get_timing_profile, set_timing_profile
+
+LAUNCH_TIMEOUT = 0.5
+
+
+@pytest.fixture
+def phone():
+    sim = PiKvmSimulator(SimulatorConfig(settle_ms=50)).start()
+    configure_client(sim.base_url)
+    previous_profile = get_timing_profile()
+    set_timing_profile(
+        TimingProfile(
+            launch_trigger_interval=0.0,
+            launch_open_wait=0.0,
+            launch_timeout=LAUNCH_TIMEOUT,
+        )
+    )
+    previous_publisher = publisher.get_content_publisher()
+    publisher.set_content_publisher(publisher.InProcessContentPublisher())
+    try:
+        yield sim
+    finally:
+        publisher.set_content_publisher(previous_publisher)
+        set_timing_profile(previous_profile)
+        sim.stop()
+
+
+def test_relaunching_foreground_app_is_not_retried(phone):
+    first = launch_app("微信", delay=0)
+    assert first.success and first.verified
+
+    second = launch_app("微信", delay=0)
+
+    assert second.success
+    assert not second.verified
+    assert second.attempts == 1
+    assert second.latency < 2 * LAUNCH_TIMEOUT
+
+
+def test_device_id_alone_keeps_the_shared_content_channel(phone):
+    launch = {"_metadata": "do", "action": "Launch", "app": "微信"}
+    shared = fastapi_main.CONTENT_CHANNEL.latest.seq
+
+    ActionHandler(device_id="phone-1").execute(launch, 1000, 1000)
+    assert fastapi_main.CONTENT_CHANNEL.latest.seq == shared + 1
+
+    ActionHandler(device_id="phone-1", content_channel="phone-1").execute(launch, 1000, 1000)
+    assert fastapi_main.CONTENT_CHANNEL.latest.seq == shared + 1
+    assert fastapi_main.DEVICE_CHANNELS.get("phone-1").latest.seq == 1
+
+
+def test_handler_reports_an_unverified_launch(phone):
+    handler = ActionHandler()
+    launch = {"_metadata": "do", "action": "Launch", "app": "微信"}
+    assert handler.execute(launch, 1000, 1000).verified
+
+    result = handler.execute(launch, 1000, 1000)
+
+    assert result.success
+    assert not result.verified
+    assert "may already be in the foreground" in result.message
@@ -0,0 +1,47 @@
+from iphone_agent.loop_detector import LoopDetector, LoopDetectorConfig, action_key
+
+
+def _tap(x: int, y: int) -> dict:
+    return {"_metadata": "do", "action": "Tap", "element": [x, y]}
+
+
+BACK = {"_metadata": "do", "action": "Back"}
+
+
+def test_same_action_on_same_screen_is_a_repeat():
+    detector = LoopDetector(LoopDetectorConfig(max_repeats=3))
+
+    assert detector.observe(0, _tap(500, 500)) is None
+    # Within the coordinate grid: the same target.
+    assert detector.observe(0, _tap(505, 510)) is None
+    detection = detector.observe(0, _tap(500, 500))
+
+    assert detection is not None
+    assert (detection.kind, detection.count) == ("repeat", 3)
+
+
+def test_same_action_on_changed_screen_is_not_a_repeat():
+    detector = LoopDetector(LoopDetectorConfig(max_repeats=3))
+
+    for screen in (0, 0xFFFF, 0xFFFF_0000):
+        assert detector.observe(screen, _tap(500, 500)) is None
+
+
+def test_alternating_steps_are_a_cycle():
+    detector = LoopDetector(LoopDetectorConfig(max_repeats=3, cycle_repeats=2))
+
+    assert detector.observe(0, _tap(100, 200)) is None
+    assert detector.observe(0xFFFF, BACK) is None
+    assert detector.observe(0, _tap(100, 200)) is None
+    detection = detector.observe(0xFFFF, BACK)
+
+    assert detection is not None
+    assert (detection.kind, detection.length, detection.count) == ("cycle", 2, 2)
+
+
+def test_malformed_coordinates_are_skipped():
+    action = {"_metadata": "do", "action": "Tap", "element": ["x", None]}
+
+    assert action_key(action) == ("do", "Tap")
+    assert action_key({**action, "element": [float("inf"), 1]}) == ("do", "Tap")
+    assert LoopDetector().observe(0, action) is None
@@ -0,0 +1,30 @@
+import threading
+
+import pytest
+
+from iphone_agent.metrics import Counter, Histogram, MetricsRegistry, _Metric
+
+
+def test_shards_of_exited_threads_are_folded():
+    registry = MetricsRegistry()
+    counter = Counter("test_total", "Test counter", registry=registry)
+    histogram = Histogram("test_seconds", "Test histogram", registry=registry)
+
+    def work():
+        counter.inc()
+        histogram.observe(0.01)
+
+    for _ in range(200):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+
+    assert counter.labels().value == 200
+    assert histogram.labels().snapshot()[2] == 200
+    assert len(counter.labels()._shards) == 0
+    assert len(histogram.labels()._shards) == 0
+
+
+def test_metric_base_is_abstract():
+    with pytest.raises(TypeError):
+        _Metric("test_abstract", "Abstract", registry=MetricsRegistry())
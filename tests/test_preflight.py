@@ -0,0 +1,64 @@
+import json
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from iphone_agent.preflight import model_check
+
+
+def _serve(models_status: int, models: list[str]) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            self._send(models_status, {"data": [{"id": m} for m in models]})
+
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._send(200, {"choices": [{"message": {"content": "H"}}]})
+
+        def _send(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.mark.parametrize(
+    "status, models, detail",
+    [
+        (200, ["autoglm"], "served"),
+        (200, ["alias-of-autoglm"], "answered"),
+        (403, [], "answered"),
+        (404, [], "answered"),
+    ],
+)
+def test_model_check_falls_back_to_a_completion(status, models, detail):
+    server = _serve(status, models)
+    try:
+        base = f"http://127.0.0.1:{server.server_port}/v1"
+        assert detail in model_check(base, "autoglm").run(2.0)
+    finally:
+        server.shutdown()
+
+
+def test_hung_check_does_not_delay_exit():
+    script = (
+        "import time\n"
+        "from iphone_agent.preflight import Check, run_preflight\n"
+        "hang = Check('hang', 'hang', lambda timeout: time.sleep(30))\n"
+        "print(run_preflight([hang], timeout=0.2)[0].ok)\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, timeout=10
+    )
+    assert proc.stdout.strip() == "False"
@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from iphone_agent.idb.publisher import CONTENT_PUBLISH_ERRORS, ContentPublisher
+from iphone_agent.metrics import render_metrics
+
+
+class _FailingPublisher(ContentPublisher):
+    name = "failing"
+
+    def _publish(self, content, launch_app, device_id):
+        raise ConnectionError("content server down")
+
+
+def test_publisher_requires_publish():
+    with pytest.raises(TypeError):
+        ContentPublisher()
+
+
+def test_errors_counted_across_threads_and_exported():
+    publisher = _FailingPublisher()
+    before = CONTENT_PUBLISH_ERRORS.labels("failing").value
+
+    def publish_many():
+        for _ in range(100):
+            with pytest.raises(ConnectionError):
+                publisher.publish("x")
+
+    threads = [threading.Thread(target=publish_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert publisher.snapshot()["errors"] - before == 800
+    exported = render_metrics()
+    assert 'content_publish_errors_total{publisher="failing"}' in exported
+    assert 'content_publish_seconds_count{publisher="failing"}' in exported
@@ -0,0 +1,36 @@
+from iphone_agent.trajectory_cache import TrajectoryCache, TrajectoryStep
+
+
+def _type(text: str, screen: int = 0) -> TrajectoryStep:
+    return TrajectoryStep(screen, {"_metadata": "do", "action": "Type", "text": text})
+
+
+def test_slots_bound_by_name_when_task_and_step_order_differ():
+    cache = TrajectoryCache()
+    # Typed in the order recipient, message; mentioned as message, recipient.
+    cache.store("send hello to bob", [_type("bob"), _type("hello", 1)])
+
+    match = cache.lookup("send goodbye to alice")
+
+    assert match is not None
+    assert [step.action["text"] for step in match.steps] == ["alice", "goodbye"]
+
+
+def test_slot_matches_whole_words_only():
+    cache = TrajectoryCache()
+    trajectory = cache.store("search and buy an umbrella", [_type("an")])
+
+    assert trajectory.template == "search and buy {0} umbrella"
+    match = cache.lookup("search and buy one umbrella")
+    assert match is not None
+    assert match.steps[0].action["text"] == "one"
+
+
+def test_slot_in_text_without_spaces():
+    cache = TrajectoryCache()
+    trajectory = cache.store("打开小红书搜索耳机", [_type("耳机")])
+
+    assert trajectory.template == "打开小红书搜索{0}"
+    match = cache.lookup("打开小红书搜索键盘")
+    assert match is not None
+    assert match.steps[0].action["text"] == "键盘"
@@ -0,0 +1,48 @@
+import pytest
+
+from iphone_agent.actions.handler import TYPING_SECONDS, ActionHandler
+from iphone_agent.idb import publisher
+from iphone_agent.idb.connection import configure_client
+from iphone_agent.idb.simulator import PiKvmSimulator, SimulatorConfig
+from iphone_agent.idb.timing import TimingProfile, get_timing_profile, set_timing_profile
+
+
+@pytest.fixture
+def handler():
+    sim = PiKvmSimulator().start()
+    configure_client(sim.base_url)
+    previous_profile = get_timing_profile()
+    set_timing_profile(
+        TimingProfile(
+            copy_trigger_interval=0.0,
+            copy_paste_wait=0.0,
+            copy_after=0.05,
+            type_after=0.1,
+            print_after=0.05,
+        )
+    )
+    previous_publisher = publisher.get_content_publisher()
+    publisher.set_content_publisher(publisher.InProcessContentPublisher())
+    try:
+        yield ActionHandler()
+    finally:
+        publisher.set_content_publisher(previous_publisher)
+        set_timing_profile(previous_profile)
+        sim.stop()
+
+
+@pytest.mark.parametrize(
+    "text, strategy, settle",
+    [("hello", "print", 0.05), ("美食攻略", "clipboard", 0.15)],
+)
+def test_type_reports_latency_and_strategy(handler, text, strategy, settle):
+    _, _, count_before = TYPING_SECONDS.labels(strategy).snapshot()
+
+    result = handler.execute({"_metadata": "do", "action": "Type", "text": text}, 1000, 1000)
+
+    assert result.success
+    assert result.strategy == strategy
+    # Timed through the whole settle delay of the strategy.
+    assert result.latency >= settle
+    _, _, count_after = TYPING_SECONDS.labels(strategy).snapshot()
+    assert count_after == count_before + 1